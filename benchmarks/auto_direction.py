@@ -0,0 +1,207 @@
+"""
+自动双向翻译与手动切换方向的延迟对比
+
+模拟中英文逐句交替的对话 (每句 --turn 秒), 使用本地模拟识别器对比:
+
+- manual: 每次换语言后, 操作者在 --reaction 秒后点击切换方向 (预连接备用会话 / 冷启动)
+- auto: 一个会话同时翻译为中英文, 按每句话识别出的源语言选择主语言
+
+与实际服务一样, 方向不对的会话收到另一种语言时只会输出原文的同语言结果。
+对每句话测量从开始说话到主面板第一次显示正确方向译文的延迟, 以及整句都没有正确显示的
+句子数、主面板上方向错误的结果比例和建立的会话数。
+
+    python -m benchmarks.auto_direction --turns 20 --turn 3 --reaction 0 1 --connect-delay 0.3
+"""
+import time
+import struct
+import argparse
+import functools
+import threading
+
+from translation.translator import TranslationEngine, STREAMING
+from utils.config import CHANNELS, SAMPLE_WIDTH, SAMPLE_RATE
+from .fake_recognizer import FakeRecognizer, FakeTranslation, FakeTranslationResult, FakeTranscriptionResult
+from .switch_latency import summarize
+
+OTHER = {'zh': 'en', 'en': 'zh'}
+
+
+class Conversation:
+    """逐句交替的中英文对话: 第偶数句为中文, 第奇数句为英文"""
+
+    def __init__(self, turn_seconds, frame_ms):
+        self.frames_per_turn = max(1, round(turn_seconds * 1000 / frame_ms))
+        self.turn_started_at = {}
+        self.sessions = 0
+
+    def turn_of(self, seq):
+        return (seq - 1) // self.frames_per_turn
+
+    @staticmethod
+    def language(turn):
+        return 'zh' if turn % 2 == 0 else 'en'
+
+
+class ConversationCapture:
+    """按实时速度写入音频帧; begin 之前为静音, 之后每帧带有对话中的序号"""
+
+    def __init__(self, conversation, frame_ms=20):
+        self.conversation = conversation
+        self.frame_ms = frame_ms
+        self.began = threading.Event()
+        self._running = threading.Event()
+
+    def open(self, ring):
+        self._running.set()
+        threading.Thread(target=self._feed, args=(ring,), daemon=True).start()
+        return True
+
+    def _feed(self, ring):
+        size = int(SAMPLE_RATE * self.frame_ms / 1000) * CHANNELS * SAMPLE_WIDTH
+        silence = bytes(size)
+        body = b'\x01' * (size - 4)
+        seq = 0
+        next_at = time.monotonic()
+        while self._running.is_set():
+            if self.began.is_set():
+                seq += 1
+                turn = self.conversation.turn_of(seq)
+                self.conversation.turn_started_at.setdefault(turn, time.monotonic())
+                ring.write(struct.pack('<I', seq) + body)
+            else:
+                ring.write(silence)
+            next_at += self.frame_ms / 1000
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def close(self):
+        self._running.clear()
+
+
+class ConversationRecognizer(FakeRecognizer):
+    """按帧序号判断说话的句子和语言; 目标语言与源语言相同时输出原文"""
+
+    def __init__(self, callback, translation_target_languages, conversation=None, **options):
+        super().__init__(callback, translation_target_languages, **options)
+        self.conversation = conversation
+        self.conversation.sessions += 1
+        self._turn = None
+
+    def send_audio_frame(self, data):
+        if not self._running:
+            raise RuntimeError('Speech recognition has stopped.')
+        if not data.strip(b'\x00'):
+            return
+        turn = self.conversation.turn_of(struct.unpack_from('<I', data)[0])
+        if self._turn is not None and turn != self._turn:
+            # 换了一句话: 上一句定稿
+            self._schedule(self._turn, True)
+        self._turn = turn
+        self._frames += 1
+        if self._frames % self.frames_per_result == 0:
+            self._schedule(turn, False)
+
+    def _schedule(self, turn, is_end):
+        timer = threading.Timer(self.result_delay, self._emit, args=(turn, is_end))
+        timer.daemon = True
+        timer.start()
+
+    def _emit(self, turn, is_end):
+        if not self._running:
+            return
+        source = Conversation.language(turn)
+        text = f"这是第 {turn} 句话" if source == 'zh' else f"this is sentence {turn}"
+        translations = {
+            lang: FakeTranslation(f"[{lang}] {turn}", lang, turn, is_end)
+            for lang in self.target_languages
+        }
+        transcription = FakeTranscriptionResult(text, turn, is_end)
+        self.callback.on_event(f"fake-{id(self)}", transcription, FakeTranslationResult(translations), None)
+
+
+class TurnRecorder:
+    """记录每句话第一次在主面板上以正确方向显示的时间"""
+
+    def __init__(self, engine):
+        self.first_correct = {}
+        self.primary = 0
+        self.wrong = 0
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        if not event.is_primary:
+            return
+        turn = int(event.text.rsplit(' ', 1)[-1])
+        self.primary += 1
+        if event.target_lang == OTHER[Conversation.language(turn)]:
+            self.first_correct.setdefault(turn, event.received_at)
+        else:
+            self.wrong += 1
+
+
+def run(mode, turns, turn_seconds, reaction=0.0, preconnect=True, **fake_options):
+    conversation = Conversation(turn_seconds, 20)
+    capture = ConversationCapture(conversation)
+    engine = TranslationEngine(
+        capture=capture,
+        recognizer_factory=functools.partial(ConversationRecognizer, conversation=conversation, **fake_options),
+        pool_size=1 if preconnect else 0,
+        auto_direction=mode == 'auto',
+    )
+    recorder = TurnRecorder(engine)
+    engine.start()
+    engine.wait_for_state(STREAMING, timeout=10.0)
+    # 等待备用会话就绪后再开始说话
+    time.sleep(fake_options.get('connect_delay', 0.3) + 0.5)
+    sessions_before = conversation.sessions
+
+    capture.began.set()
+    started = time.monotonic()
+    for turn in range(1, turns):
+        # 第 0 句为中文, 与初始方向一致; 此后每句换一种语言
+        time.sleep(max(0.0, started + turn * turn_seconds + reaction - time.monotonic()))
+        if mode == 'manual':
+            engine.switch_direction(Conversation.language(turn) == 'zh')
+    time.sleep(max(0.0, started + turns * turn_seconds - time.monotonic()) + 1.0)
+    engine.stop()
+
+    latency, missed = [], 0
+    for turn in range(turns):
+        shown_at = recorder.first_correct.get(turn)
+        turn_started = conversation.turn_started_at.get(turn)
+        if shown_at is None or turn_started is None:
+            missed += 1
+            continue
+        latency.append((shown_at - turn_started) * 1000)
+
+    if mode == 'auto':
+        label = 'auto'
+    else:
+        label = f"manual {'预连接' if preconnect else '冷启动'}, 反应 {reaction:g} 秒"
+    wrong = recorder.wrong / recorder.primary * 100 if recorder.primary else 0.0
+    print(f"== {label}: {turns} 句, {missed} 句未正确显示, 主面板方向错误的结果 {wrong:.0f}%, "
+          f"新建会话 {conversation.sessions - sessions_before} 个")
+    summarize("开始说话到正确译文", latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='自动双向翻译与手动切换方向的延迟对比')
+    parser.add_argument('--turns', type=int, default=20, help='对话句数 (中英文交替)')
+    parser.add_argument('--turn', type=float, default=3.0, help='每句话的时长 (秒)')
+    parser.add_argument('--reaction', type=float, nargs='+', default=[0.0, 1.0],
+                        help='换语言后操作者点击切换的延迟 (秒), 0 表示换语言的同时切换')
+    parser.add_argument('--connect-delay', type=float, default=0.3, help='模拟握手耗时 (秒)')
+    parser.add_argument('--result-delay', type=float, default=0.05, help='模拟识别结果返回耗时 (秒)')
+    parser.add_argument('--mode', choices=['manual', 'auto', 'both'], default='both')
+    args = parser.parse_args()
+
+    fake_options = {'connect_delay': args.connect_delay, 'result_delay': args.result_delay}
+    if args.mode in ('manual', 'both'):
+        for reaction in args.reaction:
+            for preconnect in (True, False):
+                run('manual', args.turns, args.turn, reaction, preconnect, **fake_options)
+    if args.mode in ('auto', 'both'):
+        run('auto', args.turns, args.turn, **fake_options)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+离线批量翻译吞吐量基准测试
+
+生成若干段测试录音, 用本地模拟识别器以不同并发数批量翻译, 输出吞吐量
+(音频秒/墙钟秒)。不需要网络:
+
+    python -m benchmarks.batch_throughput --files 8 --seconds 30 --workers 1 2 4 8
+"""
+import os
+import wave
+import argparse
+import tempfile
+import numpy as np
+
+from translation.batch import run_batch
+from .fake_recognizer import fake_recognizer_factory
+
+
+def write_wav(path, seconds, rate, channels):
+    rng = np.random.default_rng(0)
+    samples = rng.normal(0, 3000, (rate * seconds, channels)).astype(np.int16)
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(samples.tobytes())
+
+
+def run(files, seconds, workers_list, speed, rate, channels, **fake_options):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(files):
+            path = os.path.join(tmp, f"meeting{i}.wav")
+            write_wav(path, seconds, rate, channels)
+            paths.append(path)
+
+        results = []
+        for workers in workers_list:
+            print(f"\n== 并发数 {workers} ==")
+            _, audio, wall = run_batch(paths, os.path.join(tmp, f"out{workers}"), workers,
+                                       speed=speed, recognizer_factory=fake_recognizer_factory(**fake_options))
+            results.append((workers, audio / max(wall, 1e-9)))
+
+    print(f"\n{'并发数':<8}{'音频秒/秒':>12}")
+    for workers, throughput in results:
+        print(f"{workers:<8}{throughput:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量翻译吞吐量基准测试')
+    parser.add_argument('--files', type=int, default=8)
+    parser.add_argument('--seconds', type=int, default=30, help='每个文件的音频时长 (秒)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--speed', type=float, default=10.0, help='发送速度 (实时倍数), 0 表示不限速')
+    parser.add_argument('--rate', type=int, default=48000, help='测试录音的采样率')
+    parser.add_argument('--channels', type=int, default=2, help='测试录音的声道数')
+    parser.add_argument('--connect-delay', type=float, default=0.3, help='模拟握手耗时 (秒)')
+    parser.add_argument('--result-delay', type=float, default=0.05, help='模拟识别结果返回耗时 (秒)')
+    args = parser.parse_args()
+
+    run(args.files, args.seconds, args.workers, args.speed, args.rate, args.channels,
+        connect_delay=args.connect_delay, result_delay=args.result_delay)
+
+
+if __name__ == '__main__':
+    main()
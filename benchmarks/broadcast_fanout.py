@@ -0,0 +1,202 @@
+"""
+字幕广播负载测试
+
+在本进程中启动 SubtitleBroadcaster, 由一个线程模拟翻译回调按给定速率发布中间
+结果和定稿结果; 在若干子进程中运行数百个本地客户端 (WebSocket 和 SSE 各半),
+其中一部分客户端接收缓冲很小且每条消息都停顿, 模拟跟不上的设备。输出:
+
+- 回调线程中 on_event 的耗时
+- 正常客户端的发布到接收延迟
+- 慢客户端收到的定稿结果比例 (应为 100%) 和中间结果比例
+
+    python -m benchmarks.broadcast_fanout --clients 300 --slow 0.1 --seconds 15
+"""
+import json
+import time
+import socket
+import asyncio
+import argparse
+import multiprocessing
+
+from translation.broadcast import SubtitleBroadcaster
+from translation.events import TranslationEvent
+
+END_TEXT = '__end__'
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+async def ws_client(port, stats):
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(f'http://127.0.0.1:{port}/ws', heartbeat=None) as ws:
+            stats['connected'] = True
+            async for message in ws:
+                record = json.loads(message.data)
+                if record_received(record, stats):
+                    return
+
+
+async def sse_client(port, stats, slow_delay=0.0):
+    """用原始套接字读取 SSE, 慢客户端使用很小的接收缓冲"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    if slow_delay:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+    # StreamReader 会提前把数据读入自己的缓冲, 慢客户端要限制其大小才能让服务端感受到积压
+    reader, writer = await asyncio.open_connection(sock=sock, limit=4096 if slow_delay else 1 << 16)
+    writer.write(f"GET /events HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\n\r\n".encode())
+    stats['connected'] = True
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            if not line.startswith(b'data: '):
+                continue
+            if record_received(json.loads(line[6:]), stats):
+                return
+            if slow_delay:
+                await asyncio.sleep(slow_delay)
+    finally:
+        writer.close()
+
+
+def record_received(record, stats):
+    """记录一条结果, 收到结束标记时返回 True"""
+    if record['text'] == END_TEXT:
+        return True
+    latency = (time.time() - record['time']) * 1000
+    if record['final']:
+        stats['finals'] += 1
+        stats['final_ms'].append(latency)
+    else:
+        stats['partials'] += 1
+        stats['partial_ms'].append(latency)
+    return False
+
+
+def client_worker(port, fast, slow, slow_delay, timeout, results):
+    async def main():
+        clients = []
+        for i in range(fast + slow):
+            stats = {'slow': i >= fast, 'finals': 0, 'partials': 0, 'final_ms': [], 'partial_ms': [],
+                     'connected': False}
+            if stats['slow']:
+                coro = sse_client(port, stats, slow_delay)
+            elif i % 2:
+                coro = sse_client(port, stats)
+            else:
+                coro = ws_client(port, stats)
+            clients.append((stats, coro))
+        tasks = [asyncio.ensure_future(coro) for _, coro in clients]
+        await asyncio.wait(tasks, timeout=timeout)
+        for task in tasks:
+            task.cancel()
+        return [stats for stats, _ in clients]
+
+    results.put(asyncio.run(main()))
+
+
+def produce(broadcaster, seconds, rate, partials_per_sentence, languages):
+    """模拟翻译回调线程, 返回 (发布的定稿数, 发布的中间结果数, on_event 耗时微秒列表)"""
+    interval = 1 / rate
+    durations = []
+    finals = partials = 0
+    sentence = 0
+    next_at = time.monotonic()
+    deadline = next_at + seconds
+    while time.monotonic() < deadline:
+        sentence += 1
+        for i in range(1, partials_per_sentence + 1):
+            is_final = i == partials_per_sentence
+            for lang in languages:
+                text = f"sentence {sentence} of the fan-out load test, word {i} " * 2
+                event = TranslationEvent(text, lang, is_final, sentence, '负载测试原文', 'req', lang == languages[0])
+                t0 = time.perf_counter()
+                broadcaster.on_event(event)
+                durations.append((time.perf_counter() - t0) * 1e6)
+                if is_final:
+                    finals += 1
+                else:
+                    partials += 1
+            next_at += interval
+            time.sleep(max(0.0, next_at - time.monotonic()))
+    for lang in languages:
+        broadcaster.on_event(TranslationEvent(END_TEXT, lang, True))
+    return finals, partials, durations
+
+
+def run(clients, slow_ratio, slow_delay, seconds, rate, partials_per_sentence, languages, processes, client_queue):
+    broadcaster = SubtitleBroadcaster(port=0, client_queue=client_queue, max_clients=clients + 10).start()
+    slow_total = int(clients * slow_ratio)
+    results = multiprocessing.Queue()
+    workers = []
+    for i in range(processes):
+        fast = (clients - slow_total) // processes + (1 if i < (clients - slow_total) % processes else 0)
+        slow = slow_total // processes + (1 if i < slow_total % processes else 0)
+        worker = multiprocessing.Process(target=client_worker,
+                                         args=(broadcaster.port, fast, slow, slow_delay, seconds + 30, results))
+        worker.start()
+        workers.append(worker)
+
+    deadline = time.monotonic() + 30
+    while broadcaster.stats()['clients'] < clients and time.monotonic() < deadline:
+        time.sleep(0.1)
+    connected = broadcaster.stats()['clients']
+
+    cpu_before = time.process_time()
+    finals, partials, durations = produce(broadcaster, seconds, rate, partials_per_sentence, languages)
+    client_stats = []
+    for _ in workers:
+        client_stats.extend(results.get(timeout=seconds + 60))
+    cpu = (time.process_time() - cpu_before) / seconds * 100
+    for worker in workers:
+        worker.join()
+    stats = broadcaster.stats()
+    broadcaster.stop()
+
+    fast = [c for c in client_stats if not c['slow']]
+    slow = [c for c in client_stats if c['slow']]
+    print(f"== {connected}/{clients} 个客户端 (慢客户端 {len(slow)}), {len(languages)} 种语言, "
+          f"每秒 {rate * len(languages):.0f} 条结果, {seconds:.0f} 秒, 服务端进程 CPU {cpu:.1f}%")
+    print(f"on_event 耗时 (微秒): p50 {percentile(durations, 0.5):.1f}  p99 {percentile(durations, 0.99):.1f}  "
+          f"max {max(durations):.1f}")
+    final_ms = [ms for c in fast for ms in c['final_ms']]
+    partial_ms = [ms for c in fast for ms in c['partial_ms']]
+    print(f"正常客户端: 定稿 {sum(c['finals'] for c in fast)}/{finals * len(fast)}, "
+          f"延迟 p50 {percentile(final_ms, 0.5):.1f} ms  p99 {percentile(final_ms, 0.99):.1f} ms; "
+          f"中间结果 {sum(c['partials'] for c in fast)}/{partials * len(fast)}, "
+          f"延迟 p50 {percentile(partial_ms, 0.5):.1f} ms  p99 {percentile(partial_ms, 0.99):.1f} ms")
+    if slow:
+        slow_final_ms = [ms for c in slow for ms in c['final_ms']]
+        print(f"慢客户端: 定稿 {sum(c['finals'] for c in slow)}/{finals * len(slow)}, "
+              f"中间结果 {sum(c['partials'] for c in slow)}/{partials * len(slow)}, "
+              f"定稿延迟 p50 {percentile(slow_final_ms, 0.5):.0f} ms  max {max(slow_final_ms, default=0):.0f} ms")
+    print(f"广播统计: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='字幕广播负载测试')
+    parser.add_argument('--clients', type=int, default=300, help='客户端总数')
+    parser.add_argument('--slow', type=float, default=0.1, help='慢客户端比例')
+    parser.add_argument('--slow-delay', type=float, default=0.1, help='慢客户端每条消息后的停顿 (秒)')
+    parser.add_argument('--seconds', type=float, default=15.0, help='发布时长 (秒)')
+    parser.add_argument('--rate', type=float, default=20.0, help='每种语言每秒发布的结果数')
+    parser.add_argument('--partials-per-sentence', type=int, default=10, help='每句的结果数 (最后一条为定稿)')
+    parser.add_argument('--languages', nargs='+', default=['en', 'ja'])
+    parser.add_argument('--processes', type=int, default=4, help='运行客户端的子进程数')
+    parser.add_argument('--client-queue', type=int, default=32, help='每个客户端的发送队列上限')
+    args = parser.parse_args()
+
+    run(args.clients, args.slow, args.slow_delay, args.seconds, args.rate, args.partials_per_sentence,
+        args.languages, args.processes, args.client_queue)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+采集隔离测试
+
+模拟声卡回调按固定节奏产生音频块, 对比在本进程的线程中采集 (AudioRingBuffer) 和在
+采集子进程中采集 (ProcessCapture + SharedAudioRing) 时, 本进程的负载对采集的影响。
+负载包括占用 GIL 的计算线程 (模拟界面、SDK 回调和网络线程) 和对大量对象的 gc.collect()。
+
+- 回调延迟: 音频块实际写入缓冲区的时间比应到时间晚多少
+- 溢出: 回调延迟超过声卡缓冲时长的块数, 实际设备上这部分音频会丢失
+- 读取延迟: 写入缓冲区到发送线程读到的时间
+- 采集中断: 发送线程读空缓冲区时, 距最近一块已超过两块的时长 (仅共享内存缓冲区统计)
+
+    python -m benchmarks.capture_isolation --seconds 10 --frame-ms 20 --load-threads 4
+"""
+import gc
+import time
+import struct
+import argparse
+import functools
+import threading
+
+from utils.config import SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH
+from translation.audio_buffer import AudioRingBuffer
+from translation.capture import ProcessCapture
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+class PacedCapture:
+    """按实时节奏写入音频块, 每块开头记录应到时间
+
+    迟到超过 device_buffer 秒时计为一次溢出, 并像声卡一样丢弃积压、从当前时间继续。
+    """
+
+    def __init__(self, frame_ms, device_buffer):
+        self.frame_ms = frame_ms
+        self.device_buffer = device_buffer
+        self._running = threading.Event()
+        self._thread = None
+
+    def open(self, ring):
+        self._running.set()
+        self._thread = threading.Thread(target=self._feed, args=(ring,), name='paced-capture', daemon=True)
+        self._thread.start()
+        return True
+
+    def _feed(self, ring):
+        period = self.frame_ms / 1000
+        body = bytes(int(SAMPLE_RATE * period) * CHANNELS * SAMPLE_WIDTH - 8)
+        due = time.monotonic() + period
+        while self._running.is_set():
+            time.sleep(max(0.0, due - time.monotonic()))
+            ring.write(struct.pack('<d', due) + body)
+            now = time.monotonic()
+            if now - due > self.device_buffer:
+                # 声卡缓冲已满, 迟到期间的音频丢失, 从当前时间重新开始
+                ring.overflow_count += 1
+                due = now
+            due += period
+
+    def close(self):
+        self._running.clear()
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+
+class Load:
+    """占用 GIL 的计算线程和周期性的 gc.collect()"""
+
+    def __init__(self, threads, gc_objects, gc_interval):
+        self.threads = threads
+        self.gc_objects = gc_objects
+        self.gc_interval = gc_interval
+        self._running = threading.Event()
+        self._garbage = []
+        self.gc_pauses = []
+
+    def start(self):
+        self._running.set()
+        # 互相引用的对象, 每次完整回收都要遍历
+        for _ in range(self.gc_objects // 2):
+            a, b = {}, {}
+            a['peer'], b['peer'] = b, a
+            self._garbage.append(a)
+        for i in range(self.threads):
+            threading.Thread(target=self._spin, name=f'load-{i}', daemon=True).start()
+        if self.gc_objects:
+            threading.Thread(target=self._collect, name='load-gc', daemon=True).start()
+        return self
+
+    def _spin(self):
+        while self._running.is_set():
+            sum(i * i for i in range(2000))
+
+    def _collect(self):
+        while self._running.wait(self.gc_interval) and self._running.is_set():
+            started = time.perf_counter()
+            gc.collect()
+            self.gc_pauses.append((time.perf_counter() - started) * 1000)
+
+    def stop(self):
+        self._running.clear()
+        self._garbage.clear()
+
+
+def run(mode, seconds, frame_ms, device_buffer, load):
+    chunk_bytes = int(SAMPLE_RATE * frame_ms / 1000) * CHANNELS * SAMPLE_WIDTH
+    capacity = max(2, int(2000 / frame_ms))
+    if mode == 'process':
+        capture = ProcessCapture(functools.partial(PacedCapture, frame_ms, device_buffer))
+        ring = capture.create_buffer(chunk_bytes, capacity)
+    else:
+        capture = PacedCapture(frame_ms, device_buffer)
+        ring = AudioRingBuffer(chunk_bytes, capacity)
+    ring.reopen()
+    if not capture.open(ring):
+        raise RuntimeError("无法启动采集")
+
+    load.start()
+    lateness, delivery = [], []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        ring.wait_readable(0.1)
+        data = ring.read(timeout=0)
+        if data is None:
+            continue
+        now = time.monotonic()
+        due = struct.unpack_from('<d', data)[0]
+        lateness.append((ring.last_read_at - due) * 1000)
+        delivery.append((now - ring.last_read_at) * 1000)
+    load.stop()
+    capture.close()
+    ring.close()
+    return lateness, delivery, ring.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本进程负载对线程采集和子进程采集的影响')
+    parser.add_argument('--seconds', type=float, default=10.0, help='每种情况的运行时长 (秒)')
+    parser.add_argument('--frame-ms', type=int, default=20, help='每块音频的时长 (毫秒)')
+    parser.add_argument('--device-buffer-ms', type=float, default=40.0, help='模拟的声卡缓冲时长 (毫秒)')
+    parser.add_argument('--load-threads', type=int, default=4, help='占用 GIL 的计算线程数')
+    parser.add_argument('--gc-objects', type=int, default=2000000, help='gc.collect() 需要遍历的对象数')
+    parser.add_argument('--gc-interval', type=float, default=1.0, help='gc.collect() 的间隔 (秒)')
+    args = parser.parse_args()
+
+    print(f"== 每块 {args.frame_ms} ms, 声卡缓冲 {args.device_buffer_ms:.0f} ms, 负载: {args.load_threads} 个计算线程 + "
+          f"每 {args.gc_interval:g} 秒回收 {args.gc_objects} 个对象")
+    print(f"{'采集方式':<16}{'回调延迟 p50':>12}{'p99':>9}{'max':>9}{'溢出':>7}{'读取延迟 p99':>13}{'中断':>6}{'gc 停顿':>10}")
+    for loaded in (False, True):
+        for mode in ('thread', 'process'):
+            load = Load(args.load_threads, args.gc_objects, args.gc_interval) if loaded else Load(0, 0, 0)
+            lateness, delivery, stats = run(mode, args.seconds, args.frame_ms, args.device_buffer_ms / 1000, load)
+            label = f"{mode}{' + 负载' if loaded else ''}"
+            gc_pause = f"{max(load.gc_pauses):.0f} ms" if load.gc_pauses else '-'
+            print(f"{label:<16}{percentile(lateness, 0.5):>9.2f} ms{percentile(lateness, 0.99):>9.2f}"
+                  f"{max(lateness, default=float('nan')):>9.2f}{stats['overflows']:>7}"
+                  f"{percentile(delivery, 0.99):>10.2f} ms{stats.get('underruns', '-'):>6}{gc_pause:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+上传编码开销测试
+
+用合成的类语音信号 (基频起伏的谐波、按音节调制的幅度、停顿和背景噪声) 测量:
+
+- 线上码率和相对 PCM 节省的字节数
+- 编码 CPU: 每秒音频占用的编码线程 CPU 时间
+- Ogg 封装 (纯 Python 校验和) 本身的开销, 不依赖 opuslib
+
+opuslib 或 libopus 不可用时只输出 PCM 基线和封装开销, 与运行时回退到 PCM 的行为一致。
+
+    python -m benchmarks.encode_cost --seconds 60 --bitrates 16000 24000 32000
+"""
+import time
+import argparse
+
+import numpy as np
+from utils.config import SAMPLE_RATE, CHUNK_SIZE, CHANNELS, SAMPLE_WIDTH, OPUS_FRAME_MS
+from translation.encoder import OpusEncoder, OggStream, OPUS_PRE_SKIP
+
+PCM_KBPS = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH * 8 / 1000
+
+
+def synth_speech(seconds, seed=0):
+    """返回类语音的 16 位 PCM 字节串"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 160 + 40 * np.sin(2 * np.pi * 0.7 * t) + 20 * np.sin(2 * np.pi * 3.1 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    pauses = (np.sin(2 * np.pi * 0.2 * t) > -0.6).astype(float)
+    signal = 0.25 * voice * syllables * pauses + 0.01 * rng.standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype('<i2').tobytes()
+
+
+def chunks(pcm):
+    size = CHUNK_SIZE * CHANNELS * SAMPLE_WIDTH
+    return [pcm[i:i + size] for i in range(0, len(pcm), size)]
+
+
+def measure_opus(pcm, bitrate):
+    encoder = OpusEncoder(bitrate=bitrate)
+    wire = 0
+    started = time.thread_time()
+    for chunk in chunks(pcm):
+        wire += len(encoder.encode(chunk))
+    wire += len(encoder.finish())
+    return wire, time.thread_time() - started
+
+
+def measure_framing(seconds, bitrate):
+    """按给定码率的包大小只做 Ogg 封装, 测量封装本身的 CPU 开销"""
+    stream = OggStream(1)
+    packet = b'\x55' * (bitrate * OPUS_FRAME_MS // 8000)
+    packets_per_chunk = max(1, CHUNK_SIZE * 1000 // SAMPLE_RATE // OPUS_FRAME_MS)
+    pages = int(seconds * SAMPLE_RATE / CHUNK_SIZE)
+    wire = 0
+    started = time.thread_time()
+    for i in range(pages):
+        wire += len(stream.page([packet] * packets_per_chunk, OPUS_PRE_SKIP + i * 960 * packets_per_chunk))
+    return wire, time.thread_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='上传编码的带宽节省和 CPU 开销')
+    parser.add_argument('--seconds', type=float, default=60.0, help='合成音频时长 (秒)')
+    parser.add_argument('--bitrates', type=int, nargs='+', default=[16000, 24000, 32000], help='Opus 码率 (bit/s)')
+    args = parser.parse_args()
+
+    pcm = synth_speech(args.seconds)
+    print(f"== {args.seconds:.0f} 秒合成语音, 每块 {CHUNK_SIZE * 1000 // SAMPLE_RATE} ms, "
+          f"Opus 帧 {OPUS_FRAME_MS} ms")
+    print(f"{'编码':<14}{'线上码率':>12}{'节省':>8}{'编码 CPU':>14}")
+    print(f"{'pcm':<14}{PCM_KBPS:>8.1f} kbps{0:>7.0f}%{0:>8.2f} ms/s")
+    for bitrate in args.bitrates:
+        label = f"opus {bitrate // 1000}k"
+        try:
+            wire, cpu = measure_opus(pcm, bitrate)
+        except Exception as e:
+            print(f"{label:<14}不可用, 运行时回退到 PCM: {e}")
+            continue
+        kbps = wire * 8 / 1000 / args.seconds
+        print(f"{label:<14}{kbps:>8.1f} kbps{(1 - kbps / PCM_KBPS) * 100:>7.0f}%"
+              f"{cpu / args.seconds * 1000:>8.2f} ms/s")
+
+    for bitrate in args.bitrates:
+        wire, cpu = measure_framing(args.seconds, bitrate)
+        print(f"Ogg 封装 ({bitrate // 1000}k 包): {cpu / args.seconds * 1000:.3f} ms/s, "
+              f"页头开销 {wire * 8 / 1000 / args.seconds - bitrate / 1000:.2f} kbps")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""
+端到端基准测试
+
+启动本地 DashScope 替身服务, 让真实的 TranslationRecognizerRealtime 连接到本机,
+通过 TranslationEngine 测量:
+
+- 首个中间结果时间 (TTFP): 从启动引擎到收到第一条结果
+- 采集到结果延迟: 音频帧写入缓冲区到订阅者收到对应结果
+- 持续结果速率: 稳定状态下每秒收到的结果数
+- 方向切换: 从 switch_direction 到收到新方向的第一条结果
+- 断线恢复: 从服务端断开连接到重新收到结果
+
+    python -m benchmarks.end_to_end --latency 0.1 --jitter 0.02 --switches 10 --reconnects 5
+"""
+import re
+import time
+import struct
+import argparse
+import threading
+
+import dashscope
+from translation.translator import TranslationEngine
+from translation.export import SubtitleExporter
+from utils.config import CHANNELS, SAMPLE_WIDTH, SAMPLE_RATE
+from .standin_server import StandInServer
+from .switch_latency import summarize
+
+TAG = re.compile(r' #(\d+)$')
+
+
+class TaggedCapture:
+    """按实时速度写入带序号的音频帧, 记录每一帧的写入时间"""
+
+    def __init__(self, frame_ms=20):
+        self.frame_ms = frame_ms
+        self.captured_at = {}
+        self._running = threading.Event()
+
+    def open(self, ring):
+        self._running.set()
+        threading.Thread(target=self._feed, args=(ring,), daemon=True).start()
+        return True
+
+    def _feed(self, ring):
+        body = b'\x01' * (int(SAMPLE_RATE * self.frame_ms / 1000) * CHANNELS * SAMPLE_WIDTH - 4)
+        seq = 0
+        next_at = time.monotonic()
+        while self._running.is_set():
+            seq += 1
+            self.captured_at[seq] = time.monotonic()
+            ring.write(struct.pack('<I', seq) + body)
+            next_at += self.frame_ms / 1000
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def close(self):
+        self._running.clear()
+
+
+class EventRecorder:
+    """记录订阅者收到每条结果的时间、语言和对应的帧序号"""
+
+    def __init__(self, engine, capture):
+        self.capture = capture
+        self.events = []
+        self.cond = threading.Condition()
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        now = time.monotonic()
+        match = TAG.search(event.text)
+        latency = None
+        if match:
+            captured_at = self.capture.captured_at.get(int(match.group(1)))
+            if captured_at is not None:
+                latency = now - captured_at
+        with self.cond:
+            self.events.append((now, event.target_lang, latency, event.request_id))
+            self.cond.notify_all()
+
+    def request_ids(self):
+        with self.cond:
+            return {e[3] for e in self.events}
+
+    def wait_for(self, since, lang=None, exclude=(), timeout=10.0):
+        """等待 since 之后的第一条结果 (可指定语言, 排除指定会话), 返回其时间戳"""
+        deadline = since + timeout
+        with self.cond:
+            while True:
+                for ts, event_lang, _, request_id in reversed(self.events):
+                    if ts < since:
+                        break
+                    if (lang is None or event_lang == lang) and request_id not in exclude:
+                        return ts
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+    def window(self, since, until):
+        with self.cond:
+            return [e for e in self.events if since <= e[0] < until]
+
+
+def print_metrics(snapshot):
+    print("引擎延迟统计 (LatencyMetrics):")
+    for name, h in snapshot['histograms'].items():
+        if 'p50' in h:
+            print(f"  {name}: p50 {h['p50']} ms, p90 {h['p90']} ms, p99 {h['p99']} ms ({h['count']} 个样本)")
+
+
+def run(duration, switches, reconnects, interval, pool_size, metrics=False, export_dir=None,
+        **server_options):
+    server = StandInServer(**server_options)
+    dashscope.base_websocket_api_url = server.start()
+    dashscope.api_key = 'standin'
+
+    capture = TaggedCapture()
+    engine = TranslationEngine(capture=capture, pool_size=pool_size, metrics_enabled=metrics)
+    recorder = EventRecorder(engine, capture)
+    exporter = SubtitleExporter(export_dir).attach(engine) if export_dir else None
+
+    t0 = time.monotonic()
+    engine.start()
+    first = recorder.wait_for(t0)
+    ttfp = [(first - t0) * 1000] if first else []
+
+    # 稳定状态
+    time.sleep(1.0)
+    since = time.monotonic()
+    time.sleep(duration)
+    steady = recorder.window(since, time.monotonic())
+    capture_ms = [e[2] * 1000 for e in steady if e[2] is not None]
+    rate = len(steady) / duration
+
+    switch_ms, switch_missed = [], 0
+    for _ in range(switches):
+        time.sleep(interval)
+        started = time.monotonic()
+        engine.switch_direction()
+        ts = recorder.wait_for(started, 'en' if engine.is_zh_to_en else 'zh')
+        if ts is None:
+            switch_missed += 1
+        else:
+            switch_ms.append((ts - started) * 1000)
+
+    reconnect_ms, reconnect_missed = [], 0
+    for _ in range(reconnects):
+        time.sleep(interval)
+        # 只统计新会话的结果, 断开前已在途的旧会话结果不算
+        old_sessions = recorder.request_ids()
+        started = time.monotonic()
+        server.drop_connections()
+        ts = recorder.wait_for(started, exclude=old_sessions)
+        if ts is None:
+            reconnect_missed += 1
+        else:
+            reconnect_ms.append((ts - started) * 1000)
+
+    engine.stop()
+    server.stop()
+    if exporter is not None:
+        exporter.close()
+
+    print(f"== 端到端 (替身服务延迟 {server.latency * 1000:.0f} ± {server.jitter * 1000:.0f} ms, "
+          f"备用会话 {pool_size})")
+    summarize("首个结果 (TTFP)", ttfp)
+    summarize("采集到结果", capture_ms)
+    print(f"持续结果速率: {rate:.1f} 条/秒 ({len(steady)} 条 / {duration:.0f} 秒)")
+    summarize(f"方向切换到首个结果 ({switch_missed} 次超时)", switch_ms)
+    summarize(f"断线恢复到首个结果 ({reconnect_missed} 次超时)", reconnect_ms)
+    print(f"替身服务统计: {server.stats()}")
+    if engine.metrics is not None:
+        print_metrics(engine.metrics.snapshot())
+    if exporter is not None:
+        print(f"字幕导出: {exporter.stats()} -> {', '.join(exporter.output_paths())}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端基准测试 (本地替身服务)')
+    parser.add_argument('--duration', type=float, default=5.0, help='稳定状态测量时长 (秒)')
+    parser.add_argument('--switches', type=int, default=10)
+    parser.add_argument('--reconnects', type=int, default=5)
+    parser.add_argument('--interval', type=float, default=1.0, help='两次切换或断线之间的间隔 (秒)')
+    parser.add_argument('--pool-size', type=int, default=1, help='每个方向的备用会话数')
+    parser.add_argument('--metrics', action='store_true', help='启用引擎延迟统计并输出直方图')
+    parser.add_argument('--export', metavar='DIR', help='同时把定稿句子导出为字幕文件')
+    parser.add_argument('--handshake-delay', type=float, default=0.05, help='替身服务握手延迟 (秒)')
+    parser.add_argument('--latency', type=float, default=0.1, help='替身服务结果延迟 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='替身服务结果延迟抖动 (秒)')
+    args = parser.parse_args()
+
+    run(args.duration, args.switches, args.reconnects, args.interval, args.pool_size, args.metrics,
+        args.export, handshake_delay=args.handshake_delay, latency=args.latency, jitter=args.jitter)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+字幕导出基准测试
+
+模拟长时间会话: 以给定速率向导出器投递定稿句子 (夹杂大量中间结果), 输出回调
+线程入队耗时、写入吞吐量、fsync 次数以及运行期间的内存增长。不需要网络:
+
+    python -m benchmarks.export_throughput --sentences 20000 --rate 1000
+    python -m benchmarks.export_throughput --sentences 2000 --rate 200 --fsync-interval 1
+"""
+import os
+import time
+import argparse
+import tempfile
+import tracemalloc
+from array import array
+
+from translation.events import TranslationEvent
+from translation.export import SubtitleExporter
+from utils.config import EXPORT_QUEUE_SIZE
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run(sentences, rate, partials, formats, fsync_interval, queue_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        # 预先分配统计数组, 避免把基准测试本身的内存计入增长
+        enqueue_us = array('d', bytes(8 * sentences))
+        memory = []
+        tracemalloc.start()
+        exporter = SubtitleExporter(tmp, formats=formats, fsync_interval=fsync_interval,
+                                    queue_size=queue_size, name='bench')
+        base = time.monotonic()
+        interval = 1 / rate if rate > 0 else 0
+        next_at = time.monotonic()
+
+        started = time.monotonic()
+        for i in range(sentences):
+            begin = base + i * 3.0
+            source = f"第 {i} 句测试原文, 用于检查长时间运行时的内存占用"
+            text = f"Sentence {i} of the export benchmark, checking memory over long sessions"
+            for j in range(partials):
+                # 中间结果在入口处被丢弃
+                exporter.on_event(TranslationEvent(text[:10 + j], 'en', False, i, source))
+            event = TranslationEvent(text, 'en', True, i, source, f"req-{i // 20}",
+                                     begin_at=begin, end_at=begin + 2.5)
+            t0 = time.perf_counter()
+            exporter.on_event(event)
+            enqueue_us[i] = (time.perf_counter() - t0) * 1e6
+            if i % max(1, sentences // 10) == 0:
+                memory.append(tracemalloc.get_traced_memory()[0])
+            if interval:
+                next_at += interval
+                time.sleep(max(0.0, next_at - time.monotonic()))
+        produced = time.monotonic() - started
+
+        exporter.close(timeout=60)
+        elapsed = time.monotonic() - started
+        memory.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+
+        sizes = {os.path.basename(path): os.path.getsize(path) for path in exporter.output_paths()}
+        stats = exporter.stats()
+
+    print(f"句子 {sentences} (每句 {partials} 条中间结果), 投递耗时 {produced:.2f} 秒, "
+          f"写完耗时 {elapsed:.2f} 秒, 吞吐量 {stats['written'] / max(elapsed, 1e-9):.0f} 句/秒")
+    print(f"入队耗时 (微秒): p50 {percentile(enqueue_us, 0.5):.1f}  p99 {percentile(enqueue_us, 0.99):.1f}  "
+          f"max {max(enqueue_us):.1f}")
+    print(f"写入 {stats['written']}, 丢弃 {stats['dropped']}, 错误 {stats['errors']}, fsync {stats['fsyncs']} 次")
+    print(f"Python 内存 (KB): {' '.join(str(m // 1024) for m in memory)}")
+    for name, size in sizes.items():
+        print(f"  {name}: {size / 1024:.0f} KB")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='字幕导出基准测试')
+    parser.add_argument('--sentences', type=int, default=20000, help='投递的定稿句子数')
+    parser.add_argument('--rate', type=float, default=1000, help='每秒投递的句子数, 0 表示不限速')
+    parser.add_argument('--partials', type=int, default=5, help='每句之前的中间结果数')
+    parser.add_argument('--formats', nargs='+', default=['srt', 'vtt', 'jsonl'])
+    parser.add_argument('--fsync-interval', type=float, default=5.0, help='fsync 间隔 (秒)')
+    parser.add_argument('--queue-size', type=int, default=EXPORT_QUEUE_SIZE, help='导出队列容量')
+    args = parser.parse_args()
+
+    run(args.sentences, args.rate, args.partials, args.formats, args.fsync_interval, args.queue_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+会话故障切换延迟基准测试
+
+向当前会话注入错误, 测量从故障发生到收到下一条翻译结果的时间:
+
+    python -m benchmarks.failover_latency --failures 20 --pool-size 1
+"""
+import time
+import argparse
+
+from .switch_latency import start_engine, summarize
+
+
+def run(failures, interval, pool_size, **fake_options):
+    engine, recorder = start_engine(pool_size, **fake_options)
+
+    recovery_ms, missed = [], 0
+    for _ in range(failures):
+        time.sleep(interval)
+        session = engine.translator
+        if session is None:
+            missed += 1
+            continue
+        t0 = time.monotonic()
+        session.recognizer.fail()
+        ts = recorder.wait_for('[en]', t0)
+        if ts is None:
+            missed += 1
+        else:
+            recovery_ms.append((ts - t0) * 1000)
+
+    stats = engine.session_pool.stats()
+    engine.stop()
+    print(f"== 会话池大小 {pool_size}: {failures} 次故障, {missed} 次未恢复")
+    summarize("故障到首个结果", recovery_ms)
+    print(f"会话池统计: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='会话故障切换延迟基准测试')
+    parser.add_argument('--failures', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=1.0, help='两次故障之间的间隔 (秒)')
+    parser.add_argument('--pool-size', type=int, default=1, help='每个方向的备用会话数')
+    parser.add_argument('--connect-delay', type=float, default=0.3, help='模拟握手耗时 (秒)')
+    parser.add_argument('--result-delay', type=float, default=0.05, help='模拟识别结果返回耗时 (秒)')
+    args = parser.parse_args()
+
+    run(args.failures, args.interval, args.pool_size,
+        connect_delay=args.connect_delay, result_delay=args.result_delay)
+
+
+if __name__ == '__main__':
+    main()
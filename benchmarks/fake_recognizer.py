@@ -0,0 +1,100 @@
+"""
+模拟 TranslationRecognizerRealtime 的本地替身, 用于在没有网络和 API Key 的情况下做基准测试
+"""
+import time
+import threading
+import functools
+
+
+class FakeTranslation:
+    def __init__(self, text, language, sentence_id, is_sentence_end):
+        self.text = text
+        self.language = language
+        self.sentence_id = sentence_id
+        self.is_sentence_end = is_sentence_end
+        self.begin_time = 0
+        self.end_time = 0
+
+
+class FakeTranslationResult:
+    def __init__(self, translations):
+        self.translations = translations
+
+    def get_translation(self, language):
+        return self.translations.get(language)
+
+
+class FakeTranscriptionResult:
+    def __init__(self, text, sentence_id, is_sentence_end):
+        self.text = text
+        self.sentence_id = sentence_id
+        self.is_sentence_end = is_sentence_end
+        self.begin_time = 0
+        self.end_time = 0
+
+
+class FakeRecognizer:
+    """按固定延迟模拟连接握手和识别结果返回"""
+
+    def __init__(self, callback, translation_target_languages, connect_delay=0.3,
+                 result_delay=0.05, stop_delay=0.1, frames_per_result=1,
+                 frames_per_sentence=10, **kwargs):
+        self.callback = callback
+        self.target_languages = list(translation_target_languages)
+        self.connect_delay = connect_delay
+        self.result_delay = result_delay
+        self.stop_delay = stop_delay
+        self.frames_per_result = frames_per_result
+        self.frames_per_sentence = frames_per_sentence
+        self._running = False
+        self._frames = 0
+        self._sentence_id = 0
+
+    def start(self):
+        time.sleep(self.connect_delay)
+        self._running = True
+        self.callback.on_open()
+
+    def send_audio_frame(self, data):
+        if not self._running:
+            raise RuntimeError('Speech recognition has stopped.')
+        if not data.strip(b'\x00'):
+            # 静音帧 (如备用会话保活) 不产生识别结果
+            return
+        self._frames += 1
+        if self._frames % self.frames_per_result == 0:
+            is_end = self._frames % self.frames_per_sentence == 0
+            timer = threading.Timer(self.result_delay, self._emit, args=(self._sentence_id, is_end))
+            timer.daemon = True
+            timer.start()
+            if is_end:
+                self._sentence_id += 1
+
+    def _emit(self, sentence_id, is_end):
+        if not self._running:
+            return
+        translations = {
+            lang: FakeTranslation(f"[{lang}] sentence {sentence_id}", lang, sentence_id, is_end)
+            for lang in self.target_languages
+        }
+        transcription = FakeTranscriptionResult(f"sentence {sentence_id}", sentence_id, is_end)
+        self.callback.on_event(f"fake-{id(self)}", transcription, FakeTranslationResult(translations), None)
+
+    def fail(self, message='simulated network error'):
+        """模拟服务端报错断开"""
+        self._running = False
+        self.callback.on_error(message)
+
+    def stop(self):
+        if not self._running:
+            return
+        # 与真实 SDK 一样, 等待已发送音频的结果返回后再结束
+        time.sleep(max(self.stop_delay, self.result_delay))
+        self._running = False
+        self.callback.on_complete()
+        self.callback.on_close()
+
+
+def fake_recognizer_factory(**options):
+    """返回可替代 TranslationRecognizerRealtime 的工厂函数"""
+    return functools.partial(FakeRecognizer, **options)
@@ -0,0 +1,108 @@
+"""
+术语表后处理开销基准测试
+
+生成不同规模的术语表 (英文和中文各一半), 对长度与中间结果相近的文本逐条替换,
+输出编译耗时、每条结果的替换耗时, 并与逐个术语 str.replace 的做法对比:
+
+    python -m benchmarks.glossary_overhead --sizes 100 1000 10000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+
+from translation.glossary import CompiledGlossary, Glossary
+
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'su', 'tra', 'vex', 'zen', 'qua', 'ri', 'do', 'fin', 'gor', 'hal']
+HANZI = '通义千问阿里云灵积模型语音识别翻译实时会议项目进度发布计划报告数据平台服务'
+
+
+def make_terms(count, rng):
+    terms = {}
+    while len(terms) < count:
+        if len(terms) % 2:
+            term = ''.join(rng.choice(HANZI) for _ in range(rng.randint(2, 5)))
+        else:
+            term = ' '.join(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+                            for _ in range(rng.randint(1, 3)))
+        terms[term] = term.upper()
+    return terms
+
+
+def make_texts(terms, count, rng):
+    """生成长度 40-160 字符的文本, 约一半包含一个术语"""
+    words = ['the', 'project', 'release', 'is', 'scheduled', 'for', 'next', 'week', 'please', 'review']
+    keys = list(terms)
+    texts = []
+    for _ in range(count):
+        text = ' '.join(rng.choice(words) for _ in range(rng.randint(8, 30)))
+        if rng.random() < 0.5:
+            i = rng.randint(0, len(text))
+            text = f"{text[:i]} {rng.choice(keys)} {text[i:]}"
+        texts.append(text)
+    return texts
+
+
+def naive_apply(terms, text):
+    for term, replacement in terms.items():
+        text = text.replace(term, replacement)
+    return text
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def measure(fn, texts):
+    durations = []
+    for text in texts:
+        t0 = time.perf_counter()
+        fn(text)
+        durations.append((time.perf_counter() - t0) * 1e6)
+    return durations
+
+
+def run(sizes, texts_count, naive_limit):
+    rng = random.Random(0)
+    print(f"{'术语数':>8}{'编译毫秒':>10}{'p50 微秒':>10}{'p99 微秒':>10}{'逐个替换 p50':>14}")
+    for size in sizes:
+        terms = make_terms(size, rng)
+        texts = make_texts(terms, texts_count, rng)
+
+        t0 = time.perf_counter()
+        glossary = CompiledGlossary(terms)
+        compile_ms = (time.perf_counter() - t0) * 1000
+
+        durations = measure(glossary.apply, texts)
+        naive = ''
+        if size <= naive_limit:
+            naive = f"{percentile(measure(lambda t: naive_apply(terms, t), texts), 0.5):.1f}"
+        print(f"{size:>8}{compile_ms:>10.1f}{percentile(durations, 0.5):>10.1f}"
+              f"{percentile(durations, 0.99):>10.1f}{naive:>14}")
+
+    # 热重载: 从文件读取并编译最大的术语表, 替换期间 apply 不受影响
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'glossary.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'en': make_terms(max(sizes), rng)}, f, ensure_ascii=False)
+        glossary = Glossary(path, reload_interval=0)
+        t0 = time.perf_counter()
+        glossary.reload()
+        print(f"重新加载 {max(sizes)} 条术语的文件: {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='术语表后处理开销基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='术语表规模')
+    parser.add_argument('--texts', type=int, default=5000, help='每种规模替换的文本条数')
+    parser.add_argument('--naive-limit', type=int, default=1000, help='逐个替换对比的最大术语数')
+    args = parser.parse_args()
+
+    run(args.sizes, args.texts, args.naive_limit)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+翻译历史写入与搜索测试
+
+生成中英文混合的合成句子 (按 --days 天均匀分布), 测量:
+
+- 批量写入: 每秒写入的句子数和数据库大小 (--batch 为每个事务的句子数)
+- 实时写入: HistoryStore.on_event 在回调线程中的耗时, 以及句子从入队到可以被搜索到的延迟
+- 搜索: 常见与罕见关键词、多个关键词、语言 / 时间过滤, 以及过滤条件很少命中时的最坏情况
+
+    python -m benchmarks.history_store --sentences 1000000 --queries 50
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+
+from translation.events import TranslationEvent
+from translation.history import HistoryDB, HistoryStore
+from .switch_latency import summarize
+
+ZH_WORDS = ("我们 今天 讨论 项目 进度 客户 需求 下周 发布 版本 测试 问题 方案 预算 团队 会议 数据 模型 服务 "
+            "用户 反馈 计划 风险 上线 性能 优化 报告 市场 销售 季度 目标 完成 准备 确认 负责 安排 时间 资源").split()
+EN_WORDS = ("we the project release schedule customer requirement next week version test issue plan budget "
+            "team meeting data model service user feedback risk launch performance report market sales quarter "
+            "target review deadline update design").split()
+RARE_WORD = 'Kubernetes'     # 约每十万句出现一次
+RARE_INPUT = 'speaker'       # 约每千句一句来自该输入源
+
+
+def synth_records(count, days, seed=0):
+    rng = random.Random(seed)
+    start = time.time() - days * 86400
+    step = days * 86400 / max(1, count)
+    for i in range(count):
+        zh = ''.join(rng.choice(ZH_WORDS) for _ in range(rng.randint(5, 12)))
+        en = ' '.join(rng.choice(EN_WORDS) for _ in range(rng.randint(6, 14)))
+        if rng.random() < 1e-5:
+            en += ' ' + RARE_WORD
+        source_is_zh = rng.random() < 0.5
+        lang, text, source_lang, source_text = ('en', en, 'zh', zh) if source_is_zh else ('zh', zh, 'en', en)
+        source = RARE_INPUT if rng.random() < 1e-3 else 'mic'
+        yield (start + i * step, 'bench', source, lang, text, source_lang, source_text, i, f"req-{i // 100}")
+
+
+def bulk_ingest(path, count, days, batch_size):
+    db = HistoryDB(path)
+    batch = []
+    started = time.perf_counter()
+    for record in synth_records(count, days):
+        batch.append(record)
+        if len(batch) >= batch_size:
+            db.insert(batch)
+            batch = []
+    if batch:
+        db.insert(batch)
+    elapsed = time.perf_counter() - started
+    stats = db.stats()
+    db.close()
+    print(f"== 批量写入 {count} 句 (每批 {batch_size}): {elapsed:.1f} 秒, {count / elapsed:,.0f} 句/秒, "
+          f"数据库 {stats['bytes'] / 1e6:.0f} MB")
+
+
+def live_ingest(path, seconds, rate):
+    """按给定速率提交定稿句子, 同时在另一个连接上轮询, 测量句子可被搜索到的延迟"""
+    store = HistoryStore(path)
+    submitted = {}
+    call_us, visible_ms = [], []
+    done = threading.Event()
+
+    def poll():
+        reader = HistoryDB(path, readonly=True)
+        n = 1
+        while not (done.is_set() and n not in submitted):
+            if n in submitted and reader.search(f"live{n}marker", limit=1):
+                visible_ms.append((time.monotonic() - submitted[n]) * 1000)
+                n += 1
+                continue
+            time.sleep(0.005)
+        reader.close()
+
+    poller = threading.Thread(target=poll, daemon=True)
+    poller.start()
+    n = 0
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        n += 1
+        event = TranslationEvent(f"the live sentence live{n}marker", 'en', is_final=True, sentence_id=n,
+                                 source_text='实时写入的句子', source_lang='zh')
+        t0 = time.perf_counter()
+        store.on_event(event)
+        call_us.append((time.perf_counter() - t0) * 1e6)
+        submitted[n] = time.monotonic()
+        time.sleep(max(0.0, started + n / rate - time.monotonic()))
+    done.set()
+    poller.join(10.0)
+    store.close()
+    call_us.sort()
+    print(f"== 实时写入 {n} 句 ({rate:g} 句/秒, 每批最多等待 {store.flush_interval:g} 秒), "
+          f"{store.batches} 个事务, 丢弃 {store.dropped}")
+    print(f"on_event 耗时: median {call_us[len(call_us) // 2]:.1f} us, max {call_us[-1]:.1f} us")
+    summarize("入队到可搜索", visible_ms)
+
+
+def query_latency(path, repeats):
+    db = HistoryDB(path, readonly=True)
+    week_ago = time.time() - 7 * 86400
+    cases = [
+        ('常见中文词', '项目', {}),
+        ('两个中文词', '项目 风险', {}),
+        ('常见英文词', 'release', {}),
+        ('英文短语', 'next week', {}),
+        ('罕见词', RARE_WORD, {}),
+        ('语言过滤', '预算', {'lang': 'zh'}),
+        ('最近 7 天', '上线', {'since': week_ago}),
+        ('无结果', 'zzzzqqq', {}),
+        ('罕见输入源 (最坏)', '项目', {'input': RARE_INPUT}),
+    ]
+    print(f"== 搜索 (每项 {repeats} 次, 最多 20 条)")
+    print(f"{'查询':<18}{'结果':>6}{'p50':>10}{'p99':>10}")
+    for label, query, filters in cases:
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            results = db.search(query, 20, **filters)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{label:<18}{len(results):>6}{timings[len(timings) // 2]:>7.2f} ms{p99:>7.2f} ms")
+    db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='翻译历史的写入吞吐量和搜索延迟')
+    parser.add_argument('--sentences', type=int, default=1000000, help='批量写入的句子数')
+    parser.add_argument('--days', type=float, default=60, help='句子时间分布的天数')
+    parser.add_argument('--batch', type=int, default=200, help='批量写入时每个事务的句子数')
+    parser.add_argument('--live-seconds', type=float, default=5.0, help='实时写入的时长 (秒)')
+    parser.add_argument('--rate', type=float, default=20.0, help='实时写入的句子速率 (句/秒)')
+    parser.add_argument('--queries', type=int, default=50, help='每个搜索重复的次数')
+    parser.add_argument('--db', help='数据库路径, 默认使用临时目录 (运行后删除)')
+    args = parser.parse_args()
+
+    directory = None
+    path = args.db
+    if path is None:
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, 'history.db')
+    try:
+        bulk_ingest(path, args.sentences, args.days, args.batch)
+        live_ingest(path, args.live_seconds, args.rate)
+        query_latency(path, args.queries)
+    finally:
+        if directory is not None:
+            directory.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+多输入源基准测试
+
+用本地替身服务同时翻译 N 个带序号的输入源, 对比所有输入源共用一个
+PumpScheduler 发送线程和每个引擎单独一个发送线程时的线程数、CPU 占用和
+每个输入源的采集到结果延迟:
+
+    python -m benchmarks.multi_source --sources 1 2 4 8 --duration 5
+"""
+import time
+import argparse
+import threading
+
+import dashscope
+from translation.sources import AudioSource, SourceManager
+from translation.translator import TranslationEngine
+from utils.config import CHUNK_SIZE, SAMPLE_RATE
+from .end_to_end import TaggedCapture, EventRecorder
+from .standin_server import StandInServer
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+def start_sources(count, shared, pool_size):
+    """返回 (停止函数, [(名称, 引擎, 采集)])"""
+    frame_ms = CHUNK_SIZE * 1000 // SAMPLE_RATE
+    captures = [TaggedCapture(frame_ms=frame_ms) for _ in range(count)]
+    if shared:
+        sources = [AudioSource(f"src{i}", is_zh_to_en=i % 2 == 0, capture=capture)
+                   for i, capture in enumerate(captures)]
+        manager = SourceManager(sources, metrics_enabled=False, pool_size=pool_size)
+        engines = list(manager.engines.values())
+        manager.start()
+        stop = manager.stop
+    else:
+        engines = [TranslationEngine(is_zh_to_en=i % 2 == 0, capture=capture, pool_size=pool_size,
+                                     metrics_enabled=False, source=f"src{i}")
+                   for i, capture in enumerate(captures)]
+        for engine in engines:
+            engine.start()
+
+        def stop():
+            threads = [threading.Thread(target=engine.stop) for engine in engines]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+    return stop, [(engine.source, engine, capture) for engine, capture in zip(engines, captures)]
+
+
+def run(count, shared, duration, pool_size):
+    stop, sources = start_sources(count, shared, pool_size)
+    recorders = [(name, EventRecorder(engine, capture)) for name, engine, capture in sources]
+    time.sleep(2.0)
+
+    threads_before = threading.active_count()
+    cpu_before = time.process_time()
+    since = time.monotonic()
+    time.sleep(duration)
+    until = time.monotonic()
+    cpu = (time.process_time() - cpu_before) / duration * 100
+    threads = threading.active_count()
+    # 其余线程属于 SDK 的会话连接和采集模拟, 两种方式相同
+    pump_threads = sum(1 for t in threading.enumerate()
+                       if t.name.startswith('translation-engine') or t.name == 'audio-pump')
+
+    stop()
+    label = '共用发送线程' if shared else '独立发送线程'
+    print(f"== {count} 个输入源, {label}: 发送线程 {pump_threads}, 进程线程 {threads} "
+          f"(测量开始时 {threads_before}), 进程 CPU {cpu:.1f}%")
+    worst = []
+    for name, recorder in recorders:
+        latency = [e[2] * 1000 for e in recorder.window(since, until) if e[2] is not None]
+        worst.append(percentile(latency, 0.95))
+        if count <= 4:
+            print(f"  {name}: {len(latency)} 条结果, 采集到结果 p50 {percentile(latency, 0.5):.1f} ms, "
+                  f"p95 {percentile(latency, 0.95):.1f} ms")
+    print(f"  各输入源 p95 中的最大值: {max(worst):.1f} ms")
+    return threads, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description='多输入源基准测试 (本地替身服务)')
+    parser.add_argument('--sources', type=int, nargs='+', default=[1, 2, 4, 8], help='同时翻译的输入源数')
+    parser.add_argument('--duration', type=float, default=5.0, help='每组测量时长 (秒)')
+    parser.add_argument('--pool-size', type=int, default=1, help='每个方向的备用会话数')
+    parser.add_argument('--latency', type=float, default=0.1, help='替身服务结果延迟 (秒)')
+    args = parser.parse_args()
+
+    server = StandInServer(latency=args.latency)
+    dashscope.base_websocket_api_url = server.start()
+    dashscope.api_key = 'standin'
+    try:
+        for count in args.sources:
+            for shared in (False, True):
+                run(count, shared, args.duration, args.pool_size)
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+界面绘制开销测试
+
+在 Qt offscreen 平台上搭建与主窗口相同的布局 (圆角背景、标题、文本区域和
+TranscriptRenderer), 按给定速率推送中间结果, 对比几种绘制方式:
+
+- legacy: 每次重绘都重新绘制背景, 整个窗口带 QGraphicsDropShadowEffect (改动前)
+- window-effect: 背景使用缓存, 但仍保留整个窗口的阴影效果
+- cached: 背景使用缓存, 没有阴影和离屏效果 (当前实现; 阴影会被占满窗口的背景盖住)
+
+输出两项:
+- 同步重绘: 一次文本更新后立即重绘文本区域的耗时
+- 实时运行: 事件循环按给定速率运行时, 每次更新平均占用的 CPU (含高亮动画引起的重绘)
+
+--glow 同时测量开启文本高亮动画 (TRANSCRIPT_GLOW) 的情况。
+
+    python -m benchmarks.paint_cost --rates 10 30 --seconds 5 --size 1280x360
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QLabel, QTextEdit,
+                             QGraphicsDropShadowEffect)
+from PyQt6.QtCore import Qt, QTimer, QEvent, QObject
+from PyQt6.QtGui import QColor
+
+from ui.components import BlurWindow
+from ui.transcript import TranscriptRenderer
+from ui.main_window import TEXT_AREA_STYLE
+
+VARIANTS = ('legacy', 'window-effect', 'cached')
+WORDS = ("the quarterly results show that revenue grew faster than expected while costs remained "
+         "flat across most regions and the new product line").split()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+class LegacyBlurWindow(BlurWindow):
+    """改动前的背景绘制: 每次重绘都重新构建路径和渐变"""
+
+    def paintEvent(self, event):
+        from PyQt6.QtGui import QPainter
+        from PyQt6.QtCore import QRectF
+        painter = QPainter(self)
+        self.paint_chrome(painter, QRectF(self.rect()))
+
+
+class PaintCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            self.count += 1
+        return False
+
+
+def build_window(variant, width, height, glow):
+    window = QMainWindow()
+    window.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
+    window.setWindowFlags(Qt.WindowType.FramelessWindowHint)
+    window.resize(width, height)
+
+    central = LegacyBlurWindow() if variant == 'legacy' else BlurWindow()
+    window.setCentralWidget(central)
+    if variant != 'cached':
+        shadow = QGraphicsDropShadowEffect()
+        shadow.setBlurRadius(20)
+        shadow.setColor(QColor(0, 0, 0, 80))
+        shadow.setOffset(0, 0)
+        central.setGraphicsEffect(shadow)
+
+    layout = QVBoxLayout(central)
+    layout.setContentsMargins(20, 15, 20, 20)
+    title = QLabel('实时语音翻译')
+    title.setStyleSheet("QLabel { color: #FFFFFF; font-size: 14px; }")
+    layout.addWidget(title)
+    direction = QLabel('当前方向：中文 → 英文')
+    direction.setStyleSheet("QLabel { color: rgba(255, 255, 255, 0.7); font-size: 13px; }")
+    layout.addWidget(direction)
+    text_area = QTextEdit()
+    text_area.setReadOnly(True)
+    text_area.setStyleSheet(TEXT_AREA_STYLE)
+    layout.addWidget(text_area)
+
+    renderer = TranscriptRenderer(text_area, glow=glow)
+    window.show()
+    return window, central, text_area, renderer
+
+
+def partial_texts():
+    """逐词增长的中间结果, 每 10 条为一句 (最后一条为定稿)"""
+    n = 0
+    while True:
+        n += 1
+        words = WORDS[:(n - 1) % 10 * 2 + 2]
+        yield ' '.join(words), n % 10 == 0
+
+
+def measure(app, variant, width, height, rate, seconds, glow):
+    window, central, text_area, renderer = build_window(variant, width, height, glow)
+    for _ in range(5):
+        app.processEvents()
+
+    # 同步重绘
+    texts = partial_texts()
+    sync_ms = []
+    for _ in range(100):
+        text, final = next(texts)
+        renderer.push(text, final)
+        renderer.flush()
+        started = time.perf_counter()
+        text_area.viewport().repaint()
+        sync_ms.append((time.perf_counter() - started) * 1000)
+    app.processEvents()
+
+    # 实时运行
+    counter = PaintCounter()
+    central.installEventFilter(counter)
+    updates = [0]
+
+    def push():
+        text, final = next(texts)
+        renderer.push(text, final)
+        updates[0] += 1
+
+    timer = QTimer()
+    timer.setInterval(int(1000 / rate))
+    timer.timeout.connect(push)
+    cpu_before = time.process_time()
+    timer.start()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.001)
+    timer.stop()
+    cpu = time.process_time() - cpu_before
+    window.close()
+    app.processEvents()
+    return sync_ms, cpu * 1000 / max(1, updates[0]), counter.count / seconds, getattr(central, 'cache_builds', 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='界面绘制开销 (每次文本更新的毫秒数)')
+    parser.add_argument('--rates', type=float, nargs='+', default=[10.0, 30.0], help='每秒中间结果数')
+    parser.add_argument('--seconds', type=float, default=5.0, help='每种方式的实时运行时长 (秒)')
+    parser.add_argument('--size', default='800x300', help='窗口尺寸, 例如 1280x360')
+    parser.add_argument('--variants', nargs='+', choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument('--glow', action='store_true', help='同时测量开启文本高亮动画的情况')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    app = QApplication(sys.argv[:1])
+    print(f"== 窗口 {width}x{height}, 平台 {app.platformName()}")
+    print(f"{'方式':<22}{'速率':>6}{'同步重绘 p50':>14}{'p99':>8}{'实时 CPU/次':>13}{'背景重绘/秒':>12}")
+    glows = [False, True] if args.glow else [False]
+    for rate in args.rates:
+        for glow in glows:
+            for variant in args.variants:
+                sync_ms, cpu_ms, paints, _ = measure(app, variant, width, height, rate, args.seconds, glow)
+                label = f"{variant} + 高亮" if glow else variant
+                print(f"{label:<22}{rate:>5.0f}/s{percentile(sync_ms, 0.5):>11.2f} ms{percentile(sync_ms, 0.99):>8.2f}"
+                      f"{cpu_ms:>10.2f} ms{paints:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+"""
+运行配置档对比测试
+
+每个配置档在单独的子进程中运行 (通过 TRANSFLOAT_PROFILE 选择, 与实际部署相同),
+连接本进程中的本地替身服务, 按实时速度写入 "讲话 / 静音" 交替的带序号音频, 测量:
+
+- 采集到结果延迟: 从一帧的第一个采样被采集到收到对应结果 (含等待凑满一帧的时间)
+- 子进程 CPU 占用 (采集、发送、SDK 和回调线程合计, 单核百分比)
+- 每秒发送的音频帧数和上传帧数占采集帧数的比例 (启用 VAD 时静音不上传, 备用会话的保活帧也计入)
+
+替身服务每 2 秒语音结束一句, 每 100 ms 语音 (帧长更长时每帧) 返回一条结果,
+保证不同帧长下的句子和结果节奏一致。SDK 只在发送两帧音频之间处理收到的结果,
+因此帧长除了凑满一帧的等待, 还会推迟结果的接收。
+
+    python -m benchmarks.profile_latency --profiles balanced low-latency efficient --seconds 20
+"""
+import os
+import re
+import sys
+import json
+import time
+import struct
+import argparse
+import resource
+import threading
+import subprocess
+
+from utils import config
+from utils.profiles import load_profile
+from .standin_server import StandInServer
+
+TAG = re.compile(r' #(\d+)$')
+SENTENCE_MS = 2000
+RESULT_MS = 100
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float('nan')
+
+
+class AlternatingCapture:
+    """按实时速度交替写入带序号的语音帧和全零静音帧, 记录每一帧第一个采样的采集时间"""
+
+    def __init__(self, frame_ms, speech_seconds=4.0, silence_seconds=2.0):
+        self.frame_ms = frame_ms
+        self.speech_seconds = speech_seconds
+        self.silence_seconds = silence_seconds
+        self.started_at = {}
+        self.frames = 0
+        self._running = threading.Event()
+
+    def open(self, ring):
+        self._running.set()
+        threading.Thread(target=self._feed, args=(ring,), daemon=True).start()
+        return True
+
+    def _feed(self, ring):
+        frame_bytes = int(config.SAMPLE_RATE * self.frame_ms / 1000) * config.CHANNELS * config.SAMPLE_WIDTH
+        body = b'\x01' * (frame_bytes - 4)
+        silence = bytes(frame_bytes)
+        period = self.speech_seconds + self.silence_seconds
+        seq = 0
+        began = next_at = time.monotonic()
+        while self._running.is_set():
+            frame_start = next_at
+            next_at += self.frame_ms / 1000
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            self.frames += 1
+            if (frame_start - began) % period < self.speech_seconds:
+                seq += 1
+                self.started_at[seq] = frame_start
+                ring.write(struct.pack('<I', seq) + body)
+            else:
+                ring.write(silence)
+
+    def close(self):
+        self._running.clear()
+
+
+def child(url, seconds, warmup):
+    """在子进程中运行引擎, 把测量结果以 JSON 写到标准输出"""
+    import dashscope
+    from translation.translator import TranslationEngine
+    dashscope.base_websocket_api_url = url
+    dashscope.api_key = 'standin'
+
+    capture = AlternatingCapture(config.FRAME_MS)
+    engine = TranslationEngine(capture=capture)
+    partial_ms, final_ms = [], []
+    measuring = threading.Event()
+
+    def on_event(event):
+        match = TAG.search(event.text)
+        if not measuring.is_set() or not match or not event.is_primary:
+            return
+        started = capture.started_at.get(int(match.group(1)))
+        if started is not None:
+            (final_ms if event.is_final else partial_ms).append((time.monotonic() - started) * 1000)
+
+    engine.subscribe(on_event)
+    engine.start()
+    time.sleep(warmup)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    began = time.monotonic()
+    measuring.set()
+    time.sleep(seconds)
+    measuring.clear()
+    wall = time.monotonic() - began
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    engine.stop()
+
+    cpu = (after.ru_utime + after.ru_stime - usage.ru_utime - usage.ru_stime) / wall * 100
+    print(json.dumps({'partial_ms': partial_ms, 'final_ms': final_ms, 'cpu': cpu, 'captured': capture.frames}))
+
+
+def run_profile(name, profile_file, seconds, warmup, latency, jitter):
+    settings = load_profile(config.PROFILE_DEFAULTS, name, profile_file)
+    frame_ms = settings['FRAME_MS']
+    server = StandInServer(latency=latency, jitter=jitter,
+                           frames_per_sentence=max(1, SENTENCE_MS // frame_ms),
+                           frames_per_result=max(1, RESULT_MS // frame_ms))
+    url = server.start()
+    env = dict(os.environ, TRANSFLOAT_PROFILE=name)
+    if profile_file:
+        env['TRANSFLOAT_PROFILE_FILE'] = profile_file
+    try:
+        frames_before = server.frames_received
+        proc = subprocess.run([sys.executable, '-m', 'benchmarks.profile_latency', '--child', url,
+                               '--seconds', str(seconds), '--warmup', str(warmup)],
+                              env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                              timeout=seconds + warmup + 30)
+        frames = server.frames_received - frames_before
+    finally:
+        server.stop()
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update(frame_ms=frame_ms, frames_per_second=frames / (result['captured'] * frame_ms / 1000),
+                  uploaded=frames / result['captured'])
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='运行配置档的延迟与 CPU 对比')
+    parser.add_argument('--profiles', nargs='+', default=['balanced', 'low-latency', 'efficient'])
+    parser.add_argument('--profile-file', default=config.PROFILE_FILE, help='自定义配置档文件')
+    parser.add_argument('--seconds', type=float, default=20.0, help='每个配置档的测量时长 (秒)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='开始测量前的运行时长 (秒)')
+    parser.add_argument('--latency', type=float, default=0.1, help='替身服务结果延迟 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='替身服务结果延迟抖动 (秒)')
+    parser.add_argument('--child', metavar='URL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.seconds, args.warmup)
+        return
+
+    print(f"替身服务延迟 {args.latency * 1000:.0f} ± {args.jitter * 1000:.0f} ms, "
+          f"每个配置档 {args.seconds:.0f} 秒 (讲话 4 秒 / 静音 2 秒交替)")
+    print(f"{'配置档':<12}{'帧长':>6}{'中间 p50':>10}{'中间 p99':>10}{'定稿 p50':>10}{'CPU':>8}"
+          f"{'帧/秒':>8}{'上传比例':>9}")
+    for name in args.profiles:
+        r = run_profile(name, args.profile_file, args.seconds, args.warmup, args.latency, args.jitter)
+        print(f"{name:<12}{r['frame_ms']:>4}ms{percentile(r['partial_ms'], 0.5):>8.0f}ms"
+              f"{percentile(r['partial_ms'], 0.99):>8.0f}ms{percentile(r['final_ms'], 0.5):>8.0f}ms"
+              f"{r['cpu']:>7.1f}%{r['frames_per_second']:>8.1f}{r['uploaded'] * 100:>8.0f}%")
+
+
+if __name__ == '__main__':
+    main()
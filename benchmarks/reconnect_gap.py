@@ -0,0 +1,112 @@
+"""
+断线重连丢失音频基准测试
+
+用本地替身服务反复断开连接 (可选地在断开后拒绝连接一段时间, 模拟短暂的网络
+中断), 统计有多少采集到的音频帧从未出现在任何识别结果中, 并对比开启和关闭
+断线补发时的结果:
+
+    python -m benchmarks.reconnect_gap --drops 10 --outage 1.5
+"""
+import time
+import argparse
+import threading
+
+import dashscope
+from translation.translator import TranslationEngine
+from utils.config import CHUNK_SIZE, SAMPLE_RATE
+from .end_to_end import TaggedCapture, TAG
+from .standin_server import StandInServer
+from .switch_latency import summarize
+
+
+class TagCollector:
+    """记录每个帧序号出现在哪些会话的结果中"""
+
+    def __init__(self, engine):
+        self.sessions = {}
+        self.request_ids = set()
+        self.lock = threading.Lock()
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        match = TAG.search(event.text)
+        if match is None or not event.is_primary:
+            return
+        with self.lock:
+            self.sessions.setdefault(int(match.group(1)), set()).add(event.request_id)
+            self.request_ids.add(event.request_id)
+
+
+def run(drops, interval, outage, replay_seconds, pool_size, **server_options):
+    server = StandInServer(frames_per_sentence=10, **server_options)
+    dashscope.base_websocket_api_url = server.start()
+    dashscope.api_key = 'standin'
+
+    # 与麦克风采集相同的块大小, 环形缓冲区容量与实际运行一致
+    capture = TaggedCapture(frame_ms=CHUNK_SIZE * 1000 // SAMPLE_RATE)
+    engine = TranslationEngine(capture=capture, pool_size=pool_size, replay_seconds=replay_seconds)
+    collector = TagCollector(engine)
+    engine.start()
+    time.sleep(2.0)
+
+    recovery_ms = []
+    for _ in range(drops):
+        time.sleep(interval)
+        with collector.lock:
+            old_sessions = set().union(*collector.sessions.values())
+        started = time.monotonic()
+        if outage > 0:
+            server.reject_rate = 1.0
+        server.drop_connections()
+        if outage > 0:
+            time.sleep(outage)
+            server.reject_rate = 0.0
+        # 等待新会话返回结果, 断开前已在途的旧会话结果不算
+        deadline = time.monotonic() + 15
+        while time.monotonic() < deadline:
+            with collector.lock:
+                if collector.request_ids - old_sessions:
+                    break
+            time.sleep(0.01)
+        recovery_ms.append((time.monotonic() - started) * 1000)
+
+    time.sleep(2.0)
+    last_tag = max(capture.captured_at)
+    engine.stop()
+    server.stop()
+
+    # 只检查最后 1 秒之前采集的帧, 避免把停止时尚未返回的结果算作丢失
+    with collector.lock:
+        tags = dict(collector.sessions)
+    first = min(tags)
+    checked = [tag for tag in range(first, last_tag - 1000 // capture.frame_ms)]
+    lost = [tag for tag in checked if tag not in tags]
+    duplicated = sum(1 for tag in checked if len(tags.get(tag, ())) > 1)
+    stats = engine.stats()
+
+    label = f"补发 {replay_seconds:.0f} 秒" if replay_seconds > 0 else "不补发"
+    print(f"== {label}, 断开 {drops} 次, 每次中断 {outage:.1f} 秒, 备用会话 {pool_size}")
+    print(f"检查 {len(checked)} 帧, 丢失 {len(lost)} 帧 ({len(lost) * capture.frame_ms / 1000:.1f} 秒音频), "
+          f"重复识别 {duplicated} 帧")
+    summarize("断开到新会话首个结果", recovery_ms)
+    print(f"补发统计: {stats['replay']}, 会话池: {stats['session_pool']}")
+    return len(lost)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='断线重连丢失音频基准测试 (本地替身服务)')
+    parser.add_argument('--drops', type=int, default=5, help='断开连接的次数')
+    parser.add_argument('--interval', type=float, default=2.0, help='两次断开之间的间隔 (秒)')
+    parser.add_argument('--outage', type=float, default=0.0, help='断开后拒绝连接的时长 (秒)')
+    parser.add_argument('--replay-seconds', type=float, nargs='+', default=[0, 10],
+                        help='对比的补发时长 (秒), 0 表示不补发')
+    parser.add_argument('--pool-size', type=int, default=1, help='每个方向的备用会话数')
+    parser.add_argument('--latency', type=float, default=0.1, help='替身服务结果延迟 (秒)')
+    args = parser.parse_args()
+
+    for replay_seconds in args.replay_seconds:
+        run(args.drops, args.interval, args.outage, replay_seconds, args.pool_size, latency=args.latency)
+
+
+if __name__ == '__main__':
+    main()
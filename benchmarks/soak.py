@@ -0,0 +1,344 @@
+"""
+长时间运行测试 (soak)
+
+连接本地替身服务, 按实时速度持续写入音频, 定时注入服务端断线、切换翻译方向和
+重启引擎, 记录随时间变化的:
+
+- 进程内存 (RSS)、系统线程数、Python 线程数、打开的文件描述符、Python 对象数
+- Qt 对象数 (图形界面模式, 窗口及其所有子对象)
+- 每次断线 / 切换 / 重启到收到新会话第一条结果的时间
+
+预热结束后的取值作为基线, 运行结束时与基线比较, 任何一项增长超出预算,
+或恢复时间的中位数比开始时变长超过预算, 就以状态码 1 退出:
+
+    python -m benchmarks.soak --duration 4h --csv soak.csv
+    python -m benchmarks.soak --mode engine --duration 10m --disconnect-interval 5 --switch-interval 7
+
+图形界面模式使用真实的 TranslatorWindow (Qt offscreen 平台), 切换方向走窗口的
+switch_direction; engine 模式只运行 TranslationEngine。
+"""
+import os
+import gc
+import sys
+import csv
+import time
+import argparse
+import threading
+import statistics
+
+import dashscope
+from translation.translator import TranslationEngine
+from utils import config
+from .standin_server import StandInServer
+from .switch_latency import FeedCapture, summarize
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600}
+FIELDS = ('elapsed', 'rss_mb', 'threads', 'py_threads', 'fds', 'py_objects', 'qt_objects')
+
+
+def parse_duration(text):
+    """'90' / '30m' / '4h' → 秒"""
+    if text[-1:] in UNITS:
+        return float(text[:-1]) * UNITS[text[-1]]
+    return float(text)
+
+
+def proc_status(field):
+    """读取 /proc/self/status 中的整数字段 (Linux), 不可用时返回 None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def open_fds():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return None
+
+
+class RecoveryRecorder:
+    """记录注入故障或切换后收到新会话第一条主语言结果的时间
+
+    只保留每次恢复的耗时和出现过的会话编号, 不保存结果本身, 避免测试工具自身的内存增长。
+    """
+
+    def __init__(self, engine):
+        self.lock = threading.Lock()
+        self.pending = None           # (动作, 开始时间, 目标语言)
+        self.seen_ids = set()         # 出现过结果的会话, 恢复必须来自此后的新会话
+        self.results = 0
+        self.latencies = {}           # 动作 → [(开始时间, 毫秒)]
+        self.missed = {}              # 超时未恢复的次数
+        self.superseded = 0           # 恢复之前就开始了下一个动作的次数
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        if not event.is_primary:
+            return
+        now = time.monotonic()
+        with self.lock:
+            self.results += 1
+            if self.pending is None or event.request_id in self.seen_ids:
+                self.seen_ids.add(event.request_id)
+                return
+            self.seen_ids.add(event.request_id)
+            action, started, lang = self.pending
+            if lang is not None and event.target_lang != lang:
+                return
+            self.latencies.setdefault(action, []).append((started, (now - started) * 1000))
+            self.pending = None
+
+    def begin(self, action, lang=None):
+        """开始等待一次恢复; 上一次尚未恢复的不计入恢复时间"""
+        with self.lock:
+            if self.pending is not None:
+                self.superseded += 1
+            self.pending = (action, time.monotonic(), lang)
+
+    def expire(self, timeout):
+        with self.lock:
+            if self.pending is not None and time.monotonic() - self.pending[1] > timeout:
+                self.missed[self.pending[0]] = self.missed.get(self.pending[0], 0) + 1
+                self.pending = None
+
+    def all_latencies(self):
+        with self.lock:
+            return sorted(sample for samples in self.latencies.values() for sample in samples)
+
+
+class Sampler:
+    """定时采样资源占用, 可同时写入 CSV"""
+
+    def __init__(self, started, window=None, csv_path=None):
+        self.started = started
+        self.window = window
+        self.samples = []
+        self._file = None
+        self._writer = None
+        if csv_path:
+            self._file = open(csv_path, 'w', newline='', encoding='utf-8')
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(FIELDS)
+
+    def qt_objects(self):
+        if self.window is None:
+            return None
+        from PyQt6.QtCore import QObject
+        from PyQt6.QtWidgets import QApplication
+        app = QApplication.instance()
+        return len(self.window.findChildren(QObject)) + len(app.findChildren(QObject)) + len(app.topLevelWidgets())
+
+    def sample(self):
+        rss_kb = proc_status('VmRSS')
+        row = {
+            'elapsed': round(time.monotonic() - self.started, 1),
+            'rss_mb': round(rss_kb / 1024, 1) if rss_kb is not None else None,
+            'threads': proc_status('Threads'),
+            'py_threads': threading.active_count(),
+            'fds': open_fds(),
+            'py_objects': len(gc.get_objects()),
+            'qt_objects': self.qt_objects(),
+        }
+        self.samples.append(row)
+        if self._writer is not None:
+            self._writer.writerow([row[field] for field in FIELDS])
+            self._file.flush()
+        return row
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def baseline_and_final(samples, warmup, key, count=3):
+    """预热后最初几次采样和最后几次采样的中位数"""
+    values = [(s['elapsed'], s[key]) for s in samples if s['elapsed'] >= warmup and s[key] is not None]
+    if len(values) < 2:
+        return None, None
+    count = max(1, min(count, len(values) // 2))
+    return (statistics.median(v for _, v in values[:count]),
+            statistics.median(v for _, v in values[-count:]))
+
+
+def slope_per_hour(samples, warmup, key):
+    """预热后取值随时间的线性增长率 (每小时)"""
+    points = [(s['elapsed'], s[key]) for s in samples if s['elapsed'] >= warmup and s[key] is not None]
+    if len(points) < 3:
+        return None
+    mean_t = statistics.fmean(t for t, _ in points)
+    mean_v = statistics.fmean(v for _, v in points)
+    var = sum((t - mean_t) ** 2 for t, _ in points)
+    if var == 0:
+        return None
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / var * 3600
+
+
+def run(args):
+    server = StandInServer(latency=args.latency, jitter=args.jitter)
+    dashscope.base_websocket_api_url = server.start()
+    dashscope.api_key = 'standin'
+
+    app = window = None
+    capture = FeedCapture(config.FRAME_MS)
+    if args.mode == 'gui':
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt6.QtWidgets import QApplication
+        from ui.main_window import TranslatorWindow
+        app = QApplication(sys.argv[:1])
+        window = TranslatorWindow(capture=capture)
+        window.show()
+        engine = window.engine
+
+        def switch():
+            window.switch_direction()
+    else:
+        engine = TranslationEngine(capture=capture)
+        engine.start()
+
+        def switch():
+            engine.switch_direction()
+    recorder = RecoveryRecorder(engine)
+
+    def primary_lang():
+        return 'en' if engine.is_zh_to_en else 'zh'
+
+    def do_disconnect():
+        recorder.begin('disconnect')
+        server.drop_connections()
+
+    def do_switch():
+        recorder.begin('switch', 'en' if not engine.is_zh_to_en else 'zh')
+        switch()
+
+    def do_restart():
+        recorder.begin('restart', primary_lang())
+        engine.restart()
+
+    # 各动作错开执行, 避免同时注入
+    actions = []
+    for offset, (interval, action) in enumerate(((args.disconnect_interval, do_disconnect),
+                                                 (args.switch_interval, do_switch),
+                                                 (args.restart_interval, do_restart))):
+        if interval > 0:
+            actions.append([interval, action, args.warmup / 2 + interval * (1 + offset / 3)])
+
+    started = time.monotonic()
+    sampler = Sampler(started, window, args.csv)
+    next_sample = 0.0
+    next_report = args.report_interval
+    print(f"== soak: 模式 {args.mode}, 时长 {args.duration:.0f} 秒, 预热 {args.warmup:.0f} 秒, "
+          f"帧长 {config.FRAME_MS} ms")
+    try:
+        while True:
+            elapsed = time.monotonic() - started
+            if elapsed >= args.duration:
+                break
+            for entry in actions:
+                if elapsed >= entry[2]:
+                    entry[2] += entry[0]
+                    entry[1]()
+            recorder.expire(args.recovery_timeout)
+            if elapsed >= next_sample:
+                next_sample += args.sample_interval
+                row = sampler.sample()
+                if elapsed >= next_report:
+                    next_report += args.report_interval
+                    print(f"[{row['elapsed']:>7.0f}s] RSS {row['rss_mb']} MB, 线程 {row['threads']}, "
+                          f"fd {row['fds']}, Qt 对象 {row['qt_objects']}, 结果 {recorder.results}, "
+                          f"恢复 {sum(len(v) for v in recorder.latencies.values())} 次", flush=True)
+            if app is not None:
+                app.processEvents()
+            time.sleep(0.01)
+        sampler.sample()
+    finally:
+        sampler.close()
+        if window is not None:
+            window.close()
+        else:
+            engine.stop()
+        server.stop()
+
+    return report(args, sampler.samples, recorder, server)
+
+
+def report(args, samples, recorder, server):
+    failures = []
+    print("== 资源 (预热后最初 / 最后三次采样的中位数, 预算为允许的增长)")
+    budgets = {'rss_mb': args.rss_budget, 'threads': args.thread_budget, 'fds': args.fd_budget,
+               'qt_objects': args.qt_budget, 'py_objects': None, 'py_threads': None}
+    for key, budget in budgets.items():
+        first, last = baseline_and_final(samples, args.warmup, key)
+        if first is None:
+            continue
+        growth = last - first
+        slope = slope_per_hour(samples, args.warmup, key)
+        over = budget is not None and growth > budget
+        if over:
+            failures.append(f"{key} 增长 {growth:g}, 超出预算 {budget:g}")
+        slope_text = f", 趋势 {slope:+.1f}/小时" if slope is not None else ''
+        budget_text = f" (预算 {budget:g})" if budget is not None else ''
+        print(f"{key:<12}{first:>10g} → {last:<10g}增长 {growth:+g}{budget_text}{slope_text}"
+              f"{'  超出预算' if over else ''}")
+
+    print("== 恢复时间")
+    for action, values in sorted(recorder.latencies.items()):
+        summarize(f"{action} ({len(values)} 次, 超时 {recorder.missed.get(action, 0)} 次)",
+                  [ms for _, ms in values])
+    for action, count in recorder.missed.items():
+        if count > args.max_missed:
+            failures.append(f"{action} 有 {count} 次未在 {args.recovery_timeout:g} 秒内恢复")
+
+    # 比较前四分之一和后四分之一的恢复时间, 发现随运行时间变慢的情况
+    latencies = [ms for ts, ms in recorder.all_latencies()]
+    if len(latencies) >= 8:
+        quarter = len(latencies) // 4
+        early, late = statistics.median(latencies[:quarter]), statistics.median(latencies[-quarter:])
+        print(f"恢复时间中位数: 开始 {early:.0f} ms → 结束 {late:.0f} ms (预算 +{args.latency_budget:g} ms)")
+        if late - early > args.latency_budget:
+            failures.append(f"恢复时间中位数变长 {late - early:.0f} ms, 超出预算 {args.latency_budget:g} ms")
+    if recorder.superseded:
+        print(f"另有 {recorder.superseded} 次在恢复之前开始了下一个动作, 不计入恢复时间")
+    print(f"结果 {recorder.results} 条, 替身服务统计: {server.stats()}")
+
+    if failures:
+        print("== 失败:")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("== 通过")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='长时间运行的内存、线程和恢复时间测试')
+    parser.add_argument('--mode', choices=('gui', 'engine'), default='gui')
+    parser.add_argument('--duration', type=parse_duration, default=parse_duration('1h'),
+                        help='运行时长, 可用 s / m / h 后缀 (默认 1h)')
+    parser.add_argument('--warmup', type=parse_duration, default=60.0, help='预热时长, 之后的采样作为基线')
+    parser.add_argument('--disconnect-interval', type=float, default=20.0, help='服务端断线间隔 (秒), 0 表示不注入')
+    parser.add_argument('--switch-interval', type=float, default=30.0, help='切换方向间隔 (秒), 0 表示不切换')
+    parser.add_argument('--restart-interval', type=float, default=120.0, help='重启引擎间隔 (秒), 0 表示不重启')
+    parser.add_argument('--recovery-timeout', type=float, default=15.0, help='恢复超时 (秒)')
+    parser.add_argument('--sample-interval', type=float, default=10.0, help='资源采样间隔 (秒)')
+    parser.add_argument('--report-interval', type=float, default=60.0, help='输出进度的间隔 (秒)')
+    parser.add_argument('--csv', help='把采样写入 CSV 文件')
+    parser.add_argument('--rss-budget', type=float, default=30.0, help='允许的 RSS 增长 (MB)')
+    parser.add_argument('--thread-budget', type=int, default=2, help='允许的系统线程数增长')
+    parser.add_argument('--fd-budget', type=int, default=4, help='允许的文件描述符增长')
+    parser.add_argument('--qt-budget', type=int, default=10, help='允许的 Qt 对象数增长')
+    parser.add_argument('--latency-budget', type=float, default=200.0, help='允许的恢复时间中位数增长 (毫秒)')
+    parser.add_argument('--max-missed', type=int, default=0, help='允许的恢复超时次数')
+    parser.add_argument('--latency', type=float, default=0.1, help='替身服务结果延迟 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='替身服务结果延迟抖动 (秒)')
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == '__main__':
+    main()
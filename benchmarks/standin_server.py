@@ -0,0 +1,295 @@
+"""
+本地 DashScope 替身服务
+
+实现实时翻译识别使用的 WebSocket 协议 (run-task / continue-task / finish-task),
+可以让真实的 TranslationRecognizerRealtime 连接到本机, 在没有网络和 API Key 的
+情况下测试完整链路。支持模拟握手延迟、结果延迟与抖动、错误注入和按脚本返回
+中间结果与句子结果:
+
+    python -m benchmarks.standin_server --port 8765 --latency 0.12 --jitter 0.03
+    DASHSCOPE_WEBSOCKET_BASE_URL=ws://127.0.0.1:8765/api-ws/v1/inference python main.py
+
+每个音频帧的前 4 个字节按小端整数解析为帧序号, 附在结果文本末尾 (" #序号"),
+基准测试据此计算从采集到收到结果的延迟。
+"""
+import json
+import time
+import random
+import struct
+import asyncio
+import argparse
+import threading
+
+from aiohttp import web, WSMsgType
+
+WS_PATH = '/api-ws/v1/inference'
+
+DEFAULT_SCRIPT = [
+    {'source': '今天我们讨论一下项目进度', 'translations': {'en': "Let's discuss the project progress today", 'zh': '今天我们讨论一下项目进度'}},
+    {'source': 'the new release is scheduled for next week', 'translations': {'en': 'The new release is scheduled for next week', 'zh': '新版本计划在下周发布'}},
+    {'source': '请大家准备好各自的报告', 'translations': {'en': 'Please have your reports ready', 'zh': '请大家准备好各自的报告'}},
+]
+
+
+class StandInServer:
+    """在后台线程中运行的 DashScope 替身服务"""
+
+    def __init__(self, host='127.0.0.1', port=0, handshake_delay=0.05, latency=0.1, jitter=0.02,
+                 frames_per_result=1, frames_per_sentence=25, error_rate=0.0, drop_rate=0.0,
+                 reject_rate=0.0, script=None, seed=None):
+        self.host = host
+        self.port = port
+        self.handshake_delay = handshake_delay
+        self.latency = latency
+        self.jitter = jitter
+        self.frames_per_result = frames_per_result
+        self.frames_per_sentence = frames_per_sentence
+        self.error_rate = error_rate        # 每个音频帧返回 task-failed 的概率
+        self.drop_rate = drop_rate          # 每个音频帧直接断开连接的概率
+        self.reject_rate = reject_rate      # 拒绝 run-task 的概率
+        self.script = script or DEFAULT_SCRIPT
+        self.random = random.Random(seed)
+
+        self.loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._connections = set()
+
+        # 统计
+        self.tasks_started = 0
+        self.frames_received = 0
+        self.results_sent = 0
+        self.errors_injected = 0
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}{WS_PATH}"
+
+    # ---- 启动与停止 ----
+
+    def start(self):
+        """启动服务, 返回 WebSocket 地址"""
+        self._thread = threading.Thread(target=self._serve, name='standin-server', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self.url
+
+    def _serve(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        app = web.Application()
+        app.router.add_get(WS_PATH, self._handle)
+        self._runner = web.AppRunner(app)
+        self.loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self.loop.run_until_complete(site.start())
+        self.port = self._runner.addresses[0][1]
+        self._ready.set()
+        self.loop.run_forever()
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+    def drop_connections(self):
+        """立即断开所有连接, 模拟网络中断; 返回断开的连接数"""
+        future = asyncio.run_coroutine_threadsafe(self._drop_all(), self.loop)
+        return future.result(timeout=5)
+
+    async def _drop_all(self):
+        connections = list(self._connections)
+        for ws in connections:
+            await ws.close()
+        return len(connections)
+
+    def stats(self):
+        return {
+            'connections': len(self._connections),
+            'tasks_started': self.tasks_started,
+            'frames_received': self.frames_received,
+            'results_sent': self.results_sent,
+            'errors_injected': self.errors_injected,
+        }
+
+    # ---- 协议处理 ----
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._connections.add(ws)
+        try:
+            await TaskSession(self, ws).run()
+        finally:
+            self._connections.discard(ws)
+        return ws
+
+
+class TaskSession:
+    """单个连接上的一次识别任务"""
+
+    def __init__(self, server, ws):
+        self.server = server
+        self.ws = ws
+        self.task_id = None
+        self.languages = ['en']
+        self.frames = 0
+        self.sentence_id = 0
+        self.audio_ms = 0.0        # 已收到的音频时长, 结果中的时间以此为准
+        self.sentence_begin = 0.0
+        self.outbox = asyncio.Queue()
+        self.last_send_at = 0.0
+
+    def _header(self, event, **extra):
+        return {'task_id': self.task_id, 'event': event, 'attributes': {}, **extra}
+
+    async def _send(self, message):
+        if not self.ws.closed:
+            await self.ws.send_str(json.dumps(message, ensure_ascii=False))
+
+    async def _fail(self, code, message):
+        self.server.errors_injected += 1
+        await self._send({'header': self._header('task-failed', error_code=code, error_message=message),
+                          'payload': {}})
+        await self.ws.close()
+
+    async def run(self):
+        server = self.server
+        sender = None
+        try:
+            async for msg in self.ws:
+                if msg.type == WSMsgType.TEXT:
+                    data = json.loads(msg.data)
+                    action = data['header'].get('action')
+                    if action == 'run-task':
+                        self.task_id = data['header'].get('task_id')
+                        parameters = data.get('payload', {}).get('parameters', {})
+                        self.languages = parameters.get('translation_target_languages') or ['en']
+                        await asyncio.sleep(server.handshake_delay)
+                        if server.random.random() < server.reject_rate:
+                            await self._fail('InvalidParameter', 'simulated task rejection')
+                            return
+                        server.tasks_started += 1
+                        await self._send({'header': self._header('task-started'), 'payload': {}})
+                        sender = asyncio.ensure_future(self._sender())
+                    elif action == 'finish-task':
+                        # 等待已排队的结果发送完再结束任务
+                        await self.outbox.put(None)
+                        if sender is not None:
+                            await sender
+                            sender = None
+                        await self._send({'header': self._header('task-finished'),
+                                          'payload': {'output': {}, 'usage': None}})
+                        await self.ws.close()
+                        return
+                elif msg.type == WSMsgType.BINARY:
+                    await self._on_audio(msg.data)
+        finally:
+            if sender is not None:
+                sender.cancel()
+
+    async def _on_audio(self, data):
+        server = self.server
+        server.frames_received += 1
+
+        roll = server.random.random()
+        if roll < server.drop_rate:
+            server.errors_injected += 1
+            await self.ws.close()
+            return
+        if roll < server.drop_rate + server.error_rate:
+            await self._fail('InternalError', 'simulated server error')
+            return
+
+        frame_begin = self.audio_ms
+        self.audio_ms += len(data) / 32   # 16 kHz 单声道 16 位
+        if not data.strip(b'\x00'):
+            # 静音帧不产生识别结果
+            return
+        if self.frames % server.frames_per_sentence == 0:
+            self.sentence_begin = frame_begin
+        self.frames += 1
+        if self.frames % server.frames_per_result:
+            return
+
+        tag = struct.unpack_from('<I', data)[0] if len(data) >= 4 else 0
+        position = (self.frames - 1) % server.frames_per_sentence + 1
+        is_end = position == server.frames_per_sentence
+        message = self._result(tag, position / server.frames_per_sentence, is_end)
+        if is_end:
+            self.sentence_id += 1
+
+        # 模拟网络和识别延迟; 结果按顺序发送, 抖动不会导致乱序
+        delay = max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter))
+        send_at = max(time.monotonic() + delay, self.last_send_at)
+        self.last_send_at = send_at
+        await self.outbox.put((send_at, message))
+
+    def _result(self, tag, progress, is_end):
+        entry = self.server.script[self.sentence_id % len(self.server.script)]
+
+        def reveal(text):
+            return text if is_end else text[:max(1, int(len(text) * progress))]
+
+        now_ms = int(self.audio_ms)
+        common = {'sentence_id': self.sentence_id, 'begin_time': int(self.sentence_begin),
+                  'end_time': now_ms if is_end else None, 'current_time': now_ms,
+                  'words': [], 'sentence_end': is_end}
+        transcription = {**common, 'text': reveal(entry['source'])}
+        translations = [
+            {**common, 'lang': lang, 'text': f"{reveal(entry['translations'].get(lang, entry['source']))} #{tag}"}
+            for lang in self.languages
+        ]
+        return {'header': self._header('result-generated'),
+                'payload': {'output': {'transcription': transcription, 'translations': translations},
+                            'usage': None}}
+
+    async def _sender(self):
+        while True:
+            item = await self.outbox.get()
+            if item is None:
+                return
+            send_at, message = item
+            await asyncio.sleep(max(0.0, send_at - time.monotonic()))
+            await self._send(message)
+            self.server.results_sent += 1
+
+
+def load_script(path):
+    """读取结果脚本: [{"source": 原文, "translations": {"en": 译文, "zh": 译文}}, ...]"""
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地 DashScope 替身服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--handshake-delay', type=float, default=0.05, help='握手延迟 (秒)')
+    parser.add_argument('--latency', type=float, default=0.1, help='结果返回延迟 (秒)')
+    parser.add_argument('--jitter', type=float, default=0.02, help='结果延迟抖动 (秒)')
+    parser.add_argument('--frames-per-sentence', type=int, default=25, help='每句话包含的音频帧数')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='每帧返回 task-failed 的概率')
+    parser.add_argument('--drop-rate', type=float, default=0.0, help='每帧直接断开连接的概率')
+    parser.add_argument('--reject-rate', type=float, default=0.0, help='拒绝建立任务的概率')
+    parser.add_argument('--script', help='结果脚本 JSON 文件')
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.handshake_delay, args.latency, args.jitter,
+                           frames_per_sentence=args.frames_per_sentence, error_rate=args.error_rate,
+                           drop_rate=args.drop_rate, reject_rate=args.reject_rate,
+                           script=load_script(args.script) if args.script else None)
+    print(f"替身服务已启动: {server.start()}")
+    try:
+        while True:
+            time.sleep(5)
+            print(f"统计: {server.stats()}")
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+启动时间基准测试
+
+分别以图形界面 (main.py, Qt offscreen 平台) 和无界面 (python -m translation) 方式
+启动新进程, 连接本地替身服务, 从文件读取音频, 测量:
+
+- 就绪时间: 从启动进程到引擎进入 streaming 状态 (已连接并开始发送音频)
+- 首个结果: 从启动进程到标准输出收到第一条结果 (仅无界面模式)
+- 进程退出后的峰值内存 (RSS)
+
+    python -m benchmarks.startup_time --runs 5
+"""
+import os
+import sys
+import math
+import time
+import wave
+import struct
+import signal
+import argparse
+import tempfile
+import threading
+import subprocess
+
+from .standin_server import StandInServer
+from .switch_latency import summarize
+
+READY_MARKER = '翻译引擎状态: streaming'
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def write_tone(path, seconds=3):
+    with wave.open(path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b''.join(struct.pack('<h', int(8000 * math.sin(2 * math.pi * 440 * i / 16000)))
+                                 for i in range(16000 * seconds)))
+
+
+def launch(mode, audio_path, url, timeout):
+    """启动一次, 返回 (就绪毫秒, 首个结果毫秒, 峰值 RSS MB)"""
+    env = dict(os.environ, DASHSCOPE_WEBSOCKET_BASE_URL=url, DASHSCOPE_API_KEY='standin')
+    if mode == 'gui':
+        env['QT_QPA_PLATFORM'] = 'offscreen'
+        cmd = [sys.executable, 'main.py', '--input', audio_path]
+    else:
+        cmd = [sys.executable, '-m', 'translation', '--input', audio_path, '--loop', '--partials']
+
+    started = time.monotonic()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, encoding='utf-8')
+    times = {}
+    done = threading.Event()
+
+    def watch(stream, key, marker):
+        for line in stream:
+            if key not in times and (marker is None or marker in line):
+                times[key] = (time.monotonic() - started) * 1000
+                if 'ready' in times and ('result' in times or mode == 'gui'):
+                    done.set()
+
+    threading.Thread(target=watch, args=(proc.stderr, 'ready', READY_MARKER), daemon=True).start()
+    threading.Thread(target=watch, args=(proc.stdout, 'result', None), daemon=True).start()
+    done.wait(timeout)
+
+    proc.send_signal(signal.SIGINT if mode == 'headless' else signal.SIGTERM)
+    try:
+        _, _, usage = os.wait4(proc.pid, 0)
+    except ChildProcessError:
+        usage = None
+    proc.returncode = 0
+    rss_mb = usage.ru_maxrss / 1024 if usage is not None else float('nan')
+    return times.get('ready'), times.get('result'), rss_mb
+
+
+def run(modes, runs, timeout):
+    server = StandInServer()
+    url = server.start()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            audio_path = os.path.join(tmp, 'tone.wav')
+            write_tone(audio_path)
+            for mode in modes:
+                # 第一次运行预热磁盘缓存和字节码, 不计入结果
+                launch(mode, audio_path, url, timeout)
+                ready, result, rss = [], [], []
+                for _ in range(runs):
+                    r, f, m = launch(mode, audio_path, url, timeout)
+                    if r is not None:
+                        ready.append(r)
+                    if f is not None:
+                        result.append(f)
+                    rss.append(m)
+                label = '图形界面' if mode == 'gui' else '无界面'
+                print(f"== {label} ({runs} 次, 峰值内存 {max(rss):.0f} MB)")
+                summarize("启动到就绪", ready)
+                if mode == 'headless':
+                    summarize("启动到首个结果", result)
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='图形界面与无界面模式的启动时间基准测试')
+    parser.add_argument('--runs', type=int, default=5, help='每种模式的启动次数')
+    parser.add_argument('--modes', nargs='+', choices=['gui', 'headless'], default=['gui', 'headless'])
+    parser.add_argument('--timeout', type=float, default=20.0, help='每次启动的最长等待时间 (秒)')
+    args = parser.parse_args()
+
+    run(args.modes, args.runs, args.timeout)
+
+
+if __name__ == '__main__':
+    main()
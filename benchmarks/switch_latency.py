@@ -0,0 +1,135 @@
+"""
+翻译方向切换延迟基准测试
+
+测量从调用 TranslationEngine.switch_direction 到收到新方向第一条翻译结果的时间。
+使用本地模拟识别器, 不需要麦克风和网络:
+
+    python -m benchmarks.switch_latency --switches 20 --connect-delay 0.3
+"""
+import time
+import argparse
+import threading
+import statistics
+
+from translation.translator import TranslationEngine
+from utils.config import CHANNELS, SAMPLE_WIDTH, SAMPLE_RATE
+from .fake_recognizer import fake_recognizer_factory
+
+
+class FeedCapture:
+    """按实时速度向缓冲区写入非静音音频帧, 替代麦克风采集"""
+
+    def __init__(self, frame_ms=20):
+        self.frame_ms = frame_ms
+        self._running = threading.Event()
+
+    def open(self, ring):
+        self._running.set()
+        threading.Thread(target=self._feed, args=(ring,), daemon=True).start()
+        return True
+
+    def _feed(self, ring):
+        frame = b'\x01' * (int(SAMPLE_RATE * self.frame_ms / 1000) * CHANNELS * SAMPLE_WIDTH)
+        next_at = time.monotonic()
+        while self._running.is_set():
+            ring.write(frame)
+            next_at += self.frame_ms / 1000
+            time.sleep(max(0.0, next_at - time.monotonic()))
+
+    def close(self):
+        self._running.clear()
+
+
+class ResultRecorder:
+    """记录引擎发布的翻译结果及其到达时间"""
+
+    def __init__(self, engine):
+        self.results = []
+        self.cond = threading.Condition()
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event):
+        with self.cond:
+            self.results.append((event.received_at, event.text))
+            self.cond.notify_all()
+
+    def wait_for(self, prefix, since, timeout=5.0):
+        """等待 since 之后第一条以 prefix 开头的结果, 返回其时间戳"""
+        deadline = since + timeout
+        with self.cond:
+            while True:
+                for ts, text in reversed(self.results):
+                    if ts < since:
+                        break
+                    if text.startswith(prefix):
+                        return ts
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.cond.wait(remaining)
+
+
+def summarize(name, values):
+    values = sorted(values)
+    if not values:
+        print(f"{name}: 无数据")
+        return
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{name}: min {values[0]:.1f} ms, median {statistics.median(values):.1f} ms, "
+          f"p95 {p95:.1f} ms, max {values[-1]:.1f} ms")
+
+
+def start_engine(pool_size, **fake_options):
+    engine = TranslationEngine(
+        capture=FeedCapture(),
+        recognizer_factory=fake_recognizer_factory(**fake_options),
+        pool_size=pool_size
+    )
+    recorder = ResultRecorder(engine)
+    engine.start()
+    recorder.wait_for('[en]', time.monotonic(), timeout=10.0)
+    return engine, recorder
+
+
+def run(switches, interval, preconnect, **fake_options):
+    engine, recorder = start_engine(1 if preconnect else 0, **fake_options)
+
+    call_ms, first_result_ms, missed = [], [], 0
+    for _ in range(switches):
+        time.sleep(interval)
+        t0 = time.monotonic()
+        engine.switch_direction()
+        call_ms.append((time.monotonic() - t0) * 1000)
+
+        prefix = '[en]' if engine.is_zh_to_en else '[zh]'
+        ts = recorder.wait_for(prefix, t0)
+        if ts is None:
+            missed += 1
+        else:
+            first_result_ms.append((ts - t0) * 1000)
+
+    engine.stop()
+    mode = '预连接' if preconnect else '冷启动'
+    print(f"== {mode}: {switches} 次切换, {missed} 次超时")
+    summarize("switch_direction 调用耗时", call_ms)
+    summarize("切换到首个结果", first_result_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='翻译方向切换延迟基准测试')
+    parser.add_argument('--switches', type=int, default=20)
+    parser.add_argument('--interval', type=float, default=1.0, help='两次切换之间的间隔 (秒)')
+    parser.add_argument('--connect-delay', type=float, default=0.3, help='模拟握手耗时 (秒)')
+    parser.add_argument('--result-delay', type=float, default=0.05, help='模拟识别结果返回耗时 (秒)')
+    parser.add_argument('--mode', choices=['warm', 'cold', 'both'], default='both')
+    args = parser.parse_args()
+
+    fake_options = {'connect_delay': args.connect_delay, 'result_delay': args.result_delay}
+    if args.mode in ('warm', 'both'):
+        run(args.switches, args.interval, True, **fake_options)
+    if args.mode in ('cold', 'both'):
+        run(args.switches, args.interval, False, **fake_options)
+
+
+if __name__ == '__main__':
+    main()
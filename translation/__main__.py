@@ -0,0 +1,6 @@
+"""
+python -m translation: 无界面运行, 见 translation/daemon.py
+"""
+from .daemon import main
+
+main()
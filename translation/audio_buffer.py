@@ -0,0 +1,510 @@
+import time
+import weakref
+import threading
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait as wait_connections
+
+# 缓冲区满时的处理策略
+DROP_OLDEST = 'drop_oldest'   # 丢弃最旧的音频块, 保证上传的是最新音频
+DROP_NEWEST = 'drop_newest'   # 丢弃新到达的音频块, 保证已缓存音频连续
+BLOCK = 'block'               # 写入方等待有限时间 (反压), 超时后丢弃新块
+
+POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class AudioRingBuffer:
+    """固定容量的音频环形缓冲区
+
+    采集端 (PyAudio 回调线程) 写入, 发送线程读取。存储空间在创建时一次性
+    分配, 运行期间不再申请内存。
+    """
+
+    def __init__(self, chunk_bytes, capacity, policy=DROP_OLDEST, block_timeout=0.05):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的缓冲策略: {policy}")
+        if chunk_bytes <= 0 or capacity <= 0:
+            raise ValueError("缓冲区块大小和容量必须为正数")
+
+        self.chunk_bytes = chunk_bytes
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+
+        self._storage = bytearray(chunk_bytes * capacity)
+        self._view = memoryview(self._storage)
+        self._lengths = [0] * capacity
+        self._stamps = [0.0] * capacity   # 每块的写入 (采集) 时间
+        self.last_read_at = None          # 最近读取的一块的采集时间
+        self._head = 0    # 下一个读取的槽位
+        self._count = 0   # 当前缓存的块数
+        self._closed = False
+        self._cond = threading.Condition()
+        self.notify = None   # 写入或关闭时调用, 用于唤醒共享的发送线程
+
+        # 统计计数
+        self.overflow_count = 0   # PortAudio 报告的输入溢出次数
+        self.dropped_chunks = 0   # 因缓冲区满而丢弃的块数
+        self.written_chunks = 0
+        self.read_chunks = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """当前排队等待发送的块数"""
+        return self._count
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def write(self, data):
+        """写入一段音频, 超过单块大小时自动拆分。返回是否全部写入"""
+        ok = True
+        for start in range(0, len(data), self.chunk_bytes):
+            ok = self._write_chunk(data[start:start + self.chunk_bytes]) and ok
+        return ok
+
+    def _write_chunk(self, chunk):
+        with self._cond:
+            if self._closed:
+                return False
+
+            if self._count == self.capacity:
+                if self.policy == BLOCK:
+                    self._cond.wait_for(
+                        lambda: self._count < self.capacity or self._closed,
+                        timeout=self.block_timeout
+                    )
+                    if self._closed:
+                        return False
+                if self._count == self.capacity:
+                    self.dropped_chunks += 1
+                    if self.policy == DROP_OLDEST:
+                        self._head = (self._head + 1) % self.capacity
+                        self._count -= 1
+                    else:
+                        return False
+
+            slot = (self._head + self._count) % self.capacity
+            offset = slot * self.chunk_bytes
+            self._view[offset:offset + len(chunk)] = chunk
+            self._lengths[slot] = len(chunk)
+            self._stamps[slot] = time.monotonic()
+            self._count += 1
+            self.written_chunks += 1
+            if self._count > self.max_depth:
+                self.max_depth = self._count
+            self._cond.notify_all()
+        notify = self.notify
+        if notify is not None:
+            notify()
+        return True
+
+    def read(self, timeout=None):
+        """取出最早的一块音频; 超时或缓冲区已关闭时返回 None"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._count > 0 or self._closed, timeout=timeout):
+                return None
+            if self._count == 0:
+                return None
+
+            slot = self._head
+            offset = slot * self.chunk_bytes
+            data = bytes(self._view[offset:offset + self._lengths[slot]])
+            self.last_read_at = self._stamps[slot]
+            self._head = (self._head + 1) % self.capacity
+            self._count -= 1
+            self.read_chunks += 1
+            self._cond.notify_all()
+            return data
+
+    def wait_readable(self, timeout=None):
+        """等待到有音频可读或缓冲区关闭, 返回是否有音频可读"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._count > 0 or self._closed, timeout=timeout)
+            return self._count > 0
+
+    def clear(self):
+        """丢弃所有已缓存的音频"""
+        with self._cond:
+            self._head = 0
+            self._count = 0
+            self._cond.notify_all()
+
+    def reopen(self):
+        with self._cond:
+            self._closed = False
+            self._head = 0
+            self._count = 0
+
+    def close(self):
+        """关闭缓冲区并唤醒所有等待方"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        notify = self.notify
+        if notify is not None:
+            notify()
+
+    def stats(self):
+        return {
+            'depth': self._count,
+            'max_depth': self.max_depth,
+            'capacity': self.capacity,
+            'overflows': self.overflow_count,
+            'dropped': self.dropped_chunks,
+            'written': self.written_chunks,
+            'read': self.read_chunks,
+        }
+
+
+# 共享内存环形缓冲区头部的计数字段 (各 8 字节), 每个字段只由一方写入
+_WRITE_INDEX = 0    # 已写入的块数 (采集进程)
+_READ_INDEX = 1     # 已读取的块数 (发送线程)
+_OVERFLOWS = 2      # PortAudio 报告的输入溢出次数 (采集进程)
+_DROPPED = 3        # drop_newest / block 策略下缓冲区满而丢弃的块数 (采集进程)
+_WAITING = 4        # 读取方正在等待新数据, 写入后需要唤醒 (发送线程)
+_HEADER_FIELDS = 8
+
+
+class _SharedLayout:
+    """共享内存的布局: 头部计数、每块长度、每块采集时间、音频数据"""
+
+    def __init__(self, shm, chunk_bytes, capacity):
+        buf = shm.buf
+        lengths_at = _HEADER_FIELDS * 8
+        stamps_at = lengths_at + capacity * 8
+        data_at = stamps_at + capacity * 8
+        self.header = buf[:lengths_at].cast('Q')
+        self.lengths = buf[lengths_at:stamps_at].cast('Q')
+        self.stamps = buf[stamps_at:data_at].cast('d')
+        self.data = buf[data_at:data_at + chunk_bytes * capacity]
+
+    @staticmethod
+    def size(chunk_bytes, capacity):
+        return _HEADER_FIELDS * 8 + capacity * (16 + chunk_bytes)
+
+    def release(self):
+        for view in (self.header, self.lengths, self.stamps, self.data):
+            view.release()
+
+
+def _release_shared(layout, shm):
+    layout.release()
+    shm.close()
+    shm.unlink()
+
+
+class SharedAudioRing:
+    """位于共享内存中的音频环形缓冲区, 由采集子进程写入, 发送线程读取
+
+    读取接口与 AudioRingBuffer 相同, 引擎可以直接把它作为音频缓冲区。只有一个
+    写入方和一个读取方, 不需要跨进程的锁: 写入方先写数据再增加写入计数, 读取方
+    复制数据后再增加读取计数。drop_oldest 策略下写入方直接覆盖最旧的块, 读取方
+    复制后再次检查写入计数, 发现读取期间该块已被覆盖时丢弃并计入 dropped。
+
+    读取方等待新数据时在头部置位 _WAITING, 写入方看到后通过管道唤醒它, 因此
+    正常发送时每块音频最多一次管道通知。underruns 统计采集中断: 读取时缓冲区
+    为空, 且距最近一块的采集时间已超过两块的时长。
+    """
+
+    def __init__(self, chunk_bytes, capacity, policy=DROP_OLDEST, block_timeout=0.05, chunk_seconds=None):
+        if policy not in POLICIES:
+            raise ValueError(f"未知的缓冲策略: {policy}")
+        if chunk_bytes <= 0 or capacity <= 0:
+            raise ValueError("缓冲区块大小和容量必须为正数")
+
+        self.chunk_bytes = chunk_bytes
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.chunk_seconds = chunk_seconds
+
+        self.shm = shared_memory.SharedMemory(create=True, size=_SharedLayout.size(chunk_bytes, capacity))
+        self._layout = _SharedLayout(self.shm, chunk_bytes, capacity)
+        self._header = self._layout.header
+        self._wake_recv, self._wake_send = multiprocessing.get_context('spawn').Pipe(duplex=False)
+        self._finalizer = weakref.finalize(self, _release_shared, self._layout, self.shm)
+
+        self._read = 0
+        self._closed = False
+        self._stalled = False
+        self._notify = None
+        self._notify_thread = None
+        self.capturing = False        # 采集进程运行中; 停止后缓冲区读空不计为中断
+        self.last_read_at = None
+
+        # 统计计数 (写入方的计数在共享内存中)
+        self.skipped_chunks = 0       # 读取方跳过的已被覆盖的块数
+        self.underruns = 0
+        self.read_chunks = 0
+        self.max_depth = 0
+
+    def writer_args(self):
+        """传给采集子进程的参数, 由 SharedRingWriter 连接到同一块共享内存"""
+        return (self.shm.name, self.chunk_bytes, self.capacity, self.policy, self.block_timeout,
+                self._wake_send)
+
+    @property
+    def overflow_count(self):
+        return self._header[_OVERFLOWS]
+
+    @property
+    def dropped_chunks(self):
+        return self._header[_DROPPED] + self.skipped_chunks
+
+    @property
+    def written_chunks(self):
+        return self._header[_WRITE_INDEX]
+
+    @property
+    def depth(self):
+        return min(self.capacity, self._header[_WRITE_INDEX] - self._read)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def notify(self):
+        return self._notify
+
+    @notify.setter
+    def notify(self, callback):
+        """写入发生在另一个进程, 设置回调后由转发线程在有新数据时调用"""
+        self._notify = callback
+        if callback is not None and self._notify_thread is None:
+            self._notify_thread = threading.Thread(target=self._forward_notify, name='shm-ring-notify', daemon=True)
+            self._notify_thread.start()
+
+    def _forward_notify(self):
+        seen = self._header[_WRITE_INDEX]
+        while self._notify is not None:
+            if self._closed:
+                time.sleep(0.1)
+                continue
+            self._wait_for_write(seen, 0.5)
+            written = self._header[_WRITE_INDEX]
+            callback = self._notify
+            if written != seen and callback is not None:
+                seen = written
+                callback()
+        self._notify_thread = None
+
+    def _wait_for_write(self, seen, timeout):
+        """等待写入计数超过 seen, 或缓冲区关闭, 或超时"""
+        header = self._header
+        header[_WAITING] = 1
+        try:
+            if header[_WRITE_INDEX] != seen or self._closed:
+                return
+            wait_connections([self._wake_recv], timeout)
+            while self._wake_recv.poll():
+                self._wake_recv.recv_bytes()
+        finally:
+            header[_WAITING] = 0
+
+    def write(self, data):
+        raise TypeError("SharedAudioRing 只能由采集子进程通过 SharedRingWriter 写入")
+
+    def read(self, timeout=None):
+        """取出最早的一块音频; 超时或缓冲区已关闭且读空时返回 None"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        header = self._header
+        while True:
+            written = header[_WRITE_INDEX]
+            if written == self._read:
+                self._check_stall(written)
+                if self._closed:
+                    return None
+                remaining = 0.1 if deadline is None else deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._wait_for_write(written, min(remaining, 0.1))
+                continue
+
+            overwrite = self.policy == DROP_OLDEST
+            if overwrite and written - self._read >= self.capacity:
+                # 写入方已覆盖最旧的块, 保留一块余量避免与正在写入的块冲突
+                skip = written - self._read - self.capacity + 1
+                self._read += skip
+                self.skipped_chunks += skip
+            self.max_depth = max(self.max_depth, written - self._read)
+
+            slot = self._read % self.capacity
+            offset = slot * self.chunk_bytes
+            length = self._layout.lengths[slot]
+            stamp = self._layout.stamps[slot]
+            data = bytes(self._layout.data[offset:offset + length])
+            if overwrite and header[_WRITE_INDEX] - self._read >= self.capacity:
+                # 复制期间被覆盖
+                self._read += 1
+                self.skipped_chunks += 1
+                continue
+
+            self._read += 1
+            header[_READ_INDEX] = self._read
+            self.read_chunks += 1
+            self.last_read_at = stamp
+            self._stalled = False
+            return data
+
+    def _check_stall(self, written):
+        if self._stalled or not self.capturing or not written or not self.chunk_seconds:
+            return
+        last_stamp = self._layout.stamps[(written - 1) % self.capacity]
+        if time.monotonic() - last_stamp > 2 * self.chunk_seconds:
+            self.underruns += 1
+            self._stalled = True
+
+    def wait_readable(self, timeout=None):
+        written = self._header[_WRITE_INDEX]
+        if written == self._read and not self._closed:
+            self._wait_for_write(written, 0.1 if timeout is None else timeout)
+        return self._header[_WRITE_INDEX] != self._read
+
+    def clear(self):
+        self._read = self._header[_WRITE_INDEX]
+        self._header[_READ_INDEX] = self._read
+
+    def reopen(self):
+        self._closed = False
+        self._stalled = False
+        self.last_read_at = None
+        while self._wake_recv.poll():
+            self._wake_recv.recv_bytes()
+        self.clear()
+
+    def close(self):
+        self._closed = True
+        try:
+            self._wake_send.send_bytes(b'')
+        except OSError:
+            pass
+        notify = self._notify
+        if notify is not None:
+            notify()
+
+    def stats(self):
+        return {
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+            'capacity': self.capacity,
+            'overflows': self.overflow_count,
+            'underruns': self.underruns,
+            'dropped': self.dropped_chunks,
+            'written': self.written_chunks,
+            'read': self.read_chunks,
+        }
+
+
+class SharedRingWriter:
+    """采集子进程中 SharedAudioRing 的写入端, 接口与 AudioRingBuffer.write 相同"""
+
+    def __init__(self, name, chunk_bytes, capacity, policy, block_timeout, wake):
+        self.chunk_bytes = chunk_bytes
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.wake = wake
+        self.shm = shared_memory.SharedMemory(name=name)
+        self._layout = _SharedLayout(self.shm, chunk_bytes, capacity)
+        self._header = self._layout.header
+        self._written = self._header[_WRITE_INDEX]
+
+    @property
+    def overflow_count(self):
+        return self._header[_OVERFLOWS]
+
+    @overflow_count.setter
+    def overflow_count(self, value):
+        # make_stream_callback 中的 ring.overflow_count += 1
+        self._header[_OVERFLOWS] = value
+
+    def write(self, data):
+        ok = True
+        for start in range(0, len(data), self.chunk_bytes):
+            ok = self._write_chunk(data[start:start + self.chunk_bytes]) and ok
+        return ok
+
+    def _write_chunk(self, chunk):
+        header = self._header
+        if self.policy != DROP_OLDEST and self._written - header[_READ_INDEX] >= self.capacity:
+            if self.policy == BLOCK:
+                deadline = time.monotonic() + self.block_timeout
+                while self._written - header[_READ_INDEX] >= self.capacity and time.monotonic() < deadline:
+                    time.sleep(0.001)
+            if self._written - header[_READ_INDEX] >= self.capacity:
+                header[_DROPPED] += 1
+                return False
+
+        slot = self._written % self.capacity
+        offset = slot * self.chunk_bytes
+        self._layout.data[offset:offset + len(chunk)] = chunk
+        self._layout.lengths[slot] = len(chunk)
+        self._layout.stamps[slot] = time.monotonic()
+        self._written += 1
+        header[_WRITE_INDEX] = self._written
+        if header[_WAITING]:
+            try:
+                self.wake.send_bytes(b'')
+            except OSError:
+                pass
+        return True
+
+    def close(self):
+        self._layout.release()
+        self.shm.close()
+
+
+class ReplayBuffer:
+    """保留最近发送给当前会话的音频
+
+    会话故障时, 服务端尚未给出最终结果的那部分音频 (最后一个句子结束之后发送的
+    音频) 取出来补发给新会话, 短暂断线只会带来延迟而不会丢句。按字节数限制容量,
+    只在发送线程中使用。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._frames = deque()   # (会话, 会话内音频结束位置毫秒, 采集时间, 数据)
+        self._bytes = 0
+
+    def append(self, session, end_ms, captured_at, data):
+        self._frames.append((session, end_ms, captured_at, data))
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            self._bytes -= len(self._frames.popleft()[3])
+
+    def frames_after(self, session, after_ms):
+        """session 在 after_ms 之后发送的音频 [(数据, 采集时间)]"""
+        return [(data, captured_at) for owner, end_ms, captured_at, data in self._frames
+                if owner is session and end_ms > after_ms]
+
+    def clear(self):
+        self._frames.clear()
+        self._bytes = 0
+
+    @property
+    def buffered_bytes(self):
+        return self._bytes
+
+
+def make_stream_callback(ring, convert=None):
+    """生成 PyAudio 回调模式使用的采集函数, 采集到的数据直接写入环形缓冲区
+
+    convert 用于把设备原生格式转换为发送格式, 例如 StreamingResampler.process。
+    """
+    import pyaudio
+
+    def callback(in_data, frame_count, time_info, status):
+        if status & pyaudio.paInputOverflow:
+            ring.overflow_count += 1
+        if convert is not None:
+            in_data = convert(in_data)
+        ring.write(in_data)
+        return (None, pyaudio.paContinue)
+
+    return callback
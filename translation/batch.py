@@ -0,0 +1,203 @@
+"""
+离线批量翻译录音文件
+
+每个文件使用独立的翻译会话, 以高于实时的速度发送音频, 多个文件由有限大小的
+线程池并发处理。每个文件的译文写入输出目录, 结束后输出吞吐量 (音频秒/墙钟秒):
+
+    python -m translation.batch meeting1.wav meeting2.pcm -o transcripts -j 4
+"""
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dashscope.audio.asr import TranslationRecognizerCallback
+from utils.config import (AUDIO_FORMAT, SAMPLE_RATE, CHUNK_SIZE,
+                          TRANSLATION_MODEL, BATCH_WORKERS, BATCH_SEND_SPEED,
+                          BATCH_MAX_ATTEMPTS, BATCH_RETRY_DELAY, EXTRA_TARGET_LANGUAGES,
+                          init_dashscope_api_key)
+from utils.logger import get_logger, setup_logging
+from .capture import audio_duration, iter_audio_chunks
+
+logger = get_logger('batch')
+
+class FileTranslationCallback(TranslationRecognizerCallback):
+    """收集单个文件的识别和翻译结果, 每种目标语言分别保存"""
+
+    def __init__(self, target_languages):
+        self.target_languages = target_languages
+        self.sentences = {lang: {} for lang in target_languages}
+        self.error = None
+
+    def on_error(self, message) -> None:
+        self.error = str(message)
+
+    def on_event(self, request_id, transcription_result, translation_result, usage) -> None:
+        if translation_result is None:
+            return
+        source_text = transcription_result.text if transcription_result else ''
+        for lang in self.target_languages:
+            translation = translation_result.get_translation(lang)
+            if not translation or not translation.text:
+                continue
+            self.sentences[lang][translation.sentence_id] = (
+                getattr(translation, 'begin_time', 0) or 0,
+                getattr(translation, 'end_time', 0) or 0,
+                source_text,
+                translation.text,
+            )
+
+
+class FileTranslationJob:
+    """翻译单个音频文件; 会话出错时按重试策略从头重新翻译"""
+
+    def __init__(self, path, output_dir, is_zh_to_en=True, speed=BATCH_SEND_SPEED,
+                 max_attempts=BATCH_MAX_ATTEMPTS, retry_delay=BATCH_RETRY_DELAY,
+                 recognizer_factory=None, cancel_event=None, extra_languages=EXTRA_TARGET_LANGUAGES):
+        self.path = path
+        self.output_dir = output_dir
+        self.target_lang = 'en' if is_zh_to_en else 'zh'
+        self.target_languages = [self.target_lang] + [lang for lang in extra_languages
+                                                      if lang != self.target_lang]
+        self.speed = speed
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.recognizer_factory = recognizer_factory
+        self.cancel_event = cancel_event or threading.Event()
+
+        self.duration = 0.0
+        self.attempts = 0
+        self.elapsed = 0.0
+        self.output_paths = []
+        self.error = None
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            self.duration = audio_duration(self.path)
+        except Exception as e:
+            # 文件不存在或格式不支持时重试也不会成功, 只记录为失败, 不影响其他文件
+            self.error = str(e) or type(e).__name__
+            logger.warning("无法读取音频文件 %s: %s", os.path.basename(self.path), self.error)
+            self.elapsed = time.monotonic() - started
+            return self
+        for attempt in range(1, self.max_attempts + 1):
+            self.attempts = attempt
+            try:
+                callback = self._translate()
+                self.output_paths = [self._write(lang, callback.sentences[lang])
+                                     for lang in self.target_languages]
+                self.error = None
+                break
+            except Exception as e:
+                self.error = str(e)
+                logger.warning("翻译文件失败 (%s, 第 %d/%d 次): %s", os.path.basename(self.path),
+                               attempt, self.max_attempts, self.error)
+                if attempt < self.max_attempts and not self.cancel_event.wait(self.retry_delay * attempt):
+                    continue
+                break
+        self.elapsed = time.monotonic() - started
+        return self
+
+    def _translate(self):
+        if self.recognizer_factory is None:
+            from dashscope.audio.asr import TranslationRecognizerRealtime
+            self.recognizer_factory = TranslationRecognizerRealtime
+
+        callback = FileTranslationCallback(self.target_languages)
+        recognizer = self.recognizer_factory(
+            model=TRANSLATION_MODEL,
+            format=AUDIO_FORMAT,
+            sample_rate=SAMPLE_RATE,
+            transcription_enabled=True,
+            translation_enabled=True,
+            translation_target_languages=self.target_languages,
+            callback=callback,
+        )
+        recognizer.start()
+        try:
+            chunk_seconds = CHUNK_SIZE / SAMPLE_RATE
+            next_at = time.monotonic()
+            for chunk in iter_audio_chunks(self.path):
+                if callback.error or self.cancel_event.is_set():
+                    break
+                recognizer.send_audio_frame(chunk)
+                if self.speed > 0:
+                    next_at += chunk_seconds / self.speed
+                    time.sleep(max(0.0, next_at - time.monotonic()))
+        finally:
+            # stop 会等待服务端返回剩余结果
+            try:
+                recognizer.stop()
+            except Exception as e:
+                callback.error = callback.error or str(e)
+
+        if self.cancel_event.is_set():
+            raise RuntimeError('已取消')
+        if callback.error:
+            raise RuntimeError(callback.error)
+        return callback
+
+    def _write(self, lang, sentences):
+        name = os.path.splitext(os.path.basename(self.path))[0]
+        output_path = os.path.join(self.output_dir, f"{name}.{lang}.txt")
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for sentence_id in sorted(sentences):
+                begin, end, source, text = sentences[sentence_id]
+                f.write(f"[{format_time(begin)} - {format_time(end)}] {text}\n")
+                if source:
+                    f.write(f"    {source}\n")
+        return output_path
+
+
+def format_time(ms):
+    seconds = ms / 1000
+    return f"{int(seconds // 3600):02d}:{int(seconds % 3600 // 60):02d}:{seconds % 60:06.3f}"
+
+
+def run_batch(paths, output_dir, workers=BATCH_WORKERS, **job_options):
+    """并发翻译多个文件, 返回 (任务列表, 总音频时长, 墙钟耗时)"""
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [FileTranslationJob(path, output_dir, **job_options) for path in paths]
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='batch-translate') as pool:
+        futures = [pool.submit(job.run) for job in jobs]
+        for future in as_completed(futures):
+            job = future.result()
+            status = f"-> {', '.join(job.output_paths)}" if job.error is None else f"失败: {job.error}"
+            print(f"{os.path.basename(job.path)}: {job.duration:.1f} 秒音频, "
+                  f"耗时 {job.elapsed:.1f} 秒 {status}")
+    wall = time.monotonic() - started
+
+    audio = sum(job.duration for job in jobs if job.error is None)
+    failed = sum(1 for job in jobs if job.error is not None)
+    print(f"完成 {len(jobs) - failed}/{len(jobs)} 个文件, 音频 {audio:.1f} 秒, 耗时 {wall:.1f} 秒, "
+          f"吞吐量 {audio / max(wall, 1e-9):.1f} 音频秒/秒")
+    return jobs, audio, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='离线批量翻译录音文件')
+    parser.add_argument('files', nargs='+', help='WAV 文件或 16 kHz 单声道 16 位 PCM 文件')
+    parser.add_argument('-o', '--output-dir', default='transcripts', help='译文输出目录')
+    parser.add_argument('-j', '--workers', type=int, default=BATCH_WORKERS, help='同时翻译的文件数')
+    parser.add_argument('--direction', choices=('zh-en', 'en-zh'), default='zh-en', help='翻译方向')
+    parser.add_argument('--extra-languages', nargs='*', default=EXTRA_TARGET_LANGUAGES,
+                        help='同时翻译的额外目标语言, 例如 ja ko')
+    parser.add_argument('--speed', type=float, default=BATCH_SEND_SPEED,
+                        help='发送速度 (实时倍数), 0 表示不限速')
+    parser.add_argument('--max-attempts', type=int, default=BATCH_MAX_ATTEMPTS, help='每个文件的最多尝试次数')
+    args = parser.parse_args()
+
+    setup_logging()
+    init_dashscope_api_key()
+    jobs, _, _ = run_batch(args.files, args.output_dir, args.workers,
+                           is_zh_to_en=args.direction == 'zh-en', extra_languages=args.extra_languages,
+                           speed=args.speed, max_attempts=args.max_attempts)
+    raise SystemExit(1 if any(job.error for job in jobs) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+"""
+局域网字幕广播
+
+在后台线程中运行 asyncio HTTP 服务, 把翻译结果实时推送给任意多个客户端
+(OBS 浏览器源、参会者的笔记本等):
+
+    ws://主机:端口/ws            WebSocket, 每条消息一条 JSON 结果
+    http://主机:端口/events      Server-Sent Events, 事件类型为 partial / final
+    http://主机:端口/            简单的字幕网页, 可直接作为 OBS 浏览器源
+    http://主机:端口/stats       广播统计
+
+查询参数 lang=en,ja 只接收指定语言, finals=1 只接收定稿结果。
+
+翻译回调线程只把事件放入队列并最多唤醒一次事件循环, 不做序列化和网络 I/O。
+每个客户端有独立的有界发送队列: 同一字幕流 (输入源 + 语言) 尚未发出的中间
+结果被新的中间结果或定稿结果直接取代, 慢客户端只会少收过时的中间结果,
+不会丢失定稿结果; 定稿结果也积压到上限的客户端会被断开, 由客户端重新连接。
+"""
+import json
+import socket
+import asyncio
+import threading
+from collections import deque
+from utils.config import (BROADCAST_HOST, BROADCAST_PORT, BROADCAST_CLIENT_QUEUE, BROADCAST_MAX_CLIENTS,
+                          BROADCAST_HEARTBEAT, BROADCAST_SEND_BUFFER)
+from utils.logger import get_logger
+
+logger = get_logger('broadcast')
+
+PENDING_LIMIT = 10000         # 事件循环处理不过来时, 回调线程最多暂存的事件数
+DRAIN_POLL_INTERVAL = 0.02    # 客户端发送缓冲已满时检查的间隔 (秒)
+
+OVERLAY_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>TransFloat</title>
+<style>
+body { margin: 0; background: transparent; font-family: -apple-system, sans-serif; }
+#captions { position: fixed; left: 5%; right: 5%; bottom: 40px; color: #fff; font-size: 32px;
+            text-shadow: 0 0 6px #000, 0 0 2px #000; }
+.partial { opacity: 0.75; }
+</style></head>
+<body><div id="captions"></div>
+<script>
+const params = new URLSearchParams(location.search);
+const lines = params.get('lines') || 2;
+const box = document.getElementById('captions');
+let finals = [], partial = '';
+function render() {
+  box.innerHTML = '';
+  for (const text of finals) { const d = document.createElement('div'); d.textContent = text; box.appendChild(d); }
+  if (partial) { const d = document.createElement('div'); d.className = 'partial'; d.textContent = partial; box.appendChild(d); }
+}
+function connect() {
+  const ws = new WebSocket(`ws://${location.host}/ws${location.search}`);
+  ws.onmessage = (m) => {
+    const r = JSON.parse(m.data);
+    if (!r.primary && !params.get('lang')) return;
+    if (r.final) { finals.push(r.text); finals = finals.slice(-lines); partial = ''; } else { partial = r.text; }
+    render();
+  };
+  ws.onclose = () => setTimeout(connect, 1000);
+}
+connect();
+</script></body></html>
+"""
+
+
+class Message:
+    """一条结果的序列化内容, 所有客户端共用, 每种格式只序列化一次"""
+
+    __slots__ = ('key', 'is_final', 'text', '_sse')
+
+    def __init__(self, event):
+        self.key = (event.source, event.target_lang)
+        self.is_final = event.is_final
+        self.text = json.dumps(event.to_dict(), ensure_ascii=False)
+        self._sse = None
+
+    @property
+    def sse(self):
+        if self._sse is None:
+            kind = 'final' if self.is_final else 'partial'
+            self._sse = f"event: {kind}\ndata: {self.text}\n\n".encode('utf-8')
+        return self._sse
+
+
+class ClientQueue:
+    """一个客户端的待发送消息, 只在事件循环线程中访问"""
+
+    def __init__(self, transport, langs=None, finals_only=False, max_size=BROADCAST_CLIENT_QUEUE):
+        self.transport = transport
+        self.langs = langs
+        self.finals_only = finals_only
+        self.max_size = max(1, max_size)
+        self.items = deque()
+        self.ready = asyncio.Event()
+        self.closed = False
+
+        self.sent = 0
+        self.superseded = 0   # 被更新结果取代而未发送的中间结果数
+
+    def wants(self, event):
+        if self.finals_only and not event.is_final:
+            return False
+        return self.langs is None or event.target_lang in self.langs
+
+    def put(self, message):
+        """加入一条消息; 定稿结果超出上限时返回 False, 客户端应被断开"""
+        if message.is_final:
+            # 定稿结果取代同一字幕流尚未发送的中间结果
+            if any(not m.is_final and m.key == message.key for m in self.items):
+                kept = deque(m for m in self.items if m.is_final or m.key != message.key)
+                self.superseded += len(self.items) - len(kept)
+                self.items = kept
+            self.items.append(message)
+        else:
+            for i, pending in enumerate(self.items):
+                if not pending.is_final and pending.key == message.key:
+                    # 原位替换, 新的中间结果不必排到队尾
+                    self.items[i] = message
+                    self.superseded += 1
+                    self.ready.set()
+                    return True
+            self.items.append(message)
+
+        while len(self.items) > self.max_size:
+            # 先丢弃最早的中间结果; 全是定稿结果时说明客户端跟不上
+            index = next((i for i, m in enumerate(self.items) if not m.is_final), None)
+            if index is None:
+                return False
+            del self.items[index]
+            self.superseded += 1
+        self.ready.set()
+        return True
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+
+class SubtitleBroadcaster:
+    """把翻译事件广播给 WebSocket 和 SSE 客户端
+
+    用法: SubtitleBroadcaster().attach(engine).start(), 退出时调用 stop()。
+    """
+
+    def __init__(self, host=BROADCAST_HOST, port=BROADCAST_PORT, client_queue=BROADCAST_CLIENT_QUEUE,
+                 max_clients=BROADCAST_MAX_CLIENTS, heartbeat=BROADCAST_HEARTBEAT,
+                 send_buffer=BROADCAST_SEND_BUFFER):
+        self.host = host
+        self.port = port
+        self.client_queue = client_queue
+        self.max_clients = max_clients
+        self.heartbeat = heartbeat
+        self.send_buffer = send_buffer
+
+        self._pending = deque()
+        self._scheduled = False
+        self._clients = set()
+        self._loop = None
+        self._runner = None
+        self._thread = None
+        self._ready = threading.Event()
+
+        self.events = 0
+        self.dropped_pending = 0
+        self.connections = 0
+        self.rejected = 0
+        self.disconnected_slow = 0
+        self.sent = 0           # 已断开客户端的累计值
+        self.superseded = 0
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/"
+
+    def attach(self, engine):
+        engine.subscribe(self.on_event)
+        return self
+
+    # ---- 回调线程 ----
+
+    def on_event(self, event):
+        """在翻译回调线程中调用: 入队, 必要时唤醒事件循环"""
+        loop = self._loop
+        if loop is None or event.is_echo:
+            return
+        if len(self._pending) >= PENDING_LIMIT:
+            self.dropped_pending += 1
+            return
+        self._pending.append(event)
+        if not self._scheduled:
+            self._scheduled = True
+            try:
+                loop.call_soon_threadsafe(self._dispatch)
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+
+    # ---- 事件循环线程 ----
+
+    def _dispatch(self):
+        # 先清除标记再取事件, 之后入队的事件会再次唤醒
+        self._scheduled = False
+        while self._pending:
+            event = self._pending.popleft()
+            self.events += 1
+            if not self._clients:
+                continue
+            message = None
+            for client in list(self._clients):
+                if not client.wants(event):
+                    continue
+                if message is None:
+                    message = Message(event)
+                if not client.put(message):
+                    self._drop_slow(client)
+
+    def _drop_slow(self, client):
+        self.disconnected_slow += 1
+        logger.warning("字幕客户端接收过慢, 已断开 (积压 %d 条定稿结果)", len(client.items))
+        self._remove(client)
+        client.close()
+        if client.transport is not None:
+            client.transport.abort()
+
+    def _remove(self, client):
+        if client in self._clients:
+            self._clients.discard(client)
+            self.sent += client.sent
+            self.superseded += client.superseded
+
+    def _client(self, request):
+        if len(self._clients) >= self.max_clients:
+            self.rejected += 1
+            return None
+        transport = request.transport
+        if self.send_buffer and transport is not None:
+            # 限制内核和传输层缓冲, 积压留在发送队列中, 过时的中间结果才能被合并掉
+            transport.set_write_buffer_limits(high=self.send_buffer)
+            sock = transport.get_extra_info('socket')
+            if sock is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer)
+        langs = request.query.get('lang')
+        client = ClientQueue(request.transport,
+                             langs=set(langs.split(',')) if langs else None,
+                             finals_only=request.query.get('finals') in ('1', 'true'),
+                             max_size=self.client_queue)
+        self._clients.add(client)
+        self.connections += 1
+        return client
+
+    async def _send_loop(self, client, send, ping=None):
+        while not client.closed:
+            if ping is None:
+                await client.ready.wait()
+            else:
+                try:
+                    await asyncio.wait_for(client.ready.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # 定期发送注释行, 及时发现已断开的客户端
+                    await ping()
+                    continue
+            client.ready.clear()
+            while client.items and not client.closed:
+                await send(client.items.popleft())
+                client.sent += 1
+                transport = client.transport
+                while (self.send_buffer and transport is not None and not client.closed
+                       and transport.get_write_buffer_size() > self.send_buffer):
+                    # 客户端接收不及时: 等待缓冲发出, 期间新结果在队列中合并
+                    await asyncio.sleep(DRAIN_POLL_INTERVAL)
+
+    async def _websocket(self, request):
+        from aiohttp import web
+        client = self._client(request)
+        if client is None:
+            raise web.HTTPServiceUnavailable(text='too many clients')
+        ws = web.WebSocketResponse(heartbeat=self.heartbeat or None)
+        await ws.prepare(request)
+
+        async def read():
+            # 读取客户端消息才能处理关闭和心跳帧, 内容忽略
+            async for _ in ws:
+                pass
+            client.close()
+
+        reader = asyncio.ensure_future(read())
+        try:
+            await self._send_loop(client, lambda message: ws.send_str(message.text))
+        except (ConnectionError, RuntimeError):
+            pass
+        finally:
+            self._remove(client)
+            reader.cancel()
+            if not ws.closed:
+                await ws.close()
+        return ws
+
+    async def _sse(self, request):
+        from aiohttp import web
+        client = self._client(request)
+        if client is None:
+            raise web.HTTPServiceUnavailable(text='too many clients')
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream; charset=utf-8',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*',
+        })
+        await response.prepare(request)
+        try:
+            ping = (lambda: response.write(b': ping\n\n')) if self.heartbeat else None
+            await self._send_loop(client, lambda message: response.write(message.sse), ping)
+        except (ConnectionError, RuntimeError):
+            pass
+        finally:
+            self._remove(client)
+        return response
+
+    async def _page(self, request):
+        from aiohttp import web
+        return web.Response(text=OVERLAY_PAGE, content_type='text/html')
+
+    async def _stats(self, request):
+        from aiohttp import web
+        return web.json_response(self.stats())
+
+    async def _start_server(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_get('/', self._page)
+        app.router.add_get('/ws', self._websocket)
+        app.router.add_get('/events', self._sse)
+        app.router.add_get('/stats', self._stats)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port, backlog=max(128, self.max_clients))
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._start_server())
+        except Exception as e:
+            logger.error("字幕广播服务启动失败 (%s:%d): %s", self.host, self.port, e)
+            self._ready.set()
+            loop.close()
+            return
+        self._loop = loop
+        self._ready.set()
+        logger.info("字幕广播: %s (WebSocket /ws, SSE /events)", self.url)
+        loop.run_forever()
+
+        # 停止: 通知所有客户端结束, 再关闭服务
+        for client in list(self._clients):
+            client.close()
+        loop.run_until_complete(self._runner.cleanup())
+        loop.close()
+
+    def start(self, timeout=5.0):
+        """在后台线程中启动服务, 等待端口绑定完成; 返回 self"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='subtitle-broadcast', daemon=True)
+            self._thread.start()
+            self._ready.wait(timeout)
+        return self
+
+    def stop(self, timeout=5.0):
+        loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        clients = list(self._clients)
+        return {
+            'clients': len(clients),
+            'connections': self.connections,
+            'rejected': self.rejected,
+            'events': self.events,
+            'sent': self.sent + sum(c.sent for c in clients),
+            'superseded': self.superseded + sum(c.superseded for c in clients),
+            'max_client_backlog': max((len(c.items) for c in clients), default=0),
+            'disconnected_slow': self.disconnected_slow,
+            'dropped_pending': self.dropped_pending,
+        }
@@ -1,62 +1,69 @@
-import time
-import pyaudio
+import re
+import logging
 from dashscope.audio.asr import TranslationRecognizerCallback, TranscriptionResult, TranslationResult
-from utils.config import SAMPLE_RATE, CHUNK_SIZE, CHANNELS
+from utils.config import LOG_RATE_LIMIT_INTERVAL
+from utils.logger import get_logger, RateLimiter
+from .events import TranslationEvent
+
+logger = get_logger('callback')
+result_log = RateLimiter(LOG_RATE_LIMIT_INTERVAL)
+
+# 自动双向模式下源语言对应显示的译文语言
+AUTO_TARGETS = {'zh': 'en', 'en': 'zh'}
+
+_HAN = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+_LATIN_WORD = re.compile(r'[A-Za-z]+')
+
+
+def detect_language(transcription, default):
+    """一句话的源语言 (zh / en)
+
+    识别结果带有语言字段时直接使用, 否则比较汉字数和英文单词数; 都没有 (如只有数字) 时返回 default。
+    """
+    raw = getattr(transcription, '_raw_data', None)
+    lang = getattr(transcription, 'language', None) or (raw.get('lang') if isinstance(raw, dict) else None)
+    if lang:
+        lang = lang[:2].lower()
+        if lang in AUTO_TARGETS:
+            return lang
+    text = getattr(transcription, 'text', None) or ''
+    han = len(_HAN.findall(text))
+    words = len(_LATIN_WORD.findall(text))
+    if han > words:
+        return 'zh'
+    if words:
+        return 'en'
+    return default
+
 
 class TranslationCallback(TranslationRecognizerCallback):
-    def __init__(self, window):
-        self.window = window
-        self.connection_attempts = 0
-        self.max_attempts = 3
-    
+    def __init__(self, engine, session):
+        self.engine = engine
+        self.session = session
+
+    def _discard_session(self):
+        """备用会话或已被替换的会话断开时, 只需将其从会话池中移除"""
+        self.engine.session_pool.discard(self.session)
+        self.session.stop_async()
+
     def on_open(self) -> None:
-        try:
-            print("初始化音频设备...")
-            
-            # 创建新的音频设备
-            if not self.window.mic:
-                self.window.mic = pyaudio.PyAudio()
-                time.sleep(0.2)  # 等待设备初始化
-            
-            # 创建新的音频流
-            if not self.window.stream:
-                self.window.stream = self.window.mic.open(
-                    format=pyaudio.paInt16,
-                    channels=CHANNELS,
-                    rate=SAMPLE_RATE,
-                    input=True,
-                    frames_per_buffer=CHUNK_SIZE,
-                    start=False
-                )
-                
-                time.sleep(0.2)  # 等待流初始化
-                self.window.stream.start_stream()
-                print("音频流已启动")
-                
-        except Exception as e:
-            print(f"初始化音频设备时出错: {str(e)}")
-            self.connection_attempts += 1
-            if self.connection_attempts < self.max_attempts:
-                print(f"尝试重新连接... ({self.connection_attempts}/{self.max_attempts})")
-                time.sleep(1)
-                self.on_open()
-            else:
-                self.window.cleanup_resources()
+        logger.info("翻译服务连接已建立", extra=self.session.log_fields)
 
     def on_close(self) -> None:
-        print("翻译服务连接已关闭")
-        if self.window.is_recording:  # 只有在正常录音状态下才重新启动
-            self.window.restart_translation()
+        logger.info("翻译服务连接已关闭", extra=self.session.log_fields)
+        if not self.session.is_active:
+            self._discard_session()
+            return
+        if self.engine.is_recording:  # 只有在正常录音状态下才切换到备用会话
+            self.engine.failover(self.session)
 
     def on_error(self, message) -> None:
-        print(f"翻译错误: {message}")
-        self.connection_attempts += 1
-        if self.connection_attempts < self.max_attempts and self.window.is_recording:
-            print(f"尝试重新连接... ({self.connection_attempts}/{self.max_attempts})")
-            time.sleep(1)
-            self.window.restart_translation()
-        else:
-            self.window.cleanup_resources()
+        logger.warning("翻译错误: %s", message, extra=self.session.log_fields)
+        if not self.session.is_active:
+            self._discard_session()
+            return
+        if self.engine.is_recording:
+            self.engine.failover(self.session)
 
     def on_event(
         self,
@@ -65,14 +72,53 @@ class TranslationCallback(TranslationRecognizerCallback):
         translation_result: TranslationResult,
         usage,
     ) -> None:
-        if translation_result is not None and self.window.is_recording:
+        if (translation_result is not None and
+                self.engine.accepting_results and
+                self.session.is_active):
             try:
-                target_lang = 'en' if self.window.is_zh_to_en else 'zh'
-                translation = translation_result.get_translation(target_lang)
-                if translation and translation.text:
-                    print(f"收到翻译结果: {translation.text}")
-                    self.window.signal_emitter.text_signal.emit(translation.text)
-                    self.connection_attempts = 0  # 重置连接尝试次数
+                # 同一会话的多种目标语言分别发布, 由订阅者按语言分发
+                source_text = transcription_result.text if transcription_result else None
+                source_lang, primary_lang = self.session.source_lang, self.session.target_lang
+                if self.session.auto_direction and transcription_result is not None:
+                    # 自动双向: 按这句话的源语言选择显示的译文, 无法判断时沿用上一句的语言
+                    source_lang = detect_language(transcription_result, self.session.last_source_lang)
+                    self.session.last_source_lang = source_lang
+                    primary_lang = AUTO_TARGETS[source_lang]
+                timeline = self.session.timeline
+                glossary = self.engine.glossary
+                if glossary is not None and source_text:
+                    source_text = glossary.apply(source_lang, source_text)
+                for lang in self.session.target_languages:
+                    translation = translation_result.get_translation(lang)
+                    if not translation or not translation.text:
+                        continue
+                    text = translation.text
+                    if glossary is not None:
+                        text = glossary.apply(lang, text)
+                    is_primary = lang == primary_lang
+                    if is_primary:
+                        self.session.mark_result()
+                        result_log.log(logger, logging.DEBUG, self.session.id, "收到翻译结果: %s", text,
+                                       extra={**self.session.log_fields, 'request_id': request_id})
+                        if getattr(translation, 'is_sentence_end', False):
+                            self.session.final_audio_ms = getattr(translation, 'end_time', None) or 0
+                        metrics = self.engine.metrics
+                        if metrics is not None:
+                            metrics.on_result(self.session, translation, request_id, usage)
+                    self.engine.publish(TranslationEvent(
+                        text,
+                        lang,
+                        is_final=bool(getattr(translation, 'is_sentence_end', False)),
+                        sentence_id=getattr(translation, 'sentence_id', None),
+                        source_text=source_text,
+                        request_id=request_id,
+                        is_primary=is_primary,
+                        begin_at=timeline.captured_at(getattr(translation, 'begin_time', None), start=True),
+                        end_at=timeline.captured_at(getattr(translation, 'end_time', None)),
+                        source=self.engine.source,
+                        source_lang=source_lang,
+                        is_echo=self.session.auto_direction and lang == source_lang,
+                    ))
             except Exception as e:
-                print(f"处理翻译结果时出错: {str(e)}")
-                self.on_error(str(e)) 
\ No newline at end of file
+                logger.exception("处理翻译结果时出错", extra=self.session.log_fields)
+                self.on_error(str(e))
@@ -0,0 +1,312 @@
+import os
+import time
+import wave
+import signal
+import functools
+import threading
+import multiprocessing
+from utils.config import (SAMPLE_RATE, CHUNK_SIZE, CHANNELS, SAMPLE_WIDTH, CAPTURE_NATIVE_FORMAT,
+                          CAPTURE_DEVICE_INDEX, CAPTURE_MAX_CHANNELS, CAPTURE_PROCESS,
+                          CAPTURE_PROCESS_START_TIMEOUT, ENGINE_STOP_TIMEOUT)
+from utils.logger import get_logger
+from .audio_buffer import make_stream_callback, SharedAudioRing, SharedRingWriter, DROP_OLDEST
+
+logger = get_logger('capture')
+
+CHUNK_BYTES = CHUNK_SIZE * CHANNELS * SAMPLE_WIDTH
+
+
+def audio_duration(path):
+    """返回音频时长 (秒); .pcm 文件视为 16 kHz 单声道 16 位"""
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as wav:
+            return wav.getnframes() / wav.getframerate()
+    return os.path.getsize(path) / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH)
+
+
+def iter_audio_chunks(path):
+    """逐块读取音频文件, 转换为 16 kHz 单声道后按 CHUNK_SIZE 分块返回"""
+    if not path.lower().endswith('.wav'):
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+
+    with wave.open(path, 'rb') as wav:
+        if wav.getsampwidth() != SAMPLE_WIDTH:
+            raise ValueError(f"仅支持 16 位 PCM 编码的 WAV 文件: {path}")
+        rate, channels = wav.getframerate(), wav.getnchannels()
+        convert = None
+        if (rate, channels) != (SAMPLE_RATE, CHANNELS):
+            from .resample import StreamingResampler
+            convert = StreamingResampler(rate, channels).process
+
+        frames_per_read = CHUNK_SIZE * rate // SAMPLE_RATE
+        while True:
+            data = wav.readframes(frames_per_read)
+            if not data:
+                return
+            yield convert(data) if convert else data
+
+
+class MicrophoneCapture:
+    """麦克风采集: PyAudio 回调模式, 采集到的数据直接写入环形缓冲区
+
+    默认按设备原生采样率和声道数打开输入流, 在回调中转换为 16 kHz 单声道,
+    避免部分 USB / 会议设备打开失败或由系统音频层做低质量重采样。
+    原生格式打开失败时退回直接以 16 kHz 单声道打开。
+    """
+
+    def __init__(self, max_attempts=3, device_index=CAPTURE_DEVICE_INDEX,
+                 native_format=CAPTURE_NATIVE_FORMAT):
+        self.max_attempts = max_attempts
+        self.device_index = device_index
+        self.native_format = native_format
+        self.mic = None
+        self.stream = None
+        self.rate = SAMPLE_RATE
+        self.channels = CHANNELS
+        self.resampler = None
+
+    def _device_format(self):
+        """返回设备的原生采样率和声道数"""
+        if self.device_index is None:
+            info = self.mic.get_default_input_device_info()
+        else:
+            info = self.mic.get_device_info_by_index(self.device_index)
+        rate = int(info['defaultSampleRate'])
+        channels = max(1, min(int(info['maxInputChannels']), CAPTURE_MAX_CHANNELS))
+        return rate, channels
+
+    def open(self, ring):
+        """打开音频设备和输入流, 返回是否成功"""
+        # 用到时才加载 PyAudio, 不采集麦克风的场景 (批量翻译、读取文件) 不需要安装
+        import pyaudio
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                logger.info("初始化音频设备...")
+
+                if not self.mic:
+                    self.mic = pyaudio.PyAudio()
+
+                if not self.stream:
+                    # 第一次尝试使用设备原生格式, 之后退回发送格式
+                    native = self.native_format and attempt == 1
+                    rate, channels = self._device_format() if native else (SAMPLE_RATE, CHANNELS)
+
+                    self.resampler = None
+                    convert = None
+                    if (rate, channels) != (SAMPLE_RATE, CHANNELS):
+                        from .resample import StreamingResampler
+                        self.resampler = StreamingResampler(rate, channels)
+                        convert = self.resampler.process
+
+                    self.stream = self.mic.open(
+                        format=pyaudio.paInt16,
+                        channels=channels,
+                        rate=rate,
+                        input=True,
+                        input_device_index=self.device_index,
+                        # 保持每块的时长与 CHUNK_SIZE 在 16 kHz 下一致
+                        frames_per_buffer=CHUNK_SIZE * rate // SAMPLE_RATE,
+                        stream_callback=make_stream_callback(ring, convert),
+                        start=False
+                    )
+                    self.rate, self.channels = rate, channels
+                    self.stream.start_stream()
+                    logger.info("音频流已启动 (%d Hz, %d 声道)", rate, channels)
+                return True
+
+            except Exception as e:
+                logger.warning("初始化音频设备时出错: %s", e)
+                if attempt < self.max_attempts:
+                    logger.info("尝试重新打开音频设备... (%d/%d)", attempt, self.max_attempts)
+                    time.sleep(1)
+        return False
+
+    def close(self):
+        """关闭音频流并释放音频设备"""
+        if self.stream:
+            try:
+                logger.info("关闭音频流...")
+                if self.stream.is_active():
+                    self.stream.stop_stream()
+                self.stream.close()
+            except Exception as e:
+                logger.warning("关闭音频流时出错: %s", e)
+            finally:
+                self.stream = None
+
+        if self.mic:
+            try:
+                logger.info("终止音频设备...")
+                self.mic.terminate()
+            except Exception as e:
+                logger.warning("终止音频设备时出错: %s", e)
+            finally:
+                self.mic = None
+
+
+class FileCapture:
+    """从音频文件读取并按实时速度写入环形缓冲区, 代替麦克风用于演示和测试
+
+    loop 为 True 时循环播放, 否则读完后持续写入静音, 保持会话不超时。
+    """
+
+    def __init__(self, path, loop=False, speed=1.0):
+        self.path = path
+        self.loop = loop
+        self.speed = speed
+        self._running = threading.Event()
+        self._thread = None
+
+    def open(self, ring):
+        if not os.path.exists(self.path):
+            logger.error("音频文件不存在: %s", self.path)
+            return False
+        self._running.set()
+        self._thread = threading.Thread(target=self._feed, args=(ring,), name='file-capture', daemon=True)
+        self._thread.start()
+        logger.info("从文件读取音频: %s", self.path)
+        return True
+
+    def _feed(self, ring):
+        interval = CHUNK_SIZE / SAMPLE_RATE / self.speed
+        next_at = time.monotonic()
+        try:
+            while self._running.is_set():
+                for chunk in iter_audio_chunks(self.path):
+                    if not self._running.is_set():
+                        return
+                    ring.write(chunk.ljust(CHUNK_BYTES, b'\x00'))
+                    next_at += interval
+                    time.sleep(max(0.0, next_at - time.monotonic()))
+                if self.loop:
+                    continue
+                logger.info("音频文件已读完")
+                silence = bytes(CHUNK_BYTES)
+                while self._running.is_set():
+                    ring.write(silence)
+                    next_at += interval
+                    time.sleep(max(0.0, next_at - time.monotonic()))
+        except Exception as e:
+            logger.error("读取音频文件时出错: %s", e)
+
+    def close(self):
+        self._running.clear()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+        self._thread = None
+
+
+class ProcessCapture:
+    """在单独的子进程中采集音频, 写入共享内存中的环形缓冲区
+
+    子进程有自己的解释器和 GIL, 界面绘制、SDK 回调和垃圾回收不会推迟采集回调;
+    发送线程直接从共享内存读取, 不经过管道序列化。factory 在子进程中创建实际的
+    采集对象 (默认 MicrophoneCapture), 必须可以被 pickle。
+
+    引擎通过 create_buffer 创建共享内存缓冲区, 每次 open 启动一个子进程,
+    close 通知子进程关闭设备后退出, 超时则强制结束。
+    """
+
+    def __init__(self, factory=None, device_index=CAPTURE_DEVICE_INDEX, start_timeout=CAPTURE_PROCESS_START_TIMEOUT,
+                 stop_timeout=ENGINE_STOP_TIMEOUT):
+        self.factory = factory or functools.partial(MicrophoneCapture, device_index=device_index)
+        self.start_timeout = start_timeout
+        self.stop_timeout = stop_timeout
+        self.ring = None
+        self.process = None
+        self._control = None
+
+    def create_buffer(self, chunk_bytes, capacity, policy=DROP_OLDEST, block_timeout=0.05):
+        self.ring = SharedAudioRing(chunk_bytes, capacity, policy, block_timeout,
+                                    chunk_seconds=chunk_bytes / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH))
+        return self.ring
+
+    def open(self, ring):
+        if ring is not self.ring:
+            logger.error("ProcessCapture 只能写入由 create_buffer 创建的共享内存缓冲区")
+            return False
+        if self.process is not None:
+            return True
+
+        # 不使用 fork: 父进程中已有 Qt、SDK 和各种线程
+        context = multiprocessing.get_context('spawn')
+        self._control, child_control = context.Pipe()
+        self.process = context.Process(target=capture_process_main, args=(self.factory, ring.writer_args(), child_control),
+                                       name='audio-capture', daemon=True)
+        self.process.start()
+        child_control.close()
+
+        status = None
+        try:
+            if self._control.poll(self.start_timeout):
+                status = self._control.recv()
+        except (EOFError, OSError):
+            pass
+        if status != 'ready':
+            logger.error("采集子进程启动失败: %s", status or '超时或已退出')
+            self._shutdown()
+            return False
+        ring.capturing = True
+        logger.info("采集子进程已启动 (pid %d)", self.process.pid)
+        return True
+
+    def close(self):
+        if self.ring is not None:
+            self.ring.capturing = False
+        if self.process is not None:
+            self._shutdown()
+
+    def _shutdown(self):
+        process, self.process = self.process, None
+        try:
+            self._control.send('stop')
+        except (OSError, ValueError):
+            pass
+        process.join(self.stop_timeout)
+        if process.is_alive():
+            logger.warning("采集子进程未能及时退出, 强制结束")
+            process.terminate()
+            process.join(1.0)
+        self._control.close()
+        self._control = None
+        logger.info("采集子进程已退出 (退出码 %s)", process.exitcode)
+
+
+def capture_process_main(factory, writer_args, control):
+    """采集子进程入口: 打开采集设备写入共享内存, 直到收到 stop 或父进程退出"""
+    from utils.logger import setup_logging
+    # Ctrl+C 同时发给整个进程组, 由父进程通知子进程按顺序关闭
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    setup_logging()
+
+    writer = SharedRingWriter(*writer_args)
+    capture = None
+    opened = False
+    try:
+        capture = factory()
+        opened = capture.open(writer)
+    except Exception:
+        logger.exception("采集子进程打开设备时出错")
+    try:
+        control.send('ready' if opened else 'failed')
+        while opened:
+            if control.poll(0.5) and control.recv() == 'stop':
+                break
+    except (EOFError, OSError):
+        logger.warning("父进程已退出, 停止采集")
+    finally:
+        if capture is not None:
+            capture.close()
+        writer.close()
+
+
+def default_capture(device_index=CAPTURE_DEVICE_INDEX, process=CAPTURE_PROCESS):
+    """按配置创建麦克风采集: 在当前进程中, 或在单独的采集子进程中"""
+    if process:
+        return ProcessCapture(device_index=device_index)
+    return MicrophoneCapture(device_index=device_index)
@@ -0,0 +1,228 @@
+"""
+无界面运行
+
+不加载 Qt, 在采集设备所在的机器上直接运行翻译引擎, 把结果写到标准输出,
+也可以同时通过 TCP 端口发送给其他程序 (每行一条 JSON):
+
+    python -m translation                          # 默认输入设备, 中译英, 输出定稿的译文
+    python -m translation --direction en-zh --device 2 --format jsonl --partials
+    python -m translation --direction auto         # 中英文混说: 每句话按源语言显示另一种语言的译文
+    python -m translation --listen 0.0.0.0:9000    # 连接后每行收到一条 JSON 结果
+    python -m translation --broadcast 0.0.0.0:8770 # WebSocket / SSE 字幕广播, 见 translation/broadcast.py
+    python -m translation --input meeting.wav      # 按实时速度读取音频文件代替麦克风
+    python -m translation --history history.db     # 保存到历史数据库, 用 python -m translation.history 搜索
+    python -m translation --capture-process        # 在单独的子进程中采集, 不受本进程中其他线程影响
+
+按 Ctrl+C 或发送 SIGTERM 后发送剩余音频、关闭会话再退出。
+"""
+import sys
+import json
+import queue
+import signal
+import socket
+import argparse
+import functools
+import threading
+from utils.config import (AUDIO_SOURCES, AUTO_DIRECTION, CAPTURE_DEVICE_INDEX, CAPTURE_PROCESS, EXPORT_ENABLED, EXPORT_DIR,
+                          BROADCAST_ENABLED, BROADCAST_HOST, BROADCAST_PORT, HISTORY_ENABLED, HISTORY_PATH,
+                          init_dashscope_api_key)
+from utils.logger import get_logger, setup_logging
+from utils.profiles import ProfileWatcher
+from .session_pool import preload_sdk
+
+logger = get_logger('daemon')
+
+_STOP = object()
+
+
+class ResultWriter:
+    """在后台线程中把翻译结果写到标准输出和 TCP 客户端
+
+    回调线程只做一次非阻塞入队; 客户端发送超时或断开时直接关闭该连接,
+    不影响其他客户端和标准输出。
+    """
+
+    def __init__(self, stream=sys.stdout, fmt='text', partials=False, listen=None,
+                 queue_size=1000, send_timeout=1.0):
+        self.stream = stream
+        self.fmt = fmt
+        self.partials = partials
+        self.send_timeout = send_timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._clients = []
+        self._lock = threading.Lock()
+        self._server = None
+
+        self.written = 0
+        self.dropped = 0
+
+        if listen:
+            host, _, port = listen.rpartition(':')
+            self._server = socket.create_server((host or '127.0.0.1', int(port)))
+            threading.Thread(target=self._accept, name='result-listen', daemon=True).start()
+            logger.info("结果输出端口: %s:%d", *self._server.getsockname()[:2])
+
+        self._thread = threading.Thread(target=self._run, name='result-writer', daemon=True)
+        self._thread.start()
+
+    def on_event(self, event):
+        if event.is_echo or (not event.is_final and not self.partials):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _accept(self):
+        while True:
+            try:
+                conn, addr = self._server.accept()
+            except OSError:
+                return
+            conn.settimeout(self.send_timeout)
+            with self._lock:
+                self._clients.append(conn)
+            logger.info("结果客户端已连接: %s:%d", *addr[:2])
+
+    def _format(self, event):
+        if self.fmt == 'jsonl':
+            return json.dumps(event.to_dict(), ensure_ascii=False)
+        prefix = f"{event.source} " if event.source else ''
+        mark = '' if event.is_final else '… '
+        return f"[{prefix}{event.target_lang}] {mark}{event.text}"
+
+    def _send(self, line):
+        with self._lock:
+            clients = list(self._clients)
+        for conn in clients:
+            try:
+                conn.sendall(line)
+            except OSError:
+                with self._lock:
+                    self._clients.remove(conn)
+                conn.close()
+                logger.info("结果客户端已断开")
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            if event is _STOP:
+                return
+            try:
+                self.stream.write(self._format(event) + '\n')
+                self.stream.flush()
+                if self._clients:
+                    self._send((json.dumps(event.to_dict(), ensure_ascii=False) + '\n').encode('utf-8'))
+                self.written += 1
+            except Exception as e:
+                logger.warning("输出翻译结果时出错: %s", e)
+
+    def close(self, timeout=2.0):
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            for conn in self._clients:
+                conn.close()
+            self._clients.clear()
+
+
+def create_engine(args):
+    """按命令行参数创建引擎; 配置了多个输入源且未指定设备或文件时返回 SourceManager
+
+    多输入源时 --direction (指定时) 代替每个输入源配置的方向, --capture-process 对每个输入源生效。
+    """
+    if AUDIO_SOURCES and args.device is None and args.input is None:
+        from .sources import AudioSource, SourceManager
+        return SourceManager([AudioSource.from_config(entry, args.direction, args.capture_process)
+                              for entry in AUDIO_SOURCES])
+
+    direction = args.direction or ('auto' if AUTO_DIRECTION else 'zh-en')
+
+    from .translator import TranslationEngine
+    if args.input:
+        from .capture import FileCapture, ProcessCapture
+        if args.capture_process:
+            capture = ProcessCapture(functools.partial(FileCapture, args.input, loop=args.loop))
+        else:
+            capture = FileCapture(args.input, loop=args.loop)
+    else:
+        from .capture import default_capture
+        capture = default_capture(args.device if args.device is not None else CAPTURE_DEVICE_INDEX,
+                                  process=args.capture_process)
+    return TranslationEngine(is_zh_to_en=direction != 'en-zh', capture=capture,
+                             auto_direction=direction == 'auto')
+
+
+def run(args):
+    init_dashscope_api_key()
+    engine = create_engine(args)
+    profiles = ProfileWatcher().start()
+    profiles.subscribe(engine.apply_settings)
+    writer = ResultWriter(fmt=args.format, partials=args.partials, listen=args.listen)
+    engine.subscribe(writer.on_event)
+
+    exporter = None
+    if args.export or EXPORT_ENABLED:
+        from .export import SubtitleExporter
+        exporter = SubtitleExporter(args.export or EXPORT_DIR).attach(engine)
+
+    history = None
+    if args.history or HISTORY_ENABLED:
+        from .history import HistoryStore
+        history = HistoryStore(args.history or HISTORY_PATH).attach(engine)
+
+    broadcaster = None
+    if args.broadcast or BROADCAST_ENABLED:
+        from .broadcast import SubtitleBroadcaster
+        host, port = BROADCAST_HOST, BROADCAST_PORT
+        if args.broadcast:
+            host, _, port = args.broadcast.rpartition(':')
+        broadcaster = SubtitleBroadcaster(host or BROADCAST_HOST, int(port)).attach(engine).start()
+
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop_event.set())
+
+    engine.start()
+    stop_event.wait(args.duration if args.duration > 0 else None)
+
+    logger.info("正在退出...")
+    profiles.stop()
+    finished = engine.stop()
+    writer.close()
+    if exporter is not None:
+        exporter.close()
+    if history is not None:
+        history.close()
+    if broadcaster is not None:
+        broadcaster.stop()
+    return 0 if finished else 1
+
+
+def main():
+    preload_sdk()
+    parser = argparse.ArgumentParser(description='无界面实时语音翻译')
+    parser.add_argument('--direction', choices=['zh-en', 'en-zh', 'auto'],
+                        help='翻译方向, auto 表示按每句话的源语言自动选择; 默认由 AUTO_DIRECTION 决定, '
+                             '多输入源时默认使用 AUDIO_SOURCES 中各自的方向')
+    parser.add_argument('--device', type=int, help='输入设备编号 (python -m translation.sources 查看)')
+    parser.add_argument('--input', metavar='FILE', help='从 WAV / PCM 文件按实时速度读取音频, 代替麦克风')
+    parser.add_argument('--loop', action='store_true', help='循环读取 --input 指定的文件')
+    parser.add_argument('--capture-process', action='store_true', default=CAPTURE_PROCESS,
+                        help='在单独的子进程中采集音频 (经共享内存传给发送线程)')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text', help='标准输出格式')
+    parser.add_argument('--partials', action='store_true', help='同时输出中间结果')
+    parser.add_argument('--listen', metavar='HOST:PORT', help='通过 TCP 端口发送结果 (每行一条 JSON)')
+    parser.add_argument('--broadcast', metavar='HOST:PORT', help='启动 WebSocket / SSE 字幕广播')
+    parser.add_argument('--export', metavar='DIR', help='把定稿句子保存为字幕文件')
+    parser.add_argument('--history', metavar='DB', help='把定稿句子保存到可搜索的历史数据库 (python -m translation.history 查询)')
+    parser.add_argument('--duration', type=float, default=0, help='运行指定秒数后退出, 0 表示一直运行')
+    args = parser.parse_args()
+
+    setup_logging()
+    sys.exit(run(args))
@@ -0,0 +1,227 @@
+"""
+上传音频编码
+
+把 16 kHz 单声道 PCM 压缩后再交给 SDK 发送, 降低上行带宽。目前支持 Ogg 封装的
+Opus (服务端对 opus 格式要求 Ogg 封装), 需要 opuslib 和系统的 libopus;
+不可用时记录一次警告并回退到 PCM。
+
+每个会话有自己的编码器 (Opus 编码器和 Ogg 流都有状态, 新会话必须从头部页开始),
+编码和发送在 EncodeWorker 线程中按顺序进行, 不占用采集和音频发送线程。
+"""
+import time
+import queue
+import struct
+import logging
+import threading
+from utils.config import (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH, OPUS_BITRATE, OPUS_FRAME_MS, ENCODE_QUEUE_CHUNKS,
+                          LOG_RATE_LIMIT_INTERVAL)
+from utils.logger import get_logger, RateLimiter
+
+logger = get_logger('encoder')
+send_error_log = RateLimiter(LOG_RATE_LIMIT_INTERVAL)
+
+OPUS_GRANULE_RATE = 48000   # Ogg Opus 的 granule 总是按 48 kHz 计
+OPUS_PRE_SKIP = 312         # libopus 默认的编码延迟 (48 kHz 采样数)
+OGG_MAX_SEGMENTS = 255
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def ogg_crc(data):
+    """Ogg 页校验和: 多项式 0x04C11DB7, 初值 0, 不反转"""
+    crc = 0
+    table = _CRC_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ table[(crc >> 24) ^ byte]
+    return crc
+
+
+class OggStream:
+    """把数据包按 Ogg 页封装, 每次 page 调用输出一页"""
+
+    def __init__(self, serial):
+        self.serial = serial
+        self.sequence = 0
+
+    def page(self, packets, granule, first=False, last=False):
+        lacing = bytearray()
+        for packet in packets:
+            lacing.extend(b'\xff' * (len(packet) // 255))
+            lacing.append(len(packet) % 255)
+        if len(lacing) > OGG_MAX_SEGMENTS:
+            raise ValueError("单个 Ogg 页最多 255 个分段")
+        header_type = (0x02 if first else 0) | (0x04 if last else 0)
+        header = struct.pack('<4sBBqIIIB', b'OggS', 0, header_type, granule, self.serial, self.sequence, 0,
+                             len(lacing))
+        page = bytearray(header + lacing + b''.join(packets))
+        struct.pack_into('<I', page, 22, ogg_crc(page))
+        self.sequence += 1
+        return bytes(page)
+
+
+class OpusEncoder:
+    """PCM → Ogg Opus, 第一次 encode 时先输出 OpusHead / OpusTags 两个头部页"""
+
+    format = 'opus'
+
+    def __init__(self, bitrate=OPUS_BITRATE, frame_ms=OPUS_FRAME_MS, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+        import opuslib
+        self.encoder = opuslib.Encoder(sample_rate, channels, opuslib.APPLICATION_VOIP)
+        self.encoder.bitrate = bitrate
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * channels * SAMPLE_WIDTH
+        self.stream = OggStream(id(self) & 0xFFFFFFFF)
+        self._pending = bytearray()
+        self._samples = 0            # 已编码的采样数 (输入采样率)
+        self._started = False
+
+    def _headers(self):
+        head = struct.pack('<8sBBHIhB', b'OpusHead', 1, self.channels, OPUS_PRE_SKIP, self.sample_rate, 0, 0)
+        vendor = b'transfloat'
+        tags = b'OpusTags' + struct.pack('<I', len(vendor)) + vendor + struct.pack('<I', 0)
+        return self.stream.page([head], 0, first=True) + self.stream.page([tags], 0)
+
+    def _granule(self):
+        return OPUS_PRE_SKIP + self._samples * OPUS_GRANULE_RATE // self.sample_rate
+
+    def _encode_pending(self):
+        packets = []
+        view = memoryview(self._pending)
+        offset = 0
+        while len(self._pending) - offset >= self.frame_bytes:
+            packets.append(self.encoder.encode(bytes(view[offset:offset + self.frame_bytes]), self.frame_samples))
+            offset += self.frame_bytes
+            self._samples += self.frame_samples
+        view.release()
+        del self._pending[:offset]
+        return packets
+
+    def _pages(self, packets, last=False):
+        # 每页最多 255 个分段, 按需拆成多页
+        out = []
+        batch, segments = [], 0
+        for packet in packets:
+            need = len(packet) // 255 + 1
+            if batch and segments + need > OGG_MAX_SEGMENTS:
+                out.append(self.stream.page(batch, self._granule()))
+                batch, segments = [], 0
+            batch.append(packet)
+            segments += need
+        if batch or last:
+            out.append(self.stream.page(batch, self._granule(), last=last))
+        return b''.join(out)
+
+    def encode(self, pcm):
+        """返回需要发送的数据 (可能为空); 不足一个 Opus 帧的部分留到下次"""
+        out = b''
+        if not self._started:
+            self._started = True
+            out = self._headers()
+        self._pending.extend(pcm)
+        packets = self._encode_pending()
+        return out + self._pages(packets) if packets else out
+
+    def finish(self):
+        """补齐最后一帧并输出结束页"""
+        if not self._started:
+            return b''
+        if self._pending:
+            self._pending.extend(bytes(self.frame_bytes - len(self._pending)))
+        return self._pages(self._encode_pending(), last=True)
+
+
+ENCODERS = {'opus': OpusEncoder}
+_unavailable = set()
+
+
+def create_encoder(kind):
+    """创建编码器; kind 为 pcm 或编码器不可用时返回 None (按 PCM 发送)"""
+    if kind == 'pcm' or kind in _unavailable:
+        return None
+    try:
+        return ENCODERS[kind]()
+    except Exception as e:
+        _unavailable.add(kind)
+        logger.warning("%s 编码不可用, 改为发送 PCM: %s", kind, e)
+        return None
+
+
+class EncodeWorker:
+    """在单独的线程中为各会话编码并发送音频
+
+    同一会话的音频按提交顺序编码发送; 发送出错时把异常记在会话上, 由发送线程在下一次
+    send_audio_frame 时抛出, 沿用原有的故障切换逻辑。
+    """
+
+    def __init__(self, kind, queue_size=ENCODE_QUEUE_CHUNKS, name='audio-encode'):
+        self.kind = kind
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+        # 统计
+        self.pcm_bytes = 0
+        self.wire_bytes = 0
+        self.encode_seconds = 0.0   # 编码占用的 CPU 时间
+
+    def new_encoder(self):
+        return create_encoder(self.kind)
+
+    def submit(self, session, data):
+        """提交一块 PCM; 队列满时等待 (发送线程反压, 不影响采集)"""
+        self._queue.put((session, data))
+
+    def finish(self, session, timeout=1.0):
+        """发送会话的结束页, 等待此前提交的音频全部发出"""
+        done = threading.Event()
+        try:
+            self._queue.put((session, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            session, data = self._queue.get()
+            encoder = session.encoder
+            started = time.thread_time()
+            try:
+                if isinstance(data, threading.Event):
+                    packet = encoder.finish()
+                else:
+                    packet = encoder.encode(data)
+                    self.pcm_bytes += len(data)
+                self.encode_seconds += time.thread_time() - started
+                if packet:
+                    session.recognizer.send_audio_frame(packet)
+                    self.wire_bytes += len(packet)
+            except Exception as e:
+                session.send_error = e
+                send_error_log.log(logger, logging.WARNING, session.id, "编码或发送音频时出错: %s", e,
+                                   extra=session.log_fields)
+            finally:
+                if isinstance(data, threading.Event):
+                    data.set()
+
+    def stats(self):
+        audio_seconds = self.pcm_bytes / (SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH)
+        return {
+            'format': self.kind,
+            'pcm_bytes': self.pcm_bytes,
+            'wire_bytes': self.wire_bytes,
+            'saved': round(1 - self.wire_bytes / self.pcm_bytes, 3) if self.pcm_bytes else None,
+            'encode_cpu': round(self.encode_seconds / audio_seconds * 100, 2) if audio_seconds else None,
+        }
@@ -0,0 +1,47 @@
+import time
+
+class TranslationEvent:
+    """一条翻译结果
+
+    一个会话可以同时翻译为多种语言, 每种语言的结果各自发布为一条事件;
+    is_primary 表示该语言是当前翻译方向的目标语言。begin_at / end_at 为句子首尾
+    音频的采集时间 (time.monotonic), 无法确定时为 None。source 为输入源名称,
+    只有一个输入源时为 None。source_lang 为这句话的源语言; 自动双向模式下按句识别,
+    is_primary 随之指向另一种语言, 与源语言相同的一侧只是原文, is_echo 为 True,
+    输出、字幕、历史和广播都不记录。
+    """
+
+    def __init__(self, text, target_lang, is_final=False, sentence_id=None,
+                 source_text=None, request_id=None, is_primary=True, begin_at=None, end_at=None,
+                 source=None, source_lang=None, is_echo=False):
+        self.text = text
+        self.target_lang = target_lang
+        self.is_primary = is_primary
+        self.is_final = is_final
+        self.sentence_id = sentence_id
+        self.source_text = source_text
+        self.request_id = request_id
+        self.begin_at = begin_at
+        self.end_at = end_at
+        self.source = source
+        self.source_lang = source_lang
+        self.is_echo = is_echo
+        self.received_at = time.monotonic()
+
+    def to_dict(self):
+        """可 JSON 序列化的字段, 用于输出到标准输出、TCP 和广播客户端"""
+        record = {
+            'time': round(time.time() - (time.monotonic() - self.received_at), 3),
+            'lang': self.target_lang,
+            'final': self.is_final,
+            'text': self.text,
+            'source_text': self.source_text,
+            'sentence_id': self.sentence_id,
+            'request_id': self.request_id,
+            'primary': self.is_primary,
+        }
+        if self.source:
+            record['input'] = self.source
+        if self.source_lang:
+            record['source_lang'] = self.source_lang
+        return record
@@ -0,0 +1,279 @@
+"""
+把定稿的句子流式导出为字幕文件
+
+订阅引擎的翻译事件, 只记录每句话的最终结果 (原文、译文和音频采集时间),
+由后台线程批量写入 SRT / WebVTT / JSONL 文件并定期 fsync。回调线程只做一次
+非阻塞入队, 已写入的句子不在内存中保留, 长时间运行时内存占用保持不变。
+每种目标语言、每种格式各写一个文件:
+
+    subtitles/transfloat-20240101-093000.en.srt
+    subtitles/transfloat-20240101-093000.en.vtt
+    subtitles/transfloat-20240101-093000.en.jsonl
+
+同时翻译多个输入源时, 文件名中加入输入源名称, 例如 transfloat-20240101-093000.mic.en.srt。
+"""
+import os
+import json
+import time
+import queue
+import threading
+from datetime import datetime
+from utils.config import (EXPORT_DIR, EXPORT_FORMATS, EXPORT_LANGUAGES, EXPORT_INCLUDE_SOURCE,
+                          EXPORT_QUEUE_SIZE, EXPORT_BATCH_SIZE, EXPORT_FLUSH_INTERVAL,
+                          EXPORT_FSYNC_INTERVAL)
+from utils.logger import get_logger
+
+logger = get_logger('export')
+
+MIN_CUE_SECONDS = 0.5   # 字幕最短显示时长
+
+_STOP = object()
+
+
+def format_timestamp(seconds, separator):
+    ms = int(round(max(0.0, seconds) * 1000))
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+class Cue:
+    """一句待写入的字幕, 时间为相对导出开始的秒数"""
+
+    __slots__ = ('start', 'end', 'wall_time', 'lang', 'text', 'source', 'sentence_id', 'request_id', 'input')
+
+    def __init__(self, start, end, wall_time, lang, text, source, sentence_id, request_id, input=None):
+        self.start = start
+        self.end = end
+        self.wall_time = wall_time
+        self.lang = lang
+        self.text = text
+        self.source = source
+        self.sentence_id = sentence_id
+        self.request_id = request_id
+        self.input = input   # 输入源名称
+
+    def lines(self, include_source):
+        # 字幕中的空行表示一条字幕结束, 文本中的换行统一替换为空格
+        lines = [' '.join(self.text.split())]
+        if include_source and self.source:
+            lines.append(' '.join(self.source.split()))
+        return lines
+
+
+class SrtWriter:
+    extension = 'srt'
+
+    def __init__(self, f, include_source):
+        self.f = f
+        self.include_source = include_source
+        self.index = 0
+
+    def write(self, cue):
+        self.index += 1
+        self.f.write(f"{self.index}\n"
+                     f"{format_timestamp(cue.start, ',')} --> {format_timestamp(cue.end, ',')}\n"
+                     f"{chr(10).join(cue.lines(self.include_source))}\n\n")
+
+
+class VttWriter:
+    extension = 'vtt'
+
+    def __init__(self, f, include_source):
+        self.f = f
+        self.include_source = include_source
+        if f.tell() == 0:
+            f.write("WEBVTT\n\n")
+
+    def write(self, cue):
+        text = '\n'.join(line.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                         for line in cue.lines(self.include_source))
+        self.f.write(f"{format_timestamp(cue.start, '.')} --> {format_timestamp(cue.end, '.')}\n"
+                     f"{text}\n\n")
+
+
+class JsonlWriter:
+    extension = 'jsonl'
+
+    def __init__(self, f, include_source):
+        self.f = f
+        self.include_source = include_source
+
+    def write(self, cue):
+        record = {
+            'start': round(cue.start, 3),
+            'end': round(cue.end, 3),
+            'time': datetime.fromtimestamp(cue.wall_time).isoformat(timespec='milliseconds'),
+            'lang': cue.lang,
+            'text': cue.text,
+            'source': cue.source,
+            'sentence_id': cue.sentence_id,
+            'request_id': cue.request_id,
+        }
+        if cue.input:
+            record['input'] = cue.input
+        self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+WRITERS = {writer.extension: writer for writer in (SrtWriter, VttWriter, JsonlWriter)}
+
+
+class SubtitleExporter:
+    """把翻译事件中的定稿句子写入字幕文件的后台写入器
+
+    用法: SubtitleExporter().attach(engine), 退出时调用 close() 写完剩余句子。
+    """
+
+    def __init__(self, directory=EXPORT_DIR, formats=EXPORT_FORMATS, languages=EXPORT_LANGUAGES,
+                 include_source=EXPORT_INCLUDE_SOURCE, queue_size=EXPORT_QUEUE_SIZE,
+                 batch_size=EXPORT_BATCH_SIZE, flush_interval=EXPORT_FLUSH_INTERVAL,
+                 fsync_interval=EXPORT_FSYNC_INTERVAL, name=None):
+        unknown = [fmt for fmt in formats if fmt not in WRITERS]
+        if unknown:
+            raise ValueError(f"不支持的字幕格式: {', '.join(unknown)}")
+        self.directory = directory
+        self.formats = list(formats)
+        self.languages = set(languages) if languages else None
+        self.include_source = include_source
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.name = name or time.strftime('transfloat-%Y%m%d-%H%M%S')
+
+        # 字幕时间以导出开始为零点
+        self.started_at = time.monotonic()
+        self.started_wall = time.time()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._writers = {}   # (输入源, 语言, 格式) -> 写入器
+        self._files = []
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.fsyncs = 0
+
+        self._thread = threading.Thread(target=self._run, name='subtitle-export', daemon=True)
+        self._thread.start()
+
+    def attach(self, engine):
+        engine.subscribe(self.on_event)
+        return self
+
+    def on_event(self, event):
+        """在翻译回调线程中调用, 只入队不做任何 I/O"""
+        if not event.is_final or not event.text or event.is_echo:
+            return
+        if self.languages is not None and event.target_lang not in self.languages:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def output_paths(self):
+        return [writer.f.name for writer in self._writers.values()]
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'pending': self._queue.qsize(),
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'fsyncs': self.fsyncs,
+            'files': len(self._files),
+        }
+
+    # ---- 后台写入 ----
+
+    def _cue(self, event):
+        end_at = event.end_at if event.end_at is not None else event.received_at
+        begin_at = event.begin_at if event.begin_at is not None else end_at
+        start = max(0.0, begin_at - self.started_at)
+        end = max(start + MIN_CUE_SECONDS, end_at - self.started_at)
+        return Cue(start, end, self.started_wall + start, event.target_lang, event.text,
+                   event.source_text, event.sentence_id, event.request_id, event.source)
+
+    def _writer(self, input, lang, fmt):
+        key = (input, lang, fmt)
+        writer = self._writers.get(key)
+        if writer is None:
+            os.makedirs(self.directory, exist_ok=True)
+            prefix = f"{self.name}.{input}" if input else self.name
+            path = os.path.join(self.directory, f"{prefix}.{lang}.{fmt}")
+            f = open(path, 'a', encoding='utf-8')
+            self._files.append(f)
+            writer = self._writers[key] = WRITERS[fmt](f, self.include_source)
+            logger.info("字幕导出到 %s", path)
+        return writer
+
+    def _write_batch(self, batch):
+        for event in batch:
+            cue = self._cue(event)
+            for fmt in self.formats:
+                try:
+                    self._writer(cue.input, cue.lang, fmt).write(cue)
+                except OSError as e:
+                    self.errors += 1
+                    logger.warning("写入字幕文件时出错: %s", e)
+            self.written += 1
+
+    def _sync(self, fsync):
+        for f in self._files:
+            try:
+                f.flush()
+                if fsync:
+                    os.fsync(f.fileno())
+            except OSError as e:
+                self.errors += 1
+                logger.warning("写入字幕文件时出错: %s", e)
+        if fsync:
+            self.fsyncs += 1
+
+    def _run(self):
+        last_flush = last_fsync = time.monotonic()
+        dirty = False
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            if batch:
+                self._write_batch(batch)
+                dirty = True
+
+            now = time.monotonic()
+            if dirty and (stopping or now - last_flush >= self.flush_interval):
+                fsync = stopping or now - last_fsync >= self.fsync_interval
+                self._sync(fsync)
+                last_flush = now
+                if fsync:
+                    last_fsync = now
+                    dirty = False
+
+        for f in self._files:
+            f.close()
+
+    def close(self, timeout=5.0):
+        """写完队列中剩余的句子, 落盘并关闭文件"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("字幕导出队列已满, 剩余句子可能未写入")
+            return
+        self._thread.join(timeout)
+        logger.info("字幕导出完成, 共 %d 句 (丢弃 %d)", self.written, self.dropped)
@@ -0,0 +1,201 @@
+"""
+术语表后处理
+
+按文本语言把常见的误译替换为正确的术语 (产品名、人名、缩写等)。每种语言的
+全部术语编译为一个按前缀树组织的正则表达式, 一次扫描完成所有替换, 耗时随
+文本长度线性增长, 与术语数量基本无关, 可以用于每秒多次的中间结果。
+
+术语表文件支持两种格式, 修改后自动重新加载, 不需要重启会话:
+
+    JSON: {"en": {"Tong Yi": "Qwen", "ali cloud": "Alibaba Cloud"}, "zh": {"通义千问": "通义千问"}}
+    TSV:  每行 "语言<TAB>原文<TAB>替换为", # 开头的行为注释
+"""
+import os
+import re
+import json
+import threading
+from utils.config import GLOSSARY_IGNORE_CASE, GLOSSARY_RELOAD_INTERVAL
+from utils.logger import get_logger
+
+logger = get_logger('glossary')
+
+
+def _is_word_char(ch):
+    # 拉丁字母和数字组成的术语只在单词边界处替换, 中日韩文字没有单词边界
+    return ch.isalnum() and ord(ch) < 0x2E80
+
+
+# 与 _is_word_char 对应的字符类
+_WORD = r'[^\W_\u2e80-\U0010ffff]'
+# 以字母或数字开头的术语, 第一个字符之后检查再前一个字符不是字母或数字; 以字母或数字结尾的
+# 术语, 匹配结束后检查下一个字符不是字母或数字。边界写在正则中 (结尾检查在整个前缀树之后,
+# 开头检查在每个首字符之后), 较长的术语不满足边界时由正则引擎回溯到同一位置较短的术语
+_BEGIN = f'(?<!{_WORD}.)'
+_END = f'(?:(?<!{_WORD})|(?!{_WORD}))'
+
+
+def _trie_pattern(node, root=False):
+    """把前缀树转换为正则表达式; 较长的术语优先匹配"""
+    terminal = '' in node
+    leaves, branches = [], []
+    for ch in sorted(ch for ch in node if ch):
+        child = node[ch]
+        begin = _BEGIN if root and _is_word_char(ch) else ''
+        if len(child) == 1 and '' in child and not begin:
+            leaves.append(re.escape(ch))
+        else:
+            branches.append(re.escape(ch) + begin + _trie_pattern(child))
+    if len(leaves) == 1:
+        branches.append(leaves[0])
+    elif leaves:
+        branches.append(f"[{''.join(leaves)}]")
+    if not branches:
+        return ''
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    body = f"(?:{'|'.join(branches)})"
+    return body + '?' if terminal else body
+
+
+class CompiledGlossary:
+    """一种语言的术语表, 编译为单个正则表达式"""
+
+    def __init__(self, terms, ignore_case=GLOSSARY_IGNORE_CASE):
+        self.ignore_case = ignore_case
+        self.replacements = {}
+        trie = {}
+        for term, replacement in terms.items():
+            if not term:
+                continue
+            key = term.lower() if ignore_case else term
+            self.replacements[key] = replacement
+            node = trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        # 忽略大小写时术语统一转为小写, 匹配前把文本转为小写, 比 re.IGNORECASE 快数倍
+        self.pattern = re.compile(_trie_pattern(trie, root=True) + _END) if self.replacements else None
+
+    def __len__(self):
+        return len(self.replacements)
+
+    def apply(self, text):
+        if self.pattern is None or not text:
+            return text
+        haystack = text
+        if self.ignore_case:
+            lowered = text.lower()
+            # 极少数字符转小写后长度会变化, 此时只能按原文匹配
+            if len(lowered) == len(text):
+                haystack = lowered
+
+        parts = []
+        pos = 0
+        for match in self.pattern.finditer(haystack):
+            start, end = match.span()
+            parts.append(text[pos:start])
+            parts.append(self.replacements[match.group()])
+            pos = end
+        if not parts:
+            return text
+        parts.append(text[pos:])
+        return ''.join(parts)
+
+
+def load_terms(path):
+    """读取术语表文件, 返回 {语言: {原文: 替换为}}"""
+    if path.lower().endswith(('.tsv', '.txt')):
+        terms = {}
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.rstrip('\r\n')
+                if not line.strip() or line.lstrip().startswith('#'):
+                    continue
+                fields = line.split('\t')
+                if len(fields) != 3:
+                    raise ValueError(f"{path}:{line_no}: 每行应为 语言<TAB>原文<TAB>替换为")
+                lang, term, replacement = fields
+                terms.setdefault(lang.strip(), {})[term] = replacement
+        return terms
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ValueError(f"{path}: 术语表应为 {{语言: {{原文: 替换为}}}}")
+    return data
+
+
+class Glossary:
+    """按语言应用的术语表, 文件修改后在后台线程中重新编译并原子替换
+
+    apply 可以在任意线程中调用; 重新加载失败时继续使用之前的术语表。
+    """
+
+    def __init__(self, path, ignore_case=GLOSSARY_IGNORE_CASE, reload_interval=GLOSSARY_RELOAD_INTERVAL):
+        self.path = path
+        self.ignore_case = ignore_case
+        self.reload_interval = reload_interval
+        self._compiled = {}
+        self._signature = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.version = 0
+        self.errors = 0
+        self.reload()
+
+    def apply(self, lang, text):
+        compiled = self._compiled.get(lang)
+        return compiled.apply(text) if compiled is not None else text
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def reload(self):
+        """重新读取并编译术语表; 成功返回 True"""
+        signature = self._file_signature()
+        try:
+            terms = load_terms(self.path)
+            compiled = {lang: CompiledGlossary(mapping, self.ignore_case) for lang, mapping in terms.items()}
+        except Exception as e:
+            self.errors += 1
+            self._signature = signature
+            logger.error("加载术语表 %s 失败, 继续使用之前的术语表: %s", self.path, e)
+            return False
+        # 编译完成后整体替换, 正在处理的结果不会看到一半新一半旧的术语表
+        self._compiled = compiled
+        self._signature = signature
+        self.version += 1
+        logger.info("已加载术语表 %s (%s)", self.path,
+                    ', '.join(f"{lang} {len(c)} 条" for lang, c in compiled.items()) or '空')
+        return True
+
+    def check(self):
+        """文件有变化时重新加载"""
+        if self._file_signature() != self._signature:
+            return self.reload()
+        return False
+
+    def start(self):
+        if self.reload_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='glossary-reload', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop_event.wait(self.reload_interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'errors': self.errors,
+            'terms': {lang: len(c) for lang, c in self._compiled.items()},
+        }
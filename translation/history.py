@@ -0,0 +1,285 @@
+"""
+翻译历史记录与搜索
+
+把定稿的句子 (译文、原文、语言、输入源和时间) 保存到本地 SQLite 数据库, 文本区域清空或
+程序退出后仍可按关键词搜索。回调线程只做一次非阻塞入队, 由后台线程按批写入, 每批一个事务;
+数据库使用 WAL 模式, 搜索和写入互不阻塞, 可以在程序运行时直接查询:
+
+    python -m translation.history 项目进度
+    python -m translation.history release --lang zh --since 2024-05-01 --limit 50
+    python -m translation.history --stats
+
+全文索引为 FTS5: 中日韩文字逐字建立索引 (其他文字按单词), 查询时每个词按短语匹配,
+一两个字的中文关键词也能搜索。结果按时间从新到旧返回, 找到 limit 条即停止, 数据量达到
+数百万句时查询仍在毫秒级。
+"""
+import os
+import re
+import sys
+import json
+import time
+import queue
+import sqlite3
+import argparse
+import threading
+from datetime import datetime
+from utils.config import (HISTORY_PATH, HISTORY_QUEUE_SIZE, HISTORY_BATCH_SIZE, HISTORY_FLUSH_INTERVAL)
+from utils.logger import get_logger
+
+logger = get_logger('history')
+
+_STOP = object()
+
+# 中日韩文字没有空格分词, 逐字作为索引词
+_CJK = re.compile(r'([\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff])')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentences (
+    id INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    run TEXT,
+    input TEXT,
+    lang TEXT NOT NULL,
+    text TEXT NOT NULL,
+    source_lang TEXT,
+    source_text TEXT,
+    sentence_id INTEGER,
+    request_id TEXT
+);
+CREATE INDEX IF NOT EXISTS sentences_time ON sentences(time);
+CREATE VIRTUAL TABLE IF NOT EXISTS sentences_fts USING fts5(
+    text, source_text, content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+
+def index_text(text):
+    """建立索引用的文本: 中日韩文字之间加空格"""
+    return _CJK.sub(r' \1 ', text) if text else ''
+
+
+def match_query(query):
+    """把搜索词转换为 FTS5 查询: 每个词 (按空白分隔) 为一个短语, 全部匹配; 没有可搜索的词时返回 None"""
+    phrases = []
+    for term in query.split():
+        tokens = index_text(term).split()
+        if tokens:
+            phrases.append('"' + ' '.join(tokens).replace('"', '""') + '"')
+    return ' AND '.join(phrases) or None
+
+
+class HistoryDB:
+    """历史数据库连接; 只能在创建它的线程中使用"""
+
+    def __init__(self, path=HISTORY_PATH, readonly=False):
+        self.path = path
+        if readonly:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"历史数据库不存在: {path}")
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            # WAL 模式下 NORMAL 只在检查点时 fsync, 断电最多丢失最近几批
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(SCHEMA)
+
+    def insert(self, records):
+        """在一个事务中写入多句, records 为 (time, run, input, lang, text, source_lang, source_text,
+        sentence_id, request_id)"""
+        with self.conn:
+            cursor = self.conn.cursor()
+            for record in records:
+                cursor.execute('INSERT INTO sentences (time, run, input, lang, text, source_lang, source_text, '
+                               'sentence_id, request_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', record)
+                cursor.execute('INSERT INTO sentences_fts (rowid, text, source_text) VALUES (?, ?, ?)',
+                               (cursor.lastrowid, index_text(record[4]), index_text(record[6])))
+
+    def search(self, query, limit=20, lang=None, input=None, since=None, until=None):
+        """按关键词搜索译文和原文, 返回从新到旧的 dict 列表"""
+        match = match_query(query)
+        if match is None:
+            return []
+        sql = ['SELECT s.id, s.time, s.run, s.input, s.lang, s.text, s.source_lang, s.source_text '
+               'FROM sentences_fts JOIN sentences s ON s.id = sentences_fts.rowid WHERE sentences_fts MATCH ?']
+        params = [match]
+        for clause, value in (('s.lang = ?', lang), ('s.input = ?', input),
+                              ('s.time >= ?', since), ('s.time < ?', until)):
+            if value is not None:
+                sql.append(clause)
+                params.append(value)
+        params.append(limit)
+        rows = self.conn.execute(' AND '.join(sql) + ' ORDER BY sentences_fts.rowid DESC LIMIT ?', params)
+        columns = ('id', 'time', 'run', 'input', 'lang', 'text', 'source_lang', 'source_text')
+        return [dict(zip(columns, row)) for row in rows]
+
+    def stats(self):
+        count, first, last = self.conn.execute('SELECT count(*), min(time), max(time) FROM sentences').fetchone()
+        size = sum(os.path.getsize(self.path + suffix) for suffix in ('', '-wal') if os.path.exists(self.path + suffix))
+        return {'sentences': count, 'first': first, 'last': last, 'bytes': size}
+
+    def close(self):
+        self.conn.close()
+
+
+class HistoryStore:
+    """把翻译事件中的定稿句子写入历史数据库的后台写入器
+
+    用法: HistoryStore().attach(engine), 退出时调用 close() 写完剩余句子。
+    """
+
+    def __init__(self, path=HISTORY_PATH, queue_size=HISTORY_QUEUE_SIZE, batch_size=HISTORY_BATCH_SIZE,
+                 flush_interval=HISTORY_FLUSH_INTERVAL, run=None):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.run = run or time.strftime('%Y%m%d-%H%M%S')
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._opened = threading.Event()
+        self._error = None
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+        self._thread.start()
+        self._opened.wait()
+        if self._error is not None:
+            raise self._error
+
+    def attach(self, engine):
+        engine.subscribe(self.on_event)
+        return self
+
+    def on_event(self, event):
+        """在翻译回调线程中调用, 只入队不做任何 I/O"""
+        if not event.is_final or not event.text or event.is_echo:
+            return
+        # 按采集时间记录, 没有时使用收到结果的时间
+        at = event.begin_at if event.begin_at is not None else event.received_at
+        record = (round(time.time() - (time.monotonic() - at), 3), self.run, event.source, event.target_lang,
+                  event.text, event.source_lang, event.source_text, event.sentence_id, event.request_id)
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'pending': self._queue.qsize(),
+            'dropped': self.dropped,
+            'errors': self.errors,
+            'batches': self.batches,
+        }
+
+    # ---- 后台写入 ----
+
+    def _run(self):
+        try:
+            db = HistoryDB(self.path)
+        except Exception as e:
+            self._error = e
+            self._opened.set()
+            return
+        self._opened.set()
+        logger.info("翻译历史保存到 %s", self.path)
+
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                # 第一句到达后最多再等 flush_interval 秒, 凑成一批写入
+                item = self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+                while True:
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    db.insert(batch)
+                    self.written += len(batch)
+                    self.batches += 1
+                except sqlite3.Error as e:
+                    self.errors += 1
+                    logger.warning("写入翻译历史时出错: %s", e)
+        db.close()
+
+    def close(self, timeout=5.0):
+        """写完队列中剩余的句子并关闭数据库"""
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.warning("翻译历史队列已满, 剩余句子可能未写入")
+            return
+        self._thread.join(timeout)
+        logger.info("翻译历史写入完成, 共 %d 句 (丢弃 %d)", self.written, self.dropped)
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜索翻译历史')
+    parser.add_argument('query', nargs='*', help='关键词, 多个关键词需全部出现在译文或原文中')
+    parser.add_argument('--db', default=HISTORY_PATH, help='历史数据库路径')
+    parser.add_argument('--lang', help='只搜索指定目标语言的译文, 例如 en')
+    parser.add_argument('--input', help='只搜索指定输入源')
+    parser.add_argument('--since', type=parse_date, help='起始日期或时间, 例如 2024-05-01 或 2024-05-01T09:30')
+    parser.add_argument('--until', type=parse_date, help='结束日期或时间 (不含)')
+    parser.add_argument('--limit', type=int, default=20, help='最多显示的句子数')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text', help='输出格式')
+    parser.add_argument('--stats', action='store_true', help='显示数据库中的句子数和时间范围')
+    args = parser.parse_args()
+
+    try:
+        db = HistoryDB(args.db, readonly=True)
+    except (FileNotFoundError, sqlite3.Error) as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if args.stats or not args.query:
+            stats = db.stats()
+            span = ''
+            if stats['sentences']:
+                span = (f", {datetime.fromtimestamp(stats['first']):%Y-%m-%d %H:%M} ~ "
+                        f"{datetime.fromtimestamp(stats['last']):%Y-%m-%d %H:%M}")
+            print(f"{args.db}: {stats['sentences']} 句, {stats['bytes'] / 1e6:.1f} MB{span}")
+            return 0
+
+        started = time.perf_counter()
+        results = db.search(' '.join(args.query), args.limit, args.lang, args.input, args.since, args.until)
+        elapsed = (time.perf_counter() - started) * 1000
+        for row in results:
+            if args.format == 'jsonl':
+                print(json.dumps(row, ensure_ascii=False))
+                continue
+            prefix = f"{row['input']} " if row['input'] else ''
+            print(f"{datetime.fromtimestamp(row['time']):%Y-%m-%d %H:%M:%S}  [{prefix}{row['lang']}] {row['text']}")
+            if row['source_text'] and row['source_text'] != row['text']:
+                print(f"{'':21}{row['source_text']}")
+        print(f"{len(results)} 条结果, 耗时 {elapsed:.1f} ms", file=sys.stderr)
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import bisect
+import json
+import os
+import threading
+import time
+import weakref
+from collections import deque, OrderedDict
+from utils.config import (METRICS_WINDOW, METRICS_USAGE_REQUESTS, METRICS_HTTP_PORT, METRICS_DUMP_PATH,
+                          METRICS_DUMP_INTERVAL)
+from utils.logger import get_logger
+
+logger = get_logger('metrics')
+
+# 直方图桶上限 (毫秒)
+BUCKETS_MS = (10, 20, 50, 100, 200, 300, 500, 750, 1000, 2000, 5000)
+
+class RollingHistogram:
+    """保留最近 window 个样本的直方图"""
+
+    def __init__(self, window=METRICS_WINDOW):
+        self.values = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, value):
+        self.values.append(value)
+        self.total += 1
+
+    def snapshot(self):
+        values = sorted(self.values)
+        if not values:
+            return {'count': self.total}
+
+        def pct(p):
+            return round(values[min(len(values) - 1, int(len(values) * p))], 1)
+
+        buckets = {}
+        for edge in BUCKETS_MS:
+            buckets[f"le_{edge}"] = bisect.bisect_right(values, edge)
+        buckets['le_inf'] = len(values)
+        return {
+            'count': self.total,
+            'window': len(values),
+            'min': round(values[0], 1),
+            'p50': pct(0.5),
+            'p90': pct(0.9),
+            'p99': pct(0.99),
+            'max': round(values[-1], 1),
+            'buckets': buckets,
+        }
+
+
+class LatencyMetrics:
+    """逐句延迟统计
+
+    音频块在采集、发送和收到结果时打时间戳, 结果中的音频时间 (begin_time /
+    current_time / end_time) 通过会话的音频时间线对应回采集时间。关闭统计时引擎
+    不创建本对象, 热路径上只有一次 None 判断。
+    """
+
+    def __init__(self, window=METRICS_WINDOW, usage_requests=METRICS_USAGE_REQUESTS):
+        self.started_at = time.monotonic()
+        self.histograms = {name: RollingHistogram(window) for name in (
+            'capture_to_send_ms',    # 音频在缓冲区中等待的时间
+            'send_to_result_ms',     # 发送到收到对应结果
+            'capture_to_result_ms',  # 采集到收到对应结果
+            'first_partial_ms',      # 句子开始采集到收到该句第一条结果
+            'final_ms',              # 句子结束采集到收到该句最终结果
+            'result_to_paint_ms',    # 收到结果到界面绘制完成
+            'paint_ms',              # 界面单次绘制耗时
+        )}
+        self.counters = {'chunks_sent': 0, 'results': 0, 'sentences': 0, 'paints': 0}
+        # 用量的数值字段累计总和, 以及最近 usage_requests 个请求各自最后一次的用量
+        self.usage_totals = {}
+        self.usage = OrderedDict()
+        self.usage_requests = usage_requests
+        self._sentences = weakref.WeakKeyDictionary()   # 会话 -> {sentence_id: 首个结果时间}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value):
+        with self._lock:
+            self.histograms[name].add(value)
+
+    def on_send(self, session, nbytes, captured_at=None, sent_at=None):
+        if captured_at is None:
+            return
+        now = sent_at or time.monotonic()
+        with self._lock:
+            self.counters['chunks_sent'] += 1
+            self.histograms['capture_to_send_ms'].add((now - captured_at) * 1000)
+
+    def on_result(self, session, translation, request_id=None, usage=None, received_at=None):
+        now = received_at or time.monotonic()
+        is_final = bool(getattr(translation, 'is_sentence_end', False))
+        current = getattr(translation, 'end_time', None)
+        begin = getattr(translation, 'begin_time', None)
+        sentence_id = getattr(translation, 'sentence_id', None)
+
+        timeline = session.timeline
+        with self._lock:
+            self.counters['results'] += 1
+            if request_id and usage:
+                self._add_usage(request_id, usage)
+
+            sentences = self._sentences.get(session)
+            if sentences is None:
+                sentences = self._sentences[session] = {}
+
+            if current is not None:
+                captured_at, sent_at = timeline.lookup(current)
+                if captured_at is not None:
+                    self.histograms['capture_to_result_ms'].add((now - captured_at) * 1000)
+                    if is_final:
+                        self.histograms['final_ms'].add((now - captured_at) * 1000)
+                if sent_at is not None:
+                    self.histograms['send_to_result_ms'].add((now - sent_at) * 1000)
+
+            if sentence_id is not None and sentence_id not in sentences:
+                sentences[sentence_id] = now
+                self.counters['sentences'] += 1
+                if begin is not None:
+                    captured_at, _ = timeline.lookup(begin, start=True)
+                    if captured_at is not None:
+                        self.histograms['first_partial_ms'].add((now - captured_at) * 1000)
+            if is_final:
+                sentences.pop(sentence_id, None)
+
+    def _add_usage(self, request_id, usage):
+        if isinstance(usage, dict):
+            for key, value in usage.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.usage_totals[key] = self.usage_totals.get(key, 0) + value
+        self.usage[request_id] = usage
+        self.usage.move_to_end(request_id)
+        while len(self.usage) > self.usage_requests:
+            self.usage.popitem(last=False)
+
+    def on_paint(self, received_at, started_at, finished_at):
+        """界面绘制完成; received_at 为本次绘制中最早的结果到达时间"""
+        with self._lock:
+            self.counters['paints'] += 1
+            self.histograms['paint_ms'].add((finished_at - started_at) * 1000)
+            if received_at is not None:
+                self.histograms['result_to_paint_ms'].add((finished_at - received_at) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime_s': round(time.monotonic() - self.started_at, 1),
+                'counters': dict(self.counters),
+                'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+                'usage': {'totals': dict(self.usage_totals), 'requests': dict(self.usage)},
+            }
+
+
+class MetricsExporter:
+    """通过 HTTP 接口和/或定期写入 JSON 文件导出统计"""
+
+    def __init__(self, source, http_port=METRICS_HTTP_PORT, dump_path=METRICS_DUMP_PATH,
+                 dump_interval=METRICS_DUMP_INTERVAL):
+        self.source = source   # 返回可序列化统计的函数
+        self.http_port = http_port
+        self.dump_path = dump_path
+        self.dump_interval = dump_interval
+        self._server = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        if self.http_port:
+            self._start_http()
+        if self.dump_path:
+            threading.Thread(target=self._dump_loop, name='metrics-dump', daemon=True).start()
+
+    def _start_http(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        source = self.source
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') not in ('', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps(source(), ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        try:
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.http_port), Handler)
+        except OSError as e:
+            logger.error("无法启动统计接口 (端口 %d): %s", self.http_port, e)
+            return
+        threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        logger.info("统计接口: http://127.0.0.1:%d/metrics", self._server.server_address[1])
+
+    def _dump_loop(self):
+        while not self._stop_event.wait(self.dump_interval):
+            self.dump()
+
+    def dump(self):
+        """原子地写入统计文件, 读取方不会看到写了一半的内容"""
+        tmp_path = f"{self.dump_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.source(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.dump_path)
+        except Exception as e:
+            logger.warning("写入统计文件时出错: %s", e)
+
+    def stop(self):
+        self._stop_event.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
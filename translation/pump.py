@@ -0,0 +1,244 @@
+"""
+音频发送
+
+AudioPump 从引擎的环形缓冲区取出音频发送给当前会话, 每次 step 最多处理一块,
+不会阻塞。单个引擎在自己的线程中运行 AudioPump; 多个输入源同时翻译时由
+PumpScheduler 在一个线程中轮流驱动所有引擎的 AudioPump, 环形缓冲区写入时
+唤醒调度线程, 没有音频时不占用 CPU。
+"""
+import time
+import logging
+import threading
+from collections import deque
+from utils.config import BUFFER_STATS_INTERVAL, LOG_RATE_LIMIT_INTERVAL, PUMP_BURST
+from utils.logger import get_logger, RateLimiter
+from .timeline import BYTES_PER_MS
+
+logger = get_logger('pump')
+send_error_log = RateLimiter(LOG_RATE_LIMIT_INTERVAL)
+
+# step 的返回值
+SENT = 'sent'   # 处理了一块音频, 可能还有更多
+IDLE = 'idle'   # 暂时没有可发送的音频
+DONE = 'done'   # 已停止且缓冲区中的音频已发完
+
+
+class AudioPump:
+    """从环形缓冲区取出音频并发送; 停止后把缓冲区剩余音频发完
+
+    采集在 PyAudio 回调线程中进行, 网络发送阻塞不会影响采集。
+    启用 VAD 时只发送语音部分。
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.pending = deque()          # 等待补发给新会话的 (数据, 采集时间)
+        self.pending_direction = None
+        self.silence = bytes(engine.audio_buffer.chunk_bytes)
+        self.error_count = 0
+        self.resume_at = 0.0            # 发送出错后暂停到此时间
+        self.last_stats = engine.audio_buffer.stats()
+        self.last_report = self.last_maintenance = time.monotonic()
+
+    def _maintain(self, now):
+        audio_buffer = self.engine.audio_buffer
+        self.last_report, self.last_stats = report_buffer_stats(audio_buffer, self.last_report, self.last_stats,
+                                                                self.engine.log_fields)
+        if now - self.last_maintenance >= 1.0:
+            # 备用会话保活并补充会话池
+            pool = self.engine.session_pool
+            pool.keep_alive(self.silence)
+            pool.refill()
+            self.last_maintenance = now
+
+    def _take_replay(self, translator):
+        """把故障会话中未定稿的音频放到待发送队列最前面, 按发送顺序排列"""
+        engine = self.engine
+        frames = []
+        while engine._replay_requests:
+            failed, after_ms = engine._replay_requests.popleft()
+            frames.extend(engine.replay_buffer.frames_after(failed, after_ms))
+            self.pending_direction = failed.is_zh_to_en
+        engine.replay_buffer.clear()
+        self.pending.extendleft(reversed(frames))
+        if frames:
+            logger.info("补发 %d 块未定稿的音频", len(frames), extra=translator.log_fields)
+
+    def step(self, stopping):
+        engine = self.engine
+        now = time.monotonic()
+        if not stopping:
+            self._maintain(now)
+            if now < self.resume_at:
+                return IDLE
+
+        translator = engine.translator
+        if translator is None:
+            # 会话切换中, 音频暂存在缓冲区
+            return DONE if stopping else IDLE
+
+        if engine._replay_requests:
+            self._take_replay(translator)
+        if self.pending and self.pending_direction != translator.is_zh_to_en:
+            # 已切换方向, 不再补发
+            self.pending.clear()
+
+        if self.pending:
+            frame, captured_at = self.pending.popleft()
+            frames = (frame,)
+            engine.replayed_chunks += 1
+        else:
+            audio_buffer = engine.audio_buffer
+            data = audio_buffer.read(timeout=0)
+            if data is None:
+                return DONE if stopping else IDLE
+            captured_at = audio_buffer.last_read_at
+            frames = engine.vad.process(data) if engine.vad is not None else (data,)
+
+        max_catchup = engine.max_catchup
+        if max_catchup and not stopping and captured_at is not None and now - captured_at > max_catchup:
+            # 断线时间过长, 丢弃过旧的音频以追上实时
+            engine.stale_chunks += 1
+            return SENT
+
+        replay = engine.replay_buffer
+        try:
+            for frame in frames:
+                if replay is not None:
+                    # 发送前记录, 发送失败的音频也会补发给新会话
+                    end_ms = translator.timeline.audio_ms + len(frame) / BYTES_PER_MS
+                    replay.append(translator, end_ms, captured_at, frame)
+                translator.send_audio_frame(frame, captured_at)
+            self.error_count = 0
+        except Exception as e:
+            if stopping:
+                return DONE
+            if translator is not engine.translator:
+                # 旧会话已被切换掉, 其发送错误无需处理
+                return SENT
+            send_error_log.log(logger, logging.WARNING, translator.id, "处理音频数据时出错: %s", e,
+                               extra=translator.log_fields)
+            self.error_count += 1
+            if self.error_count >= 3:
+                logger.warning("连续错误次数过多，切换翻译会话...", extra=translator.log_fields)
+                engine.failover(translator)
+                self.error_count = 0
+            self.resume_at = time.monotonic() + 0.1
+            return IDLE
+        return SENT
+
+    def run(self, stop_event):
+        """在当前线程中持续发送, 没有音频时阻塞等待"""
+        audio_buffer = self.engine.audio_buffer
+        while True:
+            result = self.step(stop_event.is_set())
+            if result == DONE:
+                return
+            if result == SENT:
+                continue
+            wait = self.resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            elif self.engine.translator is None:
+                time.sleep(0.01)
+            elif audio_buffer.closed:
+                time.sleep(0.1)
+            else:
+                audio_buffer.wait_readable(0.1)
+
+
+class PumpScheduler:
+    """在一个线程中驱动多个引擎的 AudioPump
+
+    每轮为每个引擎最多发送 burst 块音频, 保证各输入源公平; 所有环形缓冲区写入时
+    都会唤醒调度线程, 空闲时最多每 idle_wait 秒醒来一次做会话池维护。
+    """
+
+    def __init__(self, burst=PUMP_BURST, idle_wait=0.05):
+        self.burst = burst
+        self.idle_wait = idle_wait
+        self._entries = {}   # 引擎 -> (AudioPump, 停止事件, 完成事件)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+        self.rounds = 0
+        self.chunks = 0
+
+    def wakeup(self):
+        self._wakeup.set()
+
+    def add(self, engine, pump, stop_event):
+        """注册引擎; 返回该引擎把剩余音频发完后置位的事件"""
+        done = threading.Event()
+        engine.audio_buffer.notify = self._wakeup.set
+        with self._lock:
+            self._entries[engine] = (pump, stop_event, done)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='audio-pump', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return done
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception:
+            # 异常退出时清除线程, 之后的 add() 会重新启动调度线程
+            logger.exception("音频发送线程异常退出")
+            with self._lock:
+                self._thread = None
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.idle_wait)
+            self._wakeup.clear()
+            with self._lock:
+                if not self._entries:
+                    self._thread = None
+                    return
+                entries = list(self._entries.items())
+
+            self.rounds += 1
+            for engine, (pump, stop_event, done) in entries:
+                result = IDLE
+                for _ in range(self.burst):
+                    try:
+                        result = pump.step(stop_event.is_set())
+                    except Exception as e:
+                        # 单个输入源出错不影响其他输入源
+                        logger.exception("发送音频时出错", extra=engine.log_fields)
+                        result = DONE
+                        if not stop_event.is_set():
+                            engine._fail(str(e))
+                    if result != SENT:
+                        break
+                    self.chunks += 1
+                if result == SENT:
+                    # 还有积压的音频, 下一轮不等待
+                    self._wakeup.set()
+                elif result == DONE:
+                    with self._lock:
+                        self._entries.pop(engine, None)
+                    engine.audio_buffer.notify = None
+                    logger.info("翻译循环结束 (统计: %s)", engine.stats(), extra=engine.log_fields)
+                    done.set()
+
+    def stats(self):
+        with self._lock:
+            sources = [engine.source for engine in self._entries]
+        return {'sources': sources, 'rounds': self.rounds, 'chunks': self.chunks}
+
+
+def report_buffer_stats(audio_buffer, last_report, last_stats, log_fields=None):
+    """出现新的溢出或丢弃时输出缓冲区统计, 两次输出之间至少间隔 BUFFER_STATS_INTERVAL 秒"""
+    now = time.monotonic()
+    if now - last_report < BUFFER_STATS_INTERVAL:
+        return last_report, last_stats
+
+    stats = audio_buffer.stats()
+    if (stats['overflows'] != last_stats['overflows'] or stats['dropped'] != last_stats['dropped']
+            or stats.get('underruns') != last_stats.get('underruns')):
+        logger.warning("音频缓冲区告警: 溢出 %d 次, 采集中断 %d 次, 丢弃 %d 块, 队列深度 %d/%d", stats['overflows'],
+                       stats.get('underruns', 0), stats['dropped'], stats['depth'], stats['capacity'], extra=log_fields)
+    return now, stats
@@ -0,0 +1,85 @@
+import math
+import numpy as np
+from utils.config import SAMPLE_RATE, RESAMPLE_TAPS, RESAMPLE_ROLLOFF, RESAMPLE_KAISER_BETA
+
+class StreamingResampler:
+    """把设备原生格式的 int16 音频转换为 16 kHz 单声道 int16
+
+    先对多声道取平均混为单声道, 再用多相 FIR 滤波器做有理数倍率重采样。
+    滤波器历史和输出相位在块之间保留, 连续调用 process 的结果与一次性
+    处理整段音频一致, 块边界不会产生咔哒声。
+    """
+
+    def __init__(self, in_rate, in_channels, out_rate=SAMPLE_RATE, taps=RESAMPLE_TAPS,
+                 rolloff=RESAMPLE_ROLLOFF, beta=RESAMPLE_KAISER_BETA):
+        self.in_rate = int(in_rate)
+        self.in_channels = int(in_channels)
+        self.out_rate = int(out_rate)
+
+        g = math.gcd(self.in_rate, self.out_rate)
+        self.up = self.out_rate // g
+        self.down = self.in_rate // g
+        self.passthrough = self.up == self.down
+
+        # 每个相位的抽头数; 原型滤波器长度为 up * taps
+        self.taps = 1 if self.passthrough else taps
+        self._phases = self._design(rolloff, beta) if not self.passthrough else None
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._position = 0    # 下一个输出采样在上采样域中相对当前块起点的位置
+        self._remainder = b''  # 不足一帧 (所有声道) 的字节
+
+    def _design(self, rolloff, beta):
+        up, taps = self.up, self.taps
+        length = up * taps
+        # 截止频率取输入输出奈奎斯特频率中较小者, 以上采样后的采样率归一化
+        cutoff = 0.5 * rolloff / max(self.up, self.down)
+        n = np.arange(length) - (length - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, beta)
+        h *= up / h.sum()
+        # phases[p, j] = h[p + j * up]; 反转抽头顺序以便直接与输入窗口做点积
+        return np.ascontiguousarray(h.reshape(taps, up).T[:, ::-1], dtype=np.float32)
+
+    def _downmix(self, data):
+        data = self._remainder + data
+        frame_bytes = 2 * self.in_channels
+        usable = len(data) // frame_bytes * frame_bytes
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=np.int16)
+        if self.in_channels == 1:
+            return samples.astype(np.float32)
+        return samples.reshape(-1, self.in_channels).mean(axis=1, dtype=np.float32)
+
+    def process(self, data):
+        """转换一块音频, 返回 16 kHz 单声道 int16 字节串 (可能为空)"""
+        if self.passthrough and self.in_channels == 1:
+            return data
+
+        x = self._downmix(data)
+        if self.passthrough:
+            return np.clip(np.rint(x), -32768, 32767).astype(np.int16).tobytes()
+
+        up, down, taps = self.up, self.down, self.taps
+        span = len(x) * up
+        extended = np.concatenate((self._history, x))
+        if self._position >= span:
+            # 这块太短, 还不够产生下一个输出采样
+            self._position -= span
+            self._history = extended[len(extended) - (taps - 1):]
+            return b''
+
+        positions = np.arange(self._position, span, down)
+        index = positions // up
+        phase = positions % up
+
+        # 每个输出采样对应输入窗口 extended[index : index + taps]
+        windows = np.lib.stride_tricks.sliding_window_view(extended, taps)[index]
+        y = np.einsum('ij,ij->i', windows, self._phases[phase])
+
+        self._position = int(positions[-1]) + down - span
+        self._history = extended[len(extended) - (taps - 1):]
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16).tobytes()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._position = 0
+        self._remainder = b''
@@ -0,0 +1,137 @@
+import time
+import itertools
+import threading
+from dashscope.audio.asr import TranslationRecognizerRealtime
+from utils.config import AUDIO_FORMAT, SAMPLE_RATE, TRANSLATION_MODEL
+from utils.logger import get_logger
+from .callback import TranslationCallback
+from .timeline import AudioTimeline
+
+logger = get_logger('session')
+_session_ids = itertools.count(1)
+
+class RecognizerSession:
+    """单个翻译识别会话
+
+    封装一个 TranslationRecognizerRealtime 实例及其回调。音频设备不属于会话,
+    切换方向或重连时只替换会话, 麦克风和音频流保持打开。
+    """
+
+    def __init__(self, engine, is_zh_to_en, recognizer_factory=None):
+        self.engine = engine
+        self.id = next(_session_ids)
+        self.is_zh_to_en = is_zh_to_en
+        self.source_lang = 'zh' if is_zh_to_en else 'en'
+        self.target_lang = 'en' if is_zh_to_en else 'zh'
+        self.target_languages = engine.target_languages(is_zh_to_en)
+        # 自动双向模式下每句话的源语言由回调识别, last_source_lang 用于无法判断的句子
+        self.auto_direction = engine.auto_direction
+        self.last_source_lang = self.source_lang
+        self.recognizer_factory = recognizer_factory or TranslationRecognizerRealtime
+        self.callback = TranslationCallback(engine, self)
+        self.recognizer = None
+        self.stopped = threading.Event()
+        self.timeline = AudioTimeline()
+
+        # 上传编码器, None 表示直接发送 PCM; 编码线程中的发送错误记在 send_error 上
+        worker = engine.encode_worker
+        self.encoder = worker.new_encoder() if worker is not None else None
+        self.send_error = None
+
+        # 时间戳 (time.monotonic), 用于统计切换延迟
+        self.started_at = None
+        self.ready_at = None
+        self.activated_at = None
+        self.first_result_at = None
+        self.last_sent_at = None
+        self.failover_started_at = None
+
+        # 最后一个已定稿句子的结束位置 (毫秒, 相对会话开始), 之后的音频在故障切换时补发
+        self.final_audio_ms = 0
+
+    @property
+    def direction_text(self):
+        if self.auto_direction:
+            return '自动'
+        return '中译英' if self.is_zh_to_en else '英译中'
+
+    @property
+    def log_fields(self):
+        """日志的结构化字段"""
+        fields = {'session': self.id, 'direction': self.direction_text}
+        if self.engine.source:
+            fields['source'] = self.engine.source
+        return fields
+
+    @property
+    def is_active(self):
+        return self.engine.translator is self
+
+    @property
+    def alive(self):
+        return self.ready_at is not None and not self.stopped.is_set()
+
+    def start(self):
+        """建立与翻译服务的连接 (阻塞直到握手完成)"""
+        self.started_at = time.monotonic()
+        self.recognizer = self.recognizer_factory(
+            model=TRANSLATION_MODEL,
+            format=self.encoder.format if self.encoder is not None else AUDIO_FORMAT,
+            sample_rate=SAMPLE_RATE,
+            transcription_enabled=True,
+            translation_enabled=True,
+            translation_target_languages=self.target_languages,
+            callback=self.callback,
+        )
+        self.recognizer.start()
+        self.ready_at = time.monotonic()
+        logger.info("翻译会话已连接, 耗时 %.0f ms", (self.ready_at - self.started_at) * 1000,
+                    extra=self.log_fields)
+
+    def activate(self):
+        """将会话设为引擎当前使用的会话"""
+        self.activated_at = time.monotonic()
+        self.first_result_at = None
+        self.engine.translator = self
+
+    def send_audio_frame(self, data, captured_at=None):
+        """发送一块 PCM; timeline 和延迟统计始终按 PCM 时长计算"""
+        if self.encoder is not None:
+            error, self.send_error = self.send_error, None
+            if error is not None:
+                raise error
+            self.engine.encode_worker.submit(self, data)
+        else:
+            self.recognizer.send_audio_frame(data)
+        self.last_sent_at = time.monotonic()
+        self.timeline.add(len(data), captured_at, self.last_sent_at)
+        metrics = self.engine.metrics
+        if metrics is not None:
+            metrics.on_send(self, len(data), captured_at, self.last_sent_at)
+
+    def mark_result(self):
+        if self.first_result_at is None:
+            self.first_result_at = time.monotonic()
+            self.engine.session_pool.record_first_result(self)
+
+    def stop(self):
+        if self.stopped.is_set():
+            return
+        self.stopped.set()
+        if self.recognizer:
+            if self.encoder is not None:
+                # 先发出已提交的音频和 Ogg 结束页
+                self.engine.encode_worker.finish(self)
+            try:
+                self.recognizer.stop()
+            except Exception as e:
+                logger.debug("停止翻译会话时出错: %s", e, extra=self.log_fields)
+                # 连接已断开时 SDK 的 stop 直接报错, 不会取消其 23 秒的静音定时器,
+                # 每个断线的会话会多留一个定时器线程
+                timer = getattr(self.recognizer, '_silence_timer', None)
+                if timer is not None:
+                    timer.cancel()
+
+    def stop_async(self):
+        """在后台线程中停止会话, 避免阻塞调用方"""
+        threading.Thread(target=self.stop, daemon=True).start()
@@ -0,0 +1,163 @@
+import time
+import threading
+from collections import deque
+from utils.config import SESSION_POOL_SIZE, SESSION_POOL_RETRY_INTERVAL, STANDBY_KEEPALIVE_INTERVAL
+from utils.logger import get_logger
+
+logger = get_logger('session_pool')
+
+
+def preload_sdk():
+    """在后台线程中加载 DashScope SDK (约 0.5 秒), 与界面或设备初始化同时进行, 缩短第一次连接的等待"""
+    def load():
+        from . import session
+    threading.Thread(target=load, name='sdk-preload', daemon=True).start()
+
+
+class SessionPool:
+    """按翻译方向维护预先连接好的备用会话
+
+    当前会话断开或切换方向时, 直接从池中取出已完成握手的会话使用,
+    被取走的位置在后台重新补充。
+    """
+
+    def __init__(self, engine, size=SESSION_POOL_SIZE, retry_interval=SESSION_POOL_RETRY_INTERVAL):
+        self.engine = engine
+        self.size = size
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._idle = {True: [], False: []}      # is_zh_to_en -> 已就绪的会话
+        self._pending = {True: 0, False: 0}     # is_zh_to_en -> 正在连接的数量
+        self._last_failure = {True: 0.0, False: 0.0}
+
+        # 故障切换统计 (毫秒)
+        self.consecutive_failures = 0   # 收到结果前连续发生的故障次数
+        self.failover_count = 0
+        self.cold_failover_count = 0
+        self.failover_ms = deque(maxlen=100)
+        self.failover_first_result_ms = deque(maxlen=100)
+
+    def _new_session(self, is_zh_to_en):
+        # 第一次建立会话时才加载 SDK
+        from .session import RecognizerSession
+        return RecognizerSession(self.engine, is_zh_to_en, recognizer_factory=self.engine.recognizer_factory)
+
+    def acquire(self, is_zh_to_en):
+        """取出一个已就绪的会话; 没有可用会话时返回 None"""
+        session = None
+        with self._lock:
+            idle = self._idle[is_zh_to_en]
+            while idle:
+                candidate = idle.pop(0)
+                if candidate.alive:
+                    session = candidate
+                    break
+        self.refill()
+        return session
+
+    def connect(self, is_zh_to_en):
+        """同步建立一个新会话 (不进入池)"""
+        session = self._new_session(is_zh_to_en)
+        session.start()
+        return session
+
+    def refill(self):
+        """在后台把每个方向的备用会话补充到 size 个"""
+        if self.size <= 0 or not self.engine.is_recording:
+            return
+
+        # 自动双向模式下两个方向的会话相同, 只补充当前方向
+        directions = (self.engine.is_zh_to_en,) if self.engine.auto_direction else (True, False)
+        now = time.monotonic()
+        with self._lock:
+            for is_zh_to_en in directions:
+                if now - self._last_failure[is_zh_to_en] < self.retry_interval:
+                    continue
+                missing = self.size - len(self._idle[is_zh_to_en]) - self._pending[is_zh_to_en]
+                for _ in range(max(0, missing)):
+                    self._pending[is_zh_to_en] += 1
+                    threading.Thread(target=self._fill_one, args=(is_zh_to_en,), daemon=True).start()
+
+    def _fill_one(self, is_zh_to_en):
+        session = self._new_session(is_zh_to_en)
+        try:
+            session.start()
+        except Exception as e:
+            logger.warning("预连接备用会话失败: %s", e, extra=session.log_fields)
+            session.stopped.set()
+            with self._lock:
+                self._pending[is_zh_to_en] -= 1
+                self._last_failure[is_zh_to_en] = time.monotonic()
+            return
+
+        with self._lock:
+            self._pending[is_zh_to_en] -= 1
+            if self.engine.is_recording and len(self._idle[is_zh_to_en]) < self.size:
+                self._idle[is_zh_to_en].append(session)
+                session = None
+        if session is not None:
+            session.stop()
+
+    def discard(self, session):
+        """备用会话被服务端断开时将其移出池"""
+        with self._lock:
+            idle = self._idle[session.is_zh_to_en]
+            if session in idle:
+                idle.remove(session)
+
+    def keep_alive(self, silence):
+        """定期向空闲会话发送一小段静音, 防止服务端因长时间无音频而断开"""
+        if not STANDBY_KEEPALIVE_INTERVAL:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            sessions = self._idle[True] + self._idle[False]
+        for session in sessions:
+            if not session.alive:
+                self.discard(session)
+                continue
+            if session.last_sent_at is None or now - session.last_sent_at >= STANDBY_KEEPALIVE_INTERVAL:
+                try:
+                    session.send_audio_frame(silence)
+                except Exception as e:
+                    logger.warning("备用会话保活失败: %s", e, extra=session.log_fields)
+                    self.discard(session)
+                    session.stop_async()
+
+    def clear(self):
+        """移除所有备用会话并返回, 由调用方负责停止"""
+        with self._lock:
+            sessions = self._idle[True] + self._idle[False]
+            self._idle = {True: [], False: []}
+        return sessions
+
+    def record_failover(self, started_at, session, warm):
+        self.failover_count += 1
+        if not warm:
+            self.cold_failover_count += 1
+        elapsed = (time.monotonic() - started_at) * 1000
+        self.failover_ms.append(elapsed)
+        session.failover_started_at = started_at
+        logger.info("故障切换完成 (%s), 耗时 %.1f ms", '备用会话' if warm else '新建会话', elapsed,
+                    extra=session.log_fields)
+
+    def record_first_result(self, session):
+        if session.failover_started_at is not None:
+            self.failover_first_result_ms.append((session.first_result_at - session.failover_started_at) * 1000)
+            session.failover_started_at = None
+
+    def stats(self):
+        def avg(values):
+            return round(sum(values) / len(values), 1) if values else None
+
+        with self._lock:
+            idle = {('zh_to_en' if k else 'en_to_zh'): len(v) for k, v in self._idle.items()}
+        return {
+            'size': self.size,
+            'idle': idle,
+            'failovers': self.failover_count,
+            'cold_failovers': self.cold_failover_count,
+            'avg_failover_ms': avg(self.failover_ms),
+            'avg_failover_first_result_ms': avg(self.failover_first_result_ms),
+        }
@@ -0,0 +1,183 @@
+"""
+多输入源同时翻译
+
+每个输入源 (麦克风、会议设备、系统声音回环等) 有独立的采集、环形缓冲区和
+识别会话, 方向可以分别设置和切换; 所有输入源的音频由同一个 PumpScheduler
+线程发送, 翻译事件和日志中带有输入源名称。
+
+    python -m translation.sources      # 列出可用的输入设备
+"""
+import threading
+from utils.config import AUDIO_SOURCES, METRICS_ENABLED, ENGINE_STOP_TIMEOUT, AUTO_DIRECTION, CAPTURE_PROCESS
+from utils.logger import get_logger
+from .pump import PumpScheduler
+from .translator import TranslationEngine
+
+logger = get_logger('sources')
+
+DIRECTIONS = {'zh-en': True, 'en-zh': False, 'auto': True}
+
+
+def list_input_devices():
+    """返回 [(设备编号, 名称, 声道数, 默认采样率)]"""
+    import pyaudio
+    mic = pyaudio.PyAudio()
+    try:
+        devices = []
+        for index in range(mic.get_device_count()):
+            info = mic.get_device_info_by_index(index)
+            if int(info['maxInputChannels']) > 0:
+                devices.append((index, info['name'], int(info['maxInputChannels']),
+                                int(info['defaultSampleRate'])))
+        return devices
+    finally:
+        mic.terminate()
+
+
+class AudioSource:
+    """一个输入源的配置; capture 为 None 时按 device_index 打开麦克风 (process 为 True 时在采集子进程中)"""
+
+    def __init__(self, name, device_index=None, is_zh_to_en=True, capture=None, auto_direction=AUTO_DIRECTION,
+                 process=CAPTURE_PROCESS):
+        self.name = name
+        self.device_index = device_index
+        self.is_zh_to_en = is_zh_to_en
+        self.capture = capture
+        self.auto_direction = auto_direction
+        self.process = process
+
+    @classmethod
+    def from_config(cls, entry, direction=None, process=CAPTURE_PROCESS):
+        """从 AUDIO_SOURCES 中的一项创建, 例如 {'name': 'mic', 'device': 1, 'direction': 'zh-en'}
+
+        direction 为 auto 时按每句话的源语言自动选择方向, 未指定时由 AUTO_DIRECTION 决定;
+        参数 direction 不为 None 时代替配置中的方向 (命令行指定的方向对所有输入源生效)。
+        """
+        if direction is None:
+            direction = entry.get('direction', 'auto' if AUTO_DIRECTION else 'zh-en')
+        if direction not in DIRECTIONS:
+            raise ValueError(f"输入源 {entry.get('name')} 的翻译方向无效: {direction}")
+        return cls(entry['name'], entry.get('device'), DIRECTIONS[direction], auto_direction=direction == 'auto',
+                   process=process)
+
+    def make_capture(self):
+        if self.capture is not None:
+            return self.capture
+        from .capture import default_capture
+        return default_capture(self.device_index, process=self.process)
+
+
+class SourceManager:
+    """为每个输入源创建一个 TranslationEngine, 共用一个发送线程
+
+    subscribe / add_state_listener 与 TranslationEngine 相同, 可以直接交给
+    SubtitleExporter.attach; 状态回调额外接收输入源名称。
+    """
+
+    def __init__(self, sources=None, metrics_enabled=METRICS_ENABLED, **engine_options):
+        if sources is None:
+            sources = [AudioSource.from_config(entry) for entry in AUDIO_SOURCES]
+        names = [source.name for source in sources]
+        if not names or len(set(names)) != len(names):
+            raise ValueError("输入源名称不能为空且不能重复")
+
+        self.scheduler = PumpScheduler()
+        self.engines = {}
+        for source in sources:
+            self.engines[source.name] = TranslationEngine(
+                is_zh_to_en=source.is_zh_to_en,
+                capture=source.make_capture(),
+                metrics_enabled=metrics_enabled,
+                source=source.name,
+                scheduler=self.scheduler,
+                metrics_export=False,
+                auto_direction=source.auto_direction,
+                **engine_options
+            )
+
+        # 所有输入源的统计从同一个接口导出
+        self.metrics_exporter = None
+        if metrics_enabled:
+            from .metrics import MetricsExporter
+            self.metrics_exporter = MetricsExporter(self.snapshot)
+            self.metrics_exporter.start()
+
+    def __getitem__(self, name):
+        return self.engines[name]
+
+    def subscribe(self, callback, source=None, target_lang=None):
+        """订阅翻译结果, 指定 source 时只接收该输入源的结果; 返回取消订阅的函数"""
+        engines = [self.engines[source]] if source is not None else self.engines.values()
+        unsubscribes = [engine.subscribe(callback, target_lang) for engine in engines]
+
+        def unsubscribe():
+            for fn in unsubscribes:
+                fn()
+        return unsubscribe
+
+    def add_state_listener(self, callback):
+        """订阅状态变化, callback(source, state)"""
+        for name, engine in self.engines.items():
+            engine.add_state_listener(lambda state, name=name: callback(name, state))
+
+    def start(self):
+        for engine in self.engines.values():
+            engine.start()
+
+    def stop(self, timeout=ENGINE_STOP_TIMEOUT):
+        """并行停止所有输入源, 返回是否全部在期限内完成"""
+        results = {}
+
+        def stop(name, engine):
+            results[name] = engine.stop(timeout)
+
+        threads = [threading.Thread(target=stop, args=item, daemon=True) for item in self.engines.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout + 1.0)
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        return len(results) == len(self.engines) and all(results.values())
+
+    def switch_direction(self, source, is_zh_to_en=None):
+        """只切换一个输入源的翻译方向, 其他输入源不受影响"""
+        self.engines[source].switch_direction(is_zh_to_en)
+
+    def apply_settings(self, changes):
+        """应用热更新的配置档参数"""
+        if 'PUMP_BURST' in changes:
+            self.scheduler.burst = changes['PUMP_BURST']
+        for engine in self.engines.values():
+            engine.apply_settings(changes)
+
+    def health(self):
+        sources = {name: engine.health() for name, engine in self.engines.items()}
+        statuses = {health['status'] for health in sources.values()}
+        if statuses == {'healthy'}:
+            status = 'healthy'
+        elif statuses == {'down'}:
+            status = 'down'
+        else:
+            status = 'degraded'
+        return {'status': status, 'sources': sources}
+
+    def snapshot(self):
+        return {
+            'scheduler': self.scheduler.stats(),
+            'sources': {name: engine.metrics_snapshot() for name, engine in self.engines.items()},
+        }
+
+
+def main():
+    devices = list_input_devices()
+    if not devices:
+        print("没有可用的输入设备")
+        return
+    print(f"{'编号':>4}  {'声道':>4}  {'采样率':>6}  名称")
+    for index, name, channels, rate in devices:
+        print(f"{index:>4}  {channels:>4}  {rate:>6}  {name}")
+
+
+if __name__ == '__main__':
+    main()
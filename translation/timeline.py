@@ -0,0 +1,52 @@
+import bisect
+import threading
+from utils.config import SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH, AUDIO_TIMELINE_CHUNKS
+
+BYTES_PER_MS = SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH / 1000
+
+
+class AudioTimeline:
+    """记录会话已发送音频的位置与采集、发送时间
+
+    识别结果中的时间 (begin_time / end_time) 是相对会话开始的音频毫秒数, 备用会话
+    期间的保活静音和 VAD 省略的静音都会让它与墙钟时间错开, 通过本时间线可以把
+    结果对应回采集时间。只保留最近的 max_chunks 至 2 * max_chunks 个音频块。
+    """
+
+    def __init__(self, max_chunks=AUDIO_TIMELINE_CHUNKS):
+        self.max_chunks = max_chunks
+        self.audio_ms = 0.0
+        self.ends = []       # 每块音频结束位置 (毫秒, 相对会话开始)
+        self.captured = []   # 对应的采集时间, 保活静音为 None
+        self.sent = []
+        self._lock = threading.Lock()
+
+    def add(self, nbytes, captured_at, sent_at):
+        with self._lock:
+            self.audio_ms += nbytes / BYTES_PER_MS
+            self.ends.append(self.audio_ms)
+            self.captured.append(captured_at)
+            self.sent.append(sent_at)
+            if len(self.ends) > 2 * self.max_chunks:
+                del self.ends[:self.max_chunks]
+                del self.captured[:self.max_chunks]
+                del self.sent[:self.max_chunks]
+
+    def lookup(self, audio_ms, start=False):
+        """返回包含 audio_ms 位置的音频块的 (采集时间, 发送时间)
+
+        start 为 True 时 audio_ms 是句子开始位置, 恰好落在块边界上时取后一块。
+        """
+        with self._lock:
+            if not self.ends:
+                return None, None
+            find = bisect.bisect_right if start else bisect.bisect_left
+            i = min(find(self.ends, audio_ms), len(self.ends) - 1)
+            return self.captured[i], self.sent[i]
+
+    def captured_at(self, audio_ms, start=False):
+        """audio_ms 位置的采集时间; 落在保活静音中时退回到发送时间"""
+        if audio_ms is None:
+            return None
+        captured_at, sent_at = self.lookup(audio_ms, start)
+        return captured_at if captured_at is not None else sent_at
@@ -1,79 +1,519 @@
 import time
+import random
 import threading
-from dashscope.audio.asr import TranslationRecognizerRealtime
-from utils.config import AUDIO_FORMAT, SAMPLE_RATE, TRANSLATION_MODEL, CHUNK_SIZE
-from .callback import TranslationCallback
-
-def init_translation_thread(window):
-    """初始化翻译线程"""
-    # 确保之前的线程已经结束
-    if hasattr(window, 'translation_thread') and window.translation_thread and window.translation_thread.is_alive():
-        window.is_recording = False
-        time.sleep(0.5)
-    
-    # 创建新的翻译线程
-    window.translation_thread = threading.Thread(
-        target=start_translation,
-        args=(window,),
-        daemon=True
-    )
-    window.translation_thread.start()
-    print("翻译线程已启动")
-
-def start_translation(window):
-    """启动翻译服务"""
-    print("开始建立翻译服务连接...")
-    
-    try:
-        # 等待之前的资源完全释放
-        time.sleep(0.5)
-        
-        # 创建回调对象
-        callback = TranslationCallback(window)
-        target_lang = ['en'] if window.is_zh_to_en else ['zh']
-        
-        # 创建新的翻译器实例
-        window.translator = TranslationRecognizerRealtime(
-            model=TRANSLATION_MODEL,
-            format=AUDIO_FORMAT,
-            sample_rate=SAMPLE_RATE,
-            transcription_enabled=True,
-            translation_enabled=True,
-            translation_target_languages=target_lang,
-            callback=callback,
+from collections import deque
+from utils.config import (CHUNK_SIZE, CHANNELS, SAMPLE_WIDTH, SAMPLE_RATE, RING_BUFFER_CHUNKS,
+                          RING_BUFFER_POLICY, RING_BUFFER_BLOCK_TIMEOUT, SESSION_POOL_SIZE,
+                          MAX_FAILOVER_ATTEMPTS, RECONNECT_BACKOFF_BASE, RECONNECT_BACKOFF_MAX,
+                          RECONNECT_BACKOFF_JITTER, RECONNECT_REPLAY_SECONDS, RECONNECT_MAX_CATCHUP,
+                          ENGINE_STOP_TIMEOUT, AUTO_DIRECTION,
+                          VAD_ENABLED, METRICS_ENABLED, EXTRA_TARGET_LANGUAGES, GLOSSARY_PATH, UPLOAD_ENCODING)
+from utils.logger import get_logger
+from .audio_buffer import AudioRingBuffer, ReplayBuffer
+from .session_pool import SessionPool
+from .pump import AudioPump
+
+logger = get_logger('engine')
+
+# 引擎状态
+IDLE = 'idle'               # 尚未启动
+CONNECTING = 'connecting'   # 正在建立会话, 音频暂存在缓冲区
+STREAMING = 'streaming'     # 正在发送音频并接收结果
+DRAINING = 'draining'       # 已停止采集, 正在发送剩余音频并等待最终结果
+CLOSED = 'closed'           # 所有资源已释放, 可以再次启动
+
+TRANSITIONS = {
+    IDLE: (CONNECTING,),
+    CONNECTING: (STREAMING, DRAINING, CLOSED),
+    STREAMING: (CONNECTING, DRAINING, CLOSED),
+    DRAINING: (CLOSED,),
+    CLOSED: (CONNECTING,),
+}
+
+def backoff_delay(attempt, base=RECONNECT_BACKOFF_BASE, cap=RECONNECT_BACKOFF_MAX,
+                  jitter=RECONNECT_BACKOFF_JITTER):
+    """第 attempt 次重试前的等待时间: 指数增长并随机缩短, attempt 为 0 时立即重试"""
+    if attempt <= 0:
+        return 0.0
+    delay = min(cap, base * 2 ** (attempt - 1))
+    return delay * (1 - jitter * random.random())
+
+
+class TranslationEngine:
+    """与界面无关的实时翻译引擎
+
+    负责音频采集、会话管理和音频发送。调用方通过 subscribe 订阅翻译结果,
+    通过 add_state_listener 订阅状态变化; 回调在引擎或 SDK 的线程中执行,
+    界面需要自行切换到界面线程。
+
+    source 为输入源名称, 会附在翻译事件和日志中; 指定 scheduler 时音频由共享的
+    PumpScheduler 线程发送, 不再为每个引擎单独启动发送线程。
+
+    auto_direction 为 True 时会话同时翻译为中英文, 每句话按识别出的源语言选择主语言,
+    说话人换语言时不需要切换方向和重连。
+    """
+
+    def __init__(self, is_zh_to_en=True, capture=None, recognizer_factory=None,
+                 pool_size=SESSION_POOL_SIZE, vad_enabled=VAD_ENABLED,
+                 metrics_enabled=METRICS_ENABLED, extra_languages=EXTRA_TARGET_LANGUAGES,
+                 glossary_path=GLOSSARY_PATH, replay_seconds=RECONNECT_REPLAY_SECONDS,
+                 source=None, scheduler=None, metrics_export=True, encoding=UPLOAD_ENCODING,
+                 auto_direction=AUTO_DIRECTION):
+        if capture is None:
+            from .capture import default_capture
+            capture = default_capture()
+
+        self.vad = None
+        if vad_enabled:
+            from .vad import VoiceActivityGate
+            self.vad = VoiceActivityGate()
+
+        # 术语表在回调线程中应用于每条结果, 文件修改后自动重新加载
+        self.glossary = None
+        if glossary_path:
+            from .glossary import Glossary
+            self.glossary = Glossary(glossary_path).start()
+
+        # 上传前压缩音频, 编码在单独的线程中进行; 编码器不可用时直接发送 PCM
+        self.encode_worker = None
+        if encoding != 'pcm':
+            from .encoder import EncodeWorker, create_encoder
+            if create_encoder(encoding) is not None:
+                self.encode_worker = EncodeWorker(
+                    encoding, name=f"audio-encode-{source}" if source else 'audio-encode')
+
+        self.source = source
+        self.scheduler = scheduler
+        self.is_zh_to_en = is_zh_to_en
+        self.auto_direction = auto_direction
+        self.extra_languages = list(extra_languages)
+        self.capture = capture
+        self.recognizer_factory = recognizer_factory
+        self.translator = None
+        # 在子进程中采集时缓冲区位于共享内存, 由采集对象创建
+        create_buffer = getattr(capture, 'create_buffer', AudioRingBuffer)
+        self.audio_buffer = create_buffer(
+            CHUNK_SIZE * CHANNELS * SAMPLE_WIDTH,
+            RING_BUFFER_CHUNKS,
+            policy=RING_BUFFER_POLICY,
+            block_timeout=RING_BUFFER_BLOCK_TIMEOUT
+        )
+        self.session_pool = SessionPool(self, size=pool_size)
+
+        # 故障切换时补发的音频; 请求由回调线程加入, 发送线程处理
+        self.replay_buffer = None
+        if replay_seconds > 0:
+            self.replay_buffer = ReplayBuffer(int(replay_seconds * SAMPLE_RATE * CHANNELS * SAMPLE_WIDTH))
+        self._replay_requests = deque()
+        self.replayed_chunks = 0
+        self.max_catchup = RECONNECT_MAX_CATCHUP
+        self.stale_chunks = 0   # 超过 max_catchup 未发送而被丢弃的音频块
+
+        self._state = IDLE
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._pump_done = None
+        self.last_result_at = None
+        self._subscribers = []
+        self._state_listeners = []
+
+        # 延迟统计; 关闭时 metrics 为 None, 热路径上不做任何记录
+        self.metrics = None
+        self.metrics_exporter = None
+        if metrics_enabled:
+            from .metrics import LatencyMetrics, MetricsExporter
+            self.metrics = LatencyMetrics()
+            if metrics_export:
+                self.metrics_exporter = MetricsExporter(self.metrics_snapshot)
+                self.metrics_exporter.start()
+
+    # ---- 订阅 ----
+
+    def subscribe(self, callback, target_lang=None):
+        """订阅翻译结果, callback(event) 接收 TranslationEvent; 返回取消订阅的函数
+
+        指定 target_lang 时只接收该语言的结果。
+        """
+        entry = (callback, target_lang)
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry)
+
+    def add_state_listener(self, callback):
+        """订阅状态变化, callback(state) 接收新状态; 返回取消订阅的函数"""
+        self._state_listeners.append(callback)
+        return lambda: self._state_listeners.remove(callback)
+
+    def publish(self, event):
+        self.session_pool.consecutive_failures = 0
+        self.last_result_at = event.received_at
+        for callback, target_lang in list(self._subscribers):
+            if target_lang is not None and target_lang != event.target_lang:
+                continue
+            try:
+                callback(event)
+            except Exception:
+                logger.exception("处理翻译结果时出错", extra=self.log_fields)
+
+    def apply_settings(self, changes):
+        """应用热更新的配置档参数, changes 为 {参数: 新值}"""
+        if 'RECONNECT_MAX_CATCHUP' in changes:
+            self.max_catchup = changes['RECONNECT_MAX_CATCHUP']
+        if self.vad is not None:
+            self.vad.apply_settings(changes)
+
+    def target_languages(self, is_zh_to_en):
+        """会话的目标语言列表: 翻译方向的目标语言在前, 其后为额外语言
+
+        自动双向模式下同时请求中英文, 由回调按每句话的源语言选择显示哪一种。
+        """
+        languages = ['en', 'zh'] if is_zh_to_en else ['zh', 'en']
+        if not self.auto_direction:
+            languages = languages[:1]
+        return languages + [lang for lang in self.extra_languages if lang not in languages]
+
+    # ---- 状态 ----
+
+    @property
+    def state(self):
+        return self._state
+
+    def stats(self):
+        stats = {
+            'state': self._state,
+            'buffer': self.audio_buffer.stats(),
+            'session_pool': self.session_pool.stats(),
+            'replay': {'replayed': self.replayed_chunks, 'stale_dropped': self.stale_chunks},
+        }
+        if self.vad is not None:
+            stats['vad'] = self.vad.stats()
+        if self.glossary is not None:
+            stats['glossary'] = self.glossary.stats()
+        if self.encode_worker is not None:
+            stats['encoding'] = self.encode_worker.stats()
+        return stats
+
+    def health(self):
+        """运行状况: healthy (正常发送) / degraded (重连中或刚发生故障) / down (已停止)"""
+        if self._state in (IDLE, CLOSED):
+            status = 'down'
+        elif self._state == STREAMING and self.session_pool.consecutive_failures == 0:
+            status = 'healthy'
+        else:
+            status = 'degraded'
+        buffer = self.audio_buffer.stats()
+        since_result = None
+        if self.last_result_at is not None:
+            since_result = round(time.monotonic() - self.last_result_at, 1)
+        return {
+            'status': status,
+            'state': self._state,
+            'direction': 'auto' if self.auto_direction else ('zh-en' if self.is_zh_to_en else 'en-zh'),
+            'seconds_since_result': since_result,
+            'consecutive_failures': self.session_pool.consecutive_failures,
+            'failovers': self.session_pool.failover_count,
+            'buffer_depth': buffer['depth'],
+            'buffer_dropped': buffer['dropped'],
+            'overflows': buffer['overflows'],
+            'stale_dropped': self.stale_chunks,
+        }
+
+    def metrics_snapshot(self):
+        """引擎统计和延迟直方图, 用于导出"""
+        snapshot = self.stats()
+        if self.metrics is not None:
+            snapshot['latency'] = self.metrics.snapshot()
+        return snapshot
+
+    @property
+    def log_fields(self):
+        return {'source': self.source} if self.source else {}
+
+    @property
+    def is_recording(self):
+        """是否仍在采集并需要维持会话"""
+        return self._state in (CONNECTING, STREAMING)
+
+    @property
+    def accepting_results(self):
+        return self._state in (CONNECTING, STREAMING, DRAINING)
+
+    def _set_state(self, state, expected=None):
+        """按状态机切换状态, 不允许的切换会被忽略并返回 False"""
+        with self._cond:
+            if self._state == state:
+                return True
+            if expected is not None and self._state not in expected:
+                return False
+            if state not in TRANSITIONS[self._state]:
+                return False
+            self._state = state
+            self._cond.notify_all()
+
+        logger.info("翻译引擎状态: %s", state, extra=self.log_fields)
+        for listener in list(self._state_listeners):
+            try:
+                listener(state)
+            except Exception:
+                logger.exception("处理状态变化时出错", extra=self.log_fields)
+        return True
+
+    def wait_for_state(self, state, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self._state == state, timeout=timeout)
+
+    # ---- 生命周期 ----
+
+    def start(self):
+        """启动引擎 (非阻塞), 连接进度通过状态变化通知"""
+        with self._cond:
+            if self._state not in (IDLE, CLOSED):
+                return False
+            self._stop_event = threading.Event()
+        self._set_state(CONNECTING)
+
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(self._stop_event,),
+            name=f"translation-engine-{self.source}" if self.source else 'translation-engine',
+            daemon=True
         )
-        
-        # 启动翻译服务
-        window.translator.start()
-        print(f"翻译服务已启动 (方向: {'中译英' if window.is_zh_to_en else '英译中'})")
-        
-        # 等待翻译服务完全启动
-        time.sleep(0.5)
-        
-        # 主循环：处理音频数据
-        error_count = 0
-        while window.is_recording:
-            if window.stream and window.stream.is_active():
+        self._thread.start()
+        logger.debug("翻译线程已启动", extra=self.log_fields)
+        return True
+
+    def stop(self, timeout=ENGINE_STOP_TIMEOUT):
+        """停止引擎: 停止采集, 发送剩余音频, 关闭所有会话
+
+        最多等待 timeout 秒, 返回是否在期限内全部完成。
+        """
+        deadline = time.monotonic() + timeout
+        if not self._set_state(DRAINING, expected=(CONNECTING, STREAMING)):
+            return True
+
+        logger.info("开始清理资源...", extra=self.log_fields)
+        self._stop_event.set()
+        self.capture.close()
+
+        finished = True
+        thread = self._thread
+        if thread and thread is not threading.current_thread():
+            thread.join(max(0.0, deadline - time.monotonic()))
+            finished = not thread.is_alive()
+        if self._pump_done is not None:
+            # 由共享调度线程发送时, 等待剩余音频发完
+            self.scheduler.wakeup()
+            finished = self._pump_done.wait(max(0.0, deadline - time.monotonic())) and finished
+            self._pump_done = None
+
+        sessions = self.session_pool.clear()
+        if self.translator is not None:
+            sessions.append(self.translator)
+        finished = self._stop_sessions(sessions, deadline) and finished
+
+        self.translator = None
+        self.audio_buffer.close()
+        self._set_state(CLOSED)
+        if finished:
+            logger.info("资源清理完成", extra=self.log_fields)
+        else:
+            logger.warning("资源清理超时, 部分会话仍在后台关闭", extra=self.log_fields)
+        return finished
+
+    def restart(self, timeout=ENGINE_STOP_TIMEOUT):
+        self.stop(timeout)
+        return self.start()
+
+    def _stop_sessions(self, sessions, deadline):
+        """并行停止会话, 等待到 deadline 为止"""
+        threads = []
+        for session in sessions:
+            thread = threading.Thread(target=session.stop, daemon=True)
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        return not any(thread.is_alive() for thread in threads)
+
+    def _fail(self, reason):
+        """无法恢复的错误: 在后台停止引擎"""
+        logger.error("翻译引擎停止: %s", reason, extra=self.log_fields)
+        threading.Thread(target=self.stop, daemon=True).start()
+
+    # ---- 会话管理 ----
+
+    def _activate(self, session):
+        """启用会话; 引擎已停止时返回 False"""
+        with self._cond:
+            if self._state not in (CONNECTING, STREAMING):
+                return False
+            session.activate()
+        self._set_state(STREAMING)
+        return True
+
+    def switch_direction(self, is_zh_to_en=None):
+        """切换翻译方向 (非阻塞): 保留麦克风和音频流, 只替换识别会话
+
+        自动双向模式下每句话自动选择方向, 不替换会话。
+        """
+        if self.auto_direction:
+            return
+        self.is_zh_to_en = (not self.is_zh_to_en) if is_zh_to_en is None else is_zh_to_en
+        if self.is_recording and self.translator is not None:
+            self._replace_session(self.is_zh_to_en)
+
+    def _replace_session(self, is_zh_to_en, on_ready=None):
+        """用指定方向的新会话替换当前会话
+
+        优先使用会话池中已预连接的会话; 没有可用会话时在后台建立新会话,
+        期间采集的音频保留在环形缓冲区中, 新会话就绪后继续发送。
+        on_ready(session, warm) 在新会话启用后调用。
+        """
+        old = self.translator
+        standby = self.session_pool.acquire(is_zh_to_en)
+
+        if standby is not None:
+            if not self._activate(standby):
+                standby.stop_async()
+                return
+            logger.info("已启用预连接会话", extra=standby.log_fields)
+            if old is not None:
+                old.stop_async()
+            if on_ready:
+                on_ready(standby, True)
+            return
+
+        # 没有可用的备用会话: 暂停发送, 后台建立新会话
+        self.translator = None
+        self._set_state(CONNECTING, expected=(STREAMING,))
+        if old is not None:
+            old.stop_async()
+
+        def connect():
+            try:
+                session = self.session_pool.connect(is_zh_to_en)
+            except Exception as e:
+                logger.warning("建立翻译会话失败: %s", e, extra=self.log_fields)
+                self._on_connect_failed()
+                return
+            if is_zh_to_en != self.is_zh_to_en:
+                # 连接期间方向又被切换, 按最新方向重新建立
+                session.stop_async()
+                if self.is_recording and self.translator is None:
+                    self._replace_session(self.is_zh_to_en, on_ready)
+                return
+            if self.translator is not None or not self._activate(session):
+                session.stop()
+                return
+            if on_ready:
+                on_ready(session, False)
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    def _on_connect_failed(self):
+        pool = self.session_pool
+        pool.consecutive_failures += 1
+        if pool.consecutive_failures > MAX_FAILOVER_ATTEMPTS:
+            self._fail(f"连续 {pool.consecutive_failures} 次无法建立会话")
+            return
+        self._schedule_reconnect(backoff_delay(pool.consecutive_failures))
+
+    def _schedule_reconnect(self, delay, on_ready=None):
+        """等待 delay 秒后按当前方向重新建立会话; 等待在定时器线程中进行, 不占用回调线程"""
+        logger.info("%.1f 秒后重新连接", delay, extra=self.log_fields)
+
+        def retry():
+            if self.is_recording and self.translator is None:
+                self._replace_session(self.is_zh_to_en, on_ready)
+
+        timer = threading.Timer(delay, retry)
+        timer.daemon = True
+        timer.start()
+
+    def failover(self, failed):
+        """当前会话断开或出错时切换到同方向的新会话
+
+        第一次故障立即启用备用会话, 连续故障时按指数退避等待后再重连。
+        失败会话中尚未定稿的音频会补发给新会话。
+        """
+        if failed is not self.translator or not self.is_recording:
+            return
+
+        pool = self.session_pool
+        pool.consecutive_failures += 1
+        if pool.consecutive_failures > MAX_FAILOVER_ATTEMPTS:
+            self._fail(f"连续故障 {pool.consecutive_failures} 次")
+            return
+
+        started_at = time.monotonic()
+        logger.warning("翻译会话故障, 开始切换 (%d/%d)", pool.consecutive_failures, MAX_FAILOVER_ATTEMPTS,
+                       extra=failed.log_fields)
+        if self.replay_buffer is not None:
+            # 必须在替换会话之前加入, 发送线程拿到新会话时一定能看到这个请求
+            self._replay_requests.append((failed, failed.final_audio_ms))
+
+        def on_ready(session, warm):
+            pool.record_failover(started_at, session, warm)
+
+        delay = backoff_delay(pool.consecutive_failures - 1)
+        if delay <= 0:
+            self._replace_session(failed.is_zh_to_en, on_ready)
+            return
+
+        # 连续故障: 先停用故障会话, 音频暂存在缓冲区, 退避后再重连
+        with self._cond:
+            if self.translator is not failed:
+                return
+            self.translator = None
+        self._set_state(CONNECTING, expected=(STREAMING,))
+        failed.stop_async()
+        self._schedule_reconnect(delay, on_ready)
+
+    # ---- 发送线程 ----
+
+    def _run(self, stop_event):
+        logger.info("开始建立翻译服务连接...", extra=self.log_fields)
+        try:
+            self.audio_buffer.reopen()
+            # 打开音频设备的同时建立会话 (第一次连接还要加载 SDK), 期间的音频暂存在缓冲区
+            pool = self.session_pool
+            connecting = {}
+
+            def connect():
                 try:
-                    data = window.stream.read(CHUNK_SIZE, exception_on_overflow=False)
-                    if window.translator and window.is_recording:
-                        window.translator.send_audio_frame(data)
-                        error_count = 0
+                    connecting['session'] = pool.acquire(self.is_zh_to_en) or pool.connect(self.is_zh_to_en)
                 except Exception as e:
-                    print(f"处理音频数据时出错: {str(e)}")
-                    error_count += 1
-                    if error_count >= 3:
-                        print("连续错误次数过多，重新初始化翻译...")
-                        window.signal_emitter.direction_changed.emit()
-                        break
-                    time.sleep(0.1)
-            else:
-                time.sleep(0.1)
-        
-        print("翻译循环结束")
-        
-    except Exception as e:
-        print(f"翻译过程出错: {str(e)}")
-    finally:
-        # 标记翻译结束
-        window.is_recording = False 
\ No newline at end of file
+                    connecting['error'] = e
+
+            connector = threading.Thread(target=connect, name='engine-connect', daemon=True)
+            connector.start()
+            opened = self.capture.open(self.audio_buffer)
+            connector.join()
+            session = connecting.get('session')
+            if not opened:
+                if session is not None:
+                    session.stop_async()
+                self._fail("无法打开音频设备")
+                return
+            if session is None:
+                raise connecting['error']
+            if not self._activate(session):
+                session.stop()
+                return
+            logger.info("翻译服务已启动", extra=session.log_fields)
+            if session.is_zh_to_en != self.is_zh_to_en:
+                # 连接期间方向已被切换
+                self._replace_session(self.is_zh_to_en)
+
+            pump = AudioPump(self)
+            if self.scheduler is not None:
+                # 由共享的调度线程发送音频, 本线程到此结束
+                self._pump_done = self.scheduler.add(self, pump, stop_event)
+                return
+            pump.run(stop_event)
+            logger.info("翻译循环结束 (统计: %s)", self.stats(), extra=self.log_fields)
+
+        except Exception as e:
+            logger.exception("翻译过程出错", extra=self.log_fields)
+            if not stop_event.is_set():
+                self._fail(str(e))
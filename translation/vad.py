@@ -0,0 +1,120 @@
+import time
+from collections import deque
+import numpy as np
+from utils.config import (SAMPLE_RATE, CHANNELS, SAMPLE_WIDTH, VAD_FRAME_MS, VAD_ENERGY_THRESHOLD_DB,
+                          VAD_SNR_DB, VAD_ZCR_MAX, VAD_HANGOVER_MS, VAD_PREROLL_MS,
+                          VAD_KEEPALIVE_INTERVAL)
+
+class VoiceActivityGate:
+    """发送前的语音活动检测
+
+    把每块音频切成短帧, 用短时能量和过零率判断是否有语音。静音块不发送;
+    检测到语音后继续发送 hangover 时长, 避免句尾被截断; 静音期间保留最近
+    preroll 时长的音频, 语音开始时先补发, 避免句首被截断。长时间静音时
+    定期发送一小段静音帧, 防止会话因 23 秒无音频而超时断开。
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=CHANNELS, frame_ms=VAD_FRAME_MS, threshold_db=VAD_ENERGY_THRESHOLD_DB, snr_db=VAD_SNR_DB,
+                 zcr_max=VAD_ZCR_MAX, hangover_ms=VAD_HANGOVER_MS, preroll_ms=VAD_PREROLL_MS,
+                 keepalive_interval=VAD_KEEPALIVE_INTERVAL):
+        self.bytes_per_second = sample_rate * channels * SAMPLE_WIDTH
+        self.frame_len = max(1, int(sample_rate * frame_ms / 1000)) * channels
+        self.threshold_db = threshold_db
+        self.snr_db = snr_db
+        self.zcr_max = zcr_max
+        self.hangover_seconds = hangover_ms / 1000
+        self.preroll_seconds = preroll_ms / 1000
+        self.keepalive_interval = keepalive_interval
+        self.keepalive_frame = bytes(self.frame_len * SAMPLE_WIDTH)
+
+        self.noise_floor_db = threshold_db - snr_db
+        self._preroll = deque()
+        self._preroll_seconds = 0.0
+        self._hangover_left = 0.0
+        self._last_sent_at = time.monotonic()
+
+        # 统计
+        self.speech_chunks = 0
+        self.suppressed_chunks = 0
+        self.suppressed_seconds = 0.0
+        self.keepalive_frames = 0
+
+    def is_speech(self, data):
+        samples = np.frombuffer(data, dtype=np.int16)
+        count = len(samples) // self.frame_len * self.frame_len
+        if count == 0:
+            return False
+
+        frames = samples[:count].reshape(-1, self.frame_len).astype(np.float32) * (1.0 / 32768)
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        threshold = max(self.threshold_db, self.noise_floor_db + self.snr_db)
+        voiced = (energy_db > threshold) & (zcr < self.zcr_max)
+        if not voiced.any():
+            # 只用静音帧更新背景噪声估计
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * float(np.median(energy_db))
+            return False
+        return True
+
+    def process(self, data):
+        """返回这块音频对应需要发送的数据列表 (可能为空)"""
+        now = time.monotonic()
+        duration = len(data) / self.bytes_per_second
+
+        if self.is_speech(data):
+            self.speech_chunks += 1
+            self._hangover_left = self.hangover_seconds
+            frames = list(self._preroll)
+            frames.append(data)
+            self._preroll.clear()
+            self._preroll_seconds = 0.0
+        elif self._hangover_left > 0:
+            self._hangover_left -= duration
+            frames = [data]
+        else:
+            frames = []
+            self._hold(data, duration)
+            if self.keepalive_interval and now - self._last_sent_at >= self.keepalive_interval:
+                frames.append(self.keepalive_frame)
+                self.keepalive_frames += 1
+
+        if frames:
+            self._last_sent_at = now
+        return frames
+
+    def _hold(self, data, duration):
+        """静音块放入预录缓冲区, 超出预录时长的部分计为被抑制"""
+        self._preroll.append(data)
+        self._preroll_seconds += duration
+        while self._preroll and self._preroll_seconds - len(self._preroll[0]) / self.bytes_per_second >= self.preroll_seconds:
+            dropped = self._preroll.popleft()
+            dropped_seconds = len(dropped) / self.bytes_per_second
+            self._preroll_seconds -= dropped_seconds
+            self.suppressed_chunks += 1
+            self.suppressed_seconds += dropped_seconds
+
+    def apply_settings(self, changes):
+        """应用热更新的配置档参数 (VAD_*), 不影响已缓存的音频"""
+        if 'VAD_ENERGY_THRESHOLD_DB' in changes:
+            self.threshold_db = changes['VAD_ENERGY_THRESHOLD_DB']
+        if 'VAD_SNR_DB' in changes:
+            self.snr_db = changes['VAD_SNR_DB']
+        if 'VAD_ZCR_MAX' in changes:
+            self.zcr_max = changes['VAD_ZCR_MAX']
+        if 'VAD_HANGOVER_MS' in changes:
+            self.hangover_seconds = changes['VAD_HANGOVER_MS'] / 1000
+        if 'VAD_PREROLL_MS' in changes:
+            self.preroll_seconds = changes['VAD_PREROLL_MS'] / 1000
+        if 'VAD_KEEPALIVE_INTERVAL' in changes:
+            self.keepalive_interval = changes['VAD_KEEPALIVE_INTERVAL']
+
+    def stats(self):
+        return {
+            'speech_chunks': self.speech_chunks,
+            'suppressed_chunks': self.suppressed_chunks,
+            'suppressed_seconds': round(self.suppressed_seconds, 1),
+            'keepalive_frames': self.keepalive_frames,
+            'noise_floor_db': round(self.noise_floor_db, 1),
+        }
@@ -1,6 +1,6 @@
 from PyQt6.QtWidgets import QPushButton, QWidget
 from PyQt6.QtCore import Qt, QRectF
-from PyQt6.QtGui import QPainter, QBrush, QPainterPath, QPen, QColor, QLinearGradient
+from PyQt6.QtGui import QPainter, QBrush, QPainterPath, QPen, QColor, QLinearGradient, QPixmap
 
 class MacButton(QPushButton):
     def __init__(self, color, parent=None):
@@ -43,26 +43,60 @@ class SwitchButton(QPushButton):
         """)
 
 class BlurWindow(QWidget):
+    """圆角半透明背景
+
+    渐变和边框预先绘制到缓存的 QPixmap 中, 只在尺寸或缩放比例变化时重新绘制;
+    文本更新引起的局部重绘只需从缓存复制对应区域。不绘制阴影: 背景占满整个窗口,
+    阴影只能画在背景下面, 会被几乎不透明的背景完全盖住。
+    """
+
+    RADIUS = 15.0
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
-        
-    def paintEvent(self, event):
-        painter = QPainter(self)
+        self._cache = None
+        self.cache_builds = 0
+
+    def resizeEvent(self, event):
+        self._cache = None
+        super().resizeEvent(event)
+
+    def _new_pixmap(self, ratio):
+        pixmap = QPixmap(self.size() * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        return pixmap
+
+    def paint_chrome(self, painter, rect):
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        
+
         path = QPainterPath()
-        rect = QRectF(self.rect())
-        path.addRoundedRect(rect, 15.0, 15.0)
-        
+        path.addRoundedRect(rect, self.RADIUS, self.RADIUS)
+
         gradient = QLinearGradient(rect.topLeft(), rect.bottomRight())
         gradient.setColorAt(0, QColor(40, 40, 45, 230))
         gradient.setColorAt(1, QColor(30, 30, 35, 230))
-        
+
         painter.setPen(Qt.PenStyle.NoPen)
         painter.setBrush(QBrush(gradient))
         painter.drawPath(path)
-        
+
         painter.setPen(QPen(QColor(255, 255, 255, 30), 1))
         painter.setBrush(Qt.BrushStyle.NoBrush)
-        painter.drawPath(path) 
\ No newline at end of file
+        painter.drawPath(path)
+
+    def _render_cache(self, ratio):
+        cache = self._new_pixmap(ratio)
+        painter = QPainter(cache)
+        self.paint_chrome(painter, QRectF(self.rect()))
+        painter.end()
+        self.cache_builds += 1
+        return cache
+
+    def paintEvent(self, event):
+        ratio = self.devicePixelRatioF()
+        if self._cache is None or self._cache.devicePixelRatio() != ratio:
+            self._cache = self._render_cache(ratio)
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._cache)
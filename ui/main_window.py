@@ -1,30 +1,126 @@
 import time
-import threading
 from PyQt6.QtWidgets import (QMainWindow, QTextEdit, QVBoxLayout, QHBoxLayout, 
-                          QWidget, QLabel, QGraphicsDropShadowEffect)
-from PyQt6.QtCore import Qt, pyqtSignal, QObject, QPoint, QPropertyAnimation, QEasingCurve, QTimer
-from PyQt6.QtGui import QColor
+                          QWidget, QLabel)
+from PyQt6.QtCore import Qt, pyqtSignal, QObject, QPoint
 
 from .components import MacButton, SwitchButton, BlurWindow
-from utils.config import init_dashscope_api_key
+from .transcript import TranscriptRenderer
+from translation.translator import TranslationEngine, CLOSED
+from utils.config import (init_dashscope_api_key, SWITCH_DEBOUNCE, METRICS_OVERLAY, EXPORT_ENABLED,
+                          AUDIO_SOURCES, BROADCAST_ENABLED, HISTORY_ENABLED)
+from utils.logger import get_logger
+from utils.profiles import ProfileWatcher
+
+logger = get_logger('ui')
+
+# 引擎状态对应的状态栏文字和颜色
+STATUS_STYLES = {
+    'idle': ('准备中...', '#FEBC2E', 'rgba(254, 188, 46, 0.15)'),
+    'connecting': ('正在连接...', '#FEBC2E', 'rgba(254, 188, 46, 0.15)'),
+    'streaming': ('正在识别...', '#28C840', 'rgba(40, 200, 64, 0.15)'),
+    'draining': ('正在停止...', '#FEBC2E', 'rgba(254, 188, 46, 0.15)'),
+    'closed': ('已停止', '#FF5F57', 'rgba(255, 95, 87, 0.15)'),
+}
+
+# 多个输入源时状态栏显示最需要关注的状态
+STATE_PRIORITY = ('closed', 'connecting', 'draining', 'idle', 'streaming')
+
+# 额外语言面板的标题
+LANGUAGE_NAMES = {
+    'zh': '中文', 'en': '英文', 'ja': '日文', 'ko': '韩文', 'fr': '法文',
+    'de': '德文', 'es': '西班牙文', 'ru': '俄文', 'it': '意大利文', 'pt': '葡萄牙文',
+}
+
+TEXT_AREA_STYLE = """
+    QTextEdit {
+        background-color: rgba(255, 255, 255, 0.08);
+        color: #FFFFFF;
+        border: none;
+        border-radius: 8px;
+        padding: 15px;
+        font-family: -apple-system, 'SF Pro Text';
+        font-size: 15px;
+        line-height: 1.4;
+    }
+    QTextEdit:focus {
+        outline: none;
+    }
+"""
 
 class SignalEmitter(QObject):
-    text_signal = pyqtSignal(str)
-    direction_changed = pyqtSignal()
+    text_signal = pyqtSignal(str, bool, float, str, bool, str)
+    state_changed = pyqtSignal(str, str)
+
+def direction_text(is_zh_to_en, auto=False):
+    if auto:
+        return '自动 (中文 ⇄ 英文)'
+    return '中文 → 英文' if is_zh_to_en else '英文 → 中文'
+
+class SourcePane:
+    """多输入源模式下一个输入源的标题、切换按钮和文本区域"""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.label = None
+        self.transcript = None
+        self.last_switch_time = 0
+
+    def header_text(self):
+        status = STATUS_STYLES.get(self.engine.state, STATUS_STYLES['idle'])[0]
+        return f'{self.name}：{direction_text(self.engine.is_zh_to_en, self.engine.auto_direction)}  {status}'
 
 class TranslatorWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, capture=None):
         super().__init__()
         self.signal_emitter = SignalEmitter()
         self.is_zh_to_en = True
-        self.is_recording = True
-        self.translator = None
-        self.mic = None
-        self.stream = None
         self.switch_lock = False
         self.last_switch_time = 0
         self.switching = False
-        self.translation_thread = None
+        
+        # 翻译引擎在后台线程中运行, 窗口只订阅结果和状态;
+        # 配置了多个输入源时每个输入源一个引擎, 各自显示和切换方向
+        self.sources = None
+        self.source_panes = {}
+        if AUDIO_SOURCES and capture is None:
+            from translation.sources import SourceManager
+            self.sources = SourceManager()
+            self.engine = next(iter(self.sources.engines.values()))
+            self.source_panes = {name: SourcePane(name, engine) for name, engine in self.sources.engines.items()}
+            results = self.sources
+            self.sources.add_state_listener(self.signal_emitter.state_changed.emit)
+        else:
+            self.engine = TranslationEngine(is_zh_to_en=self.is_zh_to_en, capture=capture)
+            results = self.engine
+            self.engine.add_state_listener(lambda state: self.signal_emitter.state_changed.emit('', state))
+        results.subscribe(
+            lambda event: self.signal_emitter.text_signal.emit(
+                event.text, event.is_final, event.received_at, event.target_lang, event.is_primary,
+                event.source or '')
+        )
+
+        # 文本区域只保留最近的句子, 切换方向时还会清空; 完整记录写入字幕文件
+        self.exporter = None
+        if EXPORT_ENABLED:
+            from translation.export import SubtitleExporter
+            self.exporter = SubtitleExporter().attach(results)
+
+        # 保存到可搜索的历史数据库, 清空文本区域或退出后仍可查找
+        self.history = None
+        if HISTORY_ENABLED:
+            from translation.history import HistoryStore
+            self.history = HistoryStore().attach(results)
+
+        # 同时推送给局域网中的浏览器和其他设备
+        self.broadcaster = None
+        if BROADCAST_ENABLED:
+            from translation.broadcast import SubtitleBroadcaster
+            self.broadcaster = SubtitleBroadcaster().attach(results).start()
+
+        # 配置档文件修改后, 可热更新的参数立即应用到运行中的引擎
+        self.profiles = ProfileWatcher().start()
+        self.profiles.subscribe(results.apply_settings)
         
         self.init_ui()
         init_dashscope_api_key()
@@ -32,19 +128,17 @@ class TranslatorWindow(QMainWindow):
         
     def init_ui(self):
         self.setWindowTitle('实时语音翻译')
-        self.setGeometry(100, 100, 800, 300)
+        # 每种额外语言、每个额外的输入源增加一个文本面板
+        extra_languages = self.engine.extra_languages
+        extra_panes = len(extra_languages) + max(0, len(self.source_panes) - 1)
+        self.setGeometry(100, 100, 800, 300 + 140 * extra_panes)
         self.setAttribute(Qt.WidgetAttribute.WA_TranslucentBackground)
         self.setWindowFlags(Qt.WindowType.FramelessWindowHint)
         
+        # 背景由 BlurWindow 缓存绘制, 不在整个窗口上使用离屏效果
         main_widget = BlurWindow()
         self.setCentralWidget(main_widget)
         
-        shadow = QGraphicsDropShadowEffect()
-        shadow.setBlurRadius(20)
-        shadow.setColor(QColor(0, 0, 0, 80))
-        shadow.setOffset(0, 0)
-        main_widget.setGraphicsEffect(shadow)
-        
         layout = QVBoxLayout(main_widget)
         layout.setContentsMargins(20, 15, 20, 20)
         layout.setSpacing(15)
@@ -92,7 +186,7 @@ class TranslatorWindow(QMainWindow):
         direction_layout = QHBoxLayout(direction_widget)
         direction_layout.setContentsMargins(0, 0, 0, 0)
         
-        self.direction_label = QLabel('当前方向：中文 → 英文')
+        self.direction_label = QLabel(f'当前方向：{direction_text(self.is_zh_to_en, self.engine.auto_direction)}')
         self.direction_label.setStyleSheet("""
             QLabel {
                 color: rgba(255, 255, 255, 0.7);
@@ -101,49 +195,51 @@ class TranslatorWindow(QMainWindow):
             }
         """)
         
-        switch_btn = SwitchButton('切换方向')
-        switch_btn.clicked.connect(self.switch_direction)
-        
         direction_layout.addWidget(self.direction_label)
         direction_layout.addStretch()
-        direction_layout.addWidget(switch_btn)
+        # 自动双向模式下每句话自动选择方向, 不需要切换按钮
+        if not self.engine.auto_direction:
+            switch_btn = SwitchButton('切换方向')
+            switch_btn.clicked.connect(self.switch_direction)
+            direction_layout.addWidget(switch_btn)
         
-        layout.addWidget(direction_widget)
+        if not self.source_panes:
+            layout.addWidget(direction_widget)
         
         # 状态指示器
-        self.status_label = QLabel('正在识别...')
-        self.status_label.setStyleSheet("""
-            QLabel {
-                color: #28C840;
-                font-family: -apple-system, 'SF Pro Text';
-                font-size: 12px;
-                font-weight: 500;
-                padding: 4px 8px;
-                background: rgba(40, 200, 64, 0.15);
-                border-radius: 4px;
-            }
-        """)
+        self.status_label = QLabel()
+        self.set_status('', self.engine.state)
         layout.addWidget(self.status_label, alignment=Qt.AlignmentFlag.AlignCenter)
         
         # 文本显示区域
-        self.text_area = QTextEdit()
-        self.text_area.setReadOnly(True)
-        self.text_area.setStyleSheet("""
-            QTextEdit {
-                background-color: rgba(255, 255, 255, 0.08);
-                color: #FFFFFF;
-                border: none;
-                border-radius: 8px;
-                padding: 15px;
-                font-family: -apple-system, 'SF Pro Text';
-                font-size: 15px;
-                line-height: 1.4;
-            }
-            QTextEdit:focus {
-                outline: none;
-            }
-        """)
-        layout.addWidget(self.text_area)
+        if self.source_panes:
+            for pane in self.source_panes.values():
+                self.create_source_pane(layout, pane)
+            first = next(iter(self.source_panes.values()))
+            self.text_area, self.transcript = first.transcript.text_edit, first.transcript
+        else:
+            self.text_area = self.create_text_area()
+            layout.addWidget(self.text_area, stretch=2)
+            self.transcript = TranscriptRenderer(self.text_area, metrics=self.engine.metrics)
+
+        # 额外语言面板, 与主面板共用同一个会话的结果
+        self.extra_transcripts = {}
+        for lang in extra_languages:
+            pane_label = QLabel(LANGUAGE_NAMES.get(lang, lang))
+            pane_label.setStyleSheet("""
+                QLabel {
+                    color: rgba(255, 255, 255, 0.6);
+                    font-family: -apple-system, 'SF Pro Text';
+                    font-size: 12px;
+                }
+            """)
+            pane = self.create_text_area()
+            layout.addWidget(pane_label)
+            layout.addWidget(pane, stretch=1)
+            self.extra_transcripts[lang] = TranscriptRenderer(pane)
+        if METRICS_OVERLAY and self.engine.metrics is not None:
+            from .metrics_overlay import MetricsOverlay
+            self.metrics_overlay = MetricsOverlay(self.engine.metrics, self.text_area)
         
         # 底部信息
         info_label = QLabel('Powered by LFNL TECH')
@@ -157,16 +253,62 @@ class TranslatorWindow(QMainWindow):
         layout.addWidget(info_label, alignment=Qt.AlignmentFlag.AlignCenter)
         
         self.signal_emitter.text_signal.connect(self.update_text)
-        self.signal_emitter.direction_changed.connect(self.restart_translation)
+        self.signal_emitter.state_changed.connect(self.set_status)
         
         self.old_pos = None
     
+    def create_text_area(self):
+        text_area = QTextEdit()
+        text_area.setReadOnly(True)
+        text_area.setStyleSheet(TEXT_AREA_STYLE)
+        return text_area
+
+    def create_source_pane(self, layout, pane):
+        header = QWidget()
+        header_layout = QHBoxLayout(header)
+        header_layout.setContentsMargins(0, 0, 0, 0)
+        pane.label = QLabel(pane.header_text())
+        pane.label.setStyleSheet("""
+            QLabel {
+                color: rgba(255, 255, 255, 0.7);
+                font-family: -apple-system, 'SF Pro Text';
+                font-size: 13px;
+            }
+        """)
+        header_layout.addWidget(pane.label)
+        header_layout.addStretch()
+        if not pane.engine.auto_direction:
+            switch_btn = SwitchButton('切换方向')
+            switch_btn.clicked.connect(lambda checked=False, name=pane.name: self.switch_source_direction(name))
+            header_layout.addWidget(switch_btn)
+
+        text_area = self.create_text_area()
+        layout.addWidget(header)
+        layout.addWidget(text_area, stretch=2)
+        pane.transcript = TranscriptRenderer(text_area, metrics=pane.engine.metrics)
+
+    def switch_source_direction(self, name):
+        """只切换一个输入源的方向, 其他输入源继续翻译"""
+        pane = self.source_panes[name]
+        current_time = time.time()
+        if current_time - pane.last_switch_time < SWITCH_DEBOUNCE:
+            return
+        pane.last_switch_time = current_time
+        try:
+            pane.transcript.clear()
+            self.sources.switch_direction(name)
+            if pane.engine.state == CLOSED:
+                pane.engine.start()
+            pane.label.setText(pane.header_text())
+        except Exception:
+            logger.exception("切换出错")
+
     def switch_direction(self):
         if self.switching:
             return
             
         current_time = time.time()
-        if self.switch_lock or (current_time - self.last_switch_time) < 2:
+        if self.switch_lock or (current_time - self.last_switch_time) < SWITCH_DEBOUNCE:
             return
         
         self.switching = True
@@ -174,115 +316,43 @@ class TranslatorWindow(QMainWindow):
         self.last_switch_time = current_time
         
         try:
-            # 停止当前翻译
-            self.is_recording = False
-            self.cleanup_resources()
-            
             # 更新UI
             self.is_zh_to_en = not self.is_zh_to_en
-            direction_text = '中文 → 英文' if self.is_zh_to_en else '英文 → 中文'
-            self.direction_label.setText(f'当前方向：{direction_text}')
-            self.text_area.clear()
+            self.direction_label.setText(f'当前方向：{direction_text(self.is_zh_to_en)}')
+            self.transcript.clear()
             
-            self.status_label.setText('正在切换...')
-            self.status_label.setStyleSheet("""
-                QLabel {
-                    color: #FEBC2E;
-                    font-family: -apple-system, 'SF Pro Text';
-                    font-size: 12px;
-                    font-weight: 500;
-                    padding: 4px 8px;
-                    background: rgba(254, 188, 46, 0.15);
-                    border-radius: 4px;
-                }
-            """)
-            
-            # 延迟启动新的翻译
-            QTimer.singleShot(1500, self._delayed_direction_change)
-            
-        except Exception as e:
-            print(f"切换出错: {str(e)}")
-            self.switching = False
-            self.switch_lock = False
-    
-    def _delayed_direction_change(self):
-        try:
-            # 重新初始化翻译
-            self.is_recording = True
-            self.init_translation()
+            # 保留音频设备, 只替换翻译会话
+            self.engine.switch_direction(self.is_zh_to_en)
+            if self.engine.state == CLOSED:
+                # 引擎因错误停止时, 切换方向同时重新启动
+                self.engine.start()
             
-            # 更新状态显示
-            self.status_label.setText('正在识别...')
-            self.status_label.setStyleSheet("""
-                QLabel {
-                    color: #28C840;
-                    font-family: -apple-system, 'SF Pro Text';
-                    font-size: 12px;
-                    font-weight: 500;
-                    padding: 4px 8px;
-                    background: rgba(40, 200, 64, 0.15);
-                    border-radius: 4px;
-                }
-            """)
-        except Exception as e:
-            print(f"切换方向时出错: {str(e)}")
+        except Exception:
+            logger.exception("切换出错")
         finally:
             self.switching = False
             self.switch_lock = False
     
-    def restart_translation(self):
-        self.is_recording = False
-        self.cleanup_resources()
-        time.sleep(1.0)
-        self.is_recording = True
-        self.init_translation()
-    
-    def cleanup_resources(self):
-        print("开始清理资源...")
-        
-        # 停止录音
-        self.is_recording = False
-        
-        # 清理翻译器
-        if self.translator:
-            try:
-                print("停止翻译器...")
-                self.translator.stop()
-                time.sleep(0.3)  # 给翻译器更多时间完成停止操作
-            except Exception as e:
-                print(f"停止翻译器时出错: {str(e)}")
-            finally:
-                self.translator = None
-        
-        # 清理音频流
-        if self.stream:
-            try:
-                print("关闭音频流...")
-                if self.stream.is_active():
-                    self.stream.stop_stream()
-                time.sleep(0.2)
-                self.stream.close()
-            except Exception as e:
-                print(f"关闭音频流时出错: {str(e)}")
-            finally:
-                self.stream = None
-        
-        # 清理音频设备
-        if self.mic:
-            try:
-                print("终止音频设备...")
-                self.mic.terminate()
-                time.sleep(0.2)
-            except Exception as e:
-                print(f"终止音频设备时出错: {str(e)}")
-            finally:
-                self.mic = None
-        
-        # 强制进行垃圾回收
-        import gc
-        gc.collect()
-        
-        print("资源清理完成")
+    def set_status(self, source, state):
+        pane = self.source_panes.get(source)
+        if pane is not None:
+            if pane.label is not None:
+                pane.label.setText(pane.header_text())
+            states = {p.engine.state for p in self.source_panes.values()}
+            state = next((s for s in STATE_PRIORITY if s in states), state)
+        text, color, background = STATUS_STYLES.get(state, STATUS_STYLES['idle'])
+        self.status_label.setText(text)
+        self.status_label.setStyleSheet(f"""
+            QLabel {{
+                color: {color};
+                font-family: -apple-system, 'SF Pro Text';
+                font-size: 12px;
+                font-weight: 500;
+                padding: 4px 8px;
+                background: {background};
+                border-radius: 4px;
+            }}
+        """)
     
     def mousePressEvent(self, event):
         if event.button() == Qt.MouseButton.LeftButton:
@@ -302,27 +372,33 @@ class TranslatorWindow(QMainWindow):
             self.close()
     
     def init_translation(self):
-        print("开始初始化翻译...")
-        from translation.translator import init_translation_thread
-        init_translation_thread(self)
+        logger.info("开始初始化翻译...")
+        if self.sources is not None:
+            self.sources.start()
+        else:
+            self.engine.start()
     
-    def update_text(self, text):
-        current_text = self.text_area.toPlainText()
-        if current_text != text:
-            self.text_area.setText(text)
-            
-            effect = QGraphicsDropShadowEffect()
-            effect.setColor(QColor(255, 255, 255, 0))
-            self.text_area.setGraphicsEffect(effect)
-            
-            animation = QPropertyAnimation(effect, b"color")
-            animation.setDuration(200)
-            animation.setStartValue(QColor(255, 255, 255, 0))
-            animation.setEndValue(QColor(255, 255, 255, 15))
-            animation.setEasingCurve(QEasingCurve.Type.OutCubic)
-            animation.start()
+    def update_text(self, text, is_final, received_at, target_lang, is_primary, source):
+        # 合并到下一帧增量绘制, 避免每条中间结果都重排整个文档
+        if is_primary:
+            pane = self.source_panes.get(source)
+            transcript = pane.transcript if pane is not None else self.transcript
+            transcript.push(text, is_final, received_at)
+            return
+        transcript = self.extra_transcripts.get(target_lang)
+        if transcript is not None:
+            transcript.push(text, is_final, received_at)
     
     def closeEvent(self, event):
-        self.is_recording = False
-        self.cleanup_resources()
+        self.profiles.stop()
+        if self.sources is not None:
+            self.sources.stop()
+        else:
+            self.engine.stop()
+        if self.exporter is not None:
+            self.exporter.close()
+        if self.history is not None:
+            self.history.close()
+        if self.broadcaster is not None:
+            self.broadcaster.stop()
         event.accept()
\ No newline at end of file
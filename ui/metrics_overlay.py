@@ -0,0 +1,50 @@
+from PyQt6.QtWidgets import QLabel
+from PyQt6.QtCore import Qt, QTimer
+
+# 悬浮层显示的直方图及其标签
+OVERLAY_ROWS = (
+    ('capture_to_result_ms', '采集→结果'),
+    ('first_partial_ms', '首个结果'),
+    ('final_ms', '最终结果'),
+    ('result_to_paint_ms', '结果→绘制'),
+    ('paint_ms', '绘制'),
+)
+
+class MetricsOverlay(QLabel):
+    """在文本区域右上角显示延迟统计 (p50 / p90, 毫秒), 每秒刷新一次"""
+
+    def __init__(self, metrics, parent, interval_ms=1000):
+        super().__init__(parent)
+        self.metrics = metrics
+        self.setAttribute(Qt.WidgetAttribute.WA_TransparentForMouseEvents)
+        self.setStyleSheet("""
+            QLabel {
+                color: rgba(255, 255, 255, 0.75);
+                background: rgba(0, 0, 0, 0.45);
+                border-radius: 4px;
+                padding: 4px 6px;
+                font-family: Menlo, Consolas, monospace;
+                font-size: 10px;
+            }
+        """)
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self._timer.start(interval_ms)
+        self.refresh()
+
+    def refresh(self):
+        histograms = self.metrics.snapshot()['histograms']
+        lines = []
+        for name, label in OVERLAY_ROWS:
+            h = histograms[name]
+            if 'p50' in h:
+                lines.append(f"{label} {h['p50']:>6.0f} / {h['p90']:>6.0f}")
+            else:
+                lines.append(f"{label} {'-':>6} / {'-':>6}")
+        self.setText('\n'.join(lines))
+        self.adjustSize()
+
+        parent = self.parentWidget()
+        self.move(parent.width() - self.width() - 8, 8)
+        self.raise_()
@@ -0,0 +1,115 @@
+import time
+from PyQt6.QtWidgets import QGraphicsDropShadowEffect
+from PyQt6.QtCore import QObject, QTimer, QPropertyAnimation, QEasingCurve
+from PyQt6.QtGui import QColor, QTextCursor, QGuiApplication
+
+from utils.config import TRANSCRIPT_MAX_LINES, RENDER_MAX_FPS, TRANSCRIPT_GLOW
+
+class TranscriptRenderer(QObject):
+    """增量渲染翻译文本
+
+    已结束的句子逐行追加到文档末尾, 只有最后一行 (正在识别的句子) 会被改写。
+    收到的结果先暂存, 按屏幕刷新率合并后统一绘制: 中间结果只保留最新一条,
+    句子结束的结果全部保留。文档行数超过上限时自动丢弃最早的行。
+
+    glow 为 True 时每次更新在文本区域上播放一次高亮动画; 动画期间每一帧都要离屏重绘
+    整个文本区域, 默认关闭。
+    """
+
+    def __init__(self, text_edit, max_lines=TRANSCRIPT_MAX_LINES, max_fps=RENDER_MAX_FPS, metrics=None,
+                 glow=TRANSCRIPT_GLOW):
+        super().__init__(text_edit)
+        self.text_edit = text_edit
+        self.metrics = metrics
+        self.document = text_edit.document()
+        # 多出的一行用于显示正在识别的句子
+        self.document.setMaximumBlockCount(max_lines + 1)
+
+        self._pending_finals = []
+        self._pending_partial = None
+        self._pending_since = None   # 待绘制结果中最早的到达时间
+        self._tail_text = ''
+
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self._frame_interval(max_fps))
+        self._timer.timeout.connect(self.flush)
+
+        # 高亮效果和动画只创建一次, 每次更新时重复使用
+        self._animation = None
+        if glow:
+            self._effect = QGraphicsDropShadowEffect()
+            self._effect.setColor(QColor(255, 255, 255, 0))
+            self.text_edit.setGraphicsEffect(self._effect)
+
+            self._animation = QPropertyAnimation(self._effect, b"color", self)
+            self._animation.setDuration(200)
+            self._animation.setStartValue(QColor(255, 255, 255, 0))
+            self._animation.setEndValue(QColor(255, 255, 255, 15))
+            self._animation.setEasingCurve(QEasingCurve.Type.OutCubic)
+
+    @staticmethod
+    def _frame_interval(max_fps):
+        screen = QGuiApplication.primaryScreen()
+        refresh_rate = screen.refreshRate() if screen else 60.0
+        if max_fps and max_fps > 0:
+            refresh_rate = min(refresh_rate, max_fps)
+        return max(1, int(1000 / max(refresh_rate, 1.0)))
+
+    def push(self, text, is_final, received_at=None):
+        """接收一条翻译结果, 在下一帧统一绘制"""
+        if self._pending_since is None:
+            self._pending_since = received_at
+        if is_final:
+            self._pending_finals.append(text)
+            self._pending_partial = None
+        else:
+            self._pending_partial = text
+
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        started_at = time.monotonic()
+        received_at = self._pending_since
+        finals = self._pending_finals
+        partial = self._pending_partial
+        self._pending_finals = []
+        self._pending_partial = None
+        self._pending_since = None
+
+        tail = partial if partial is not None else ('' if finals else self._tail_text)
+        if not finals and tail == self._tail_text:
+            return
+
+        scrollbar = self.text_edit.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+
+        cursor = QTextCursor(self.document)
+        cursor.beginEditBlock()
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveMode.KeepAnchor)
+        for text in finals:
+            # 用句子的最终结果替换最后一行, 然后另起一行
+            cursor.insertText(text)
+            cursor.insertBlock()
+        cursor.insertText(tail)
+        cursor.endEditBlock()
+        self._tail_text = tail
+
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+        if self._animation is not None and self._animation.state() != QPropertyAnimation.State.Running:
+            self._animation.start()
+
+        if self.metrics is not None:
+            self.metrics.on_paint(received_at, started_at, time.monotonic())
+
+    def clear(self):
+        self._timer.stop()
+        self._pending_finals = []
+        self._pending_partial = None
+        self._pending_since = None
+        self._tail_text = ''
+        self.document.clear()
@@ -1,17 +1,150 @@
 import os
-import dashscope
 
 def init_dashscope_api_key():
+    # SDK 加载较慢, 只在需要时导入, 不连接服务的场景 (如列出设备) 不受影响
+    import dashscope
     if 'DASHSCOPE_API_KEY' in os.environ:
         dashscope.api_key = os.environ['DASHSCOPE_API_KEY']
     else:
+        # 未设置时使用占位符, 连接时会返回鉴权错误
+        from .logger import get_logger
+        get_logger('config').warning("未设置环境变量 DASHSCOPE_API_KEY, 无法连接翻译服务")
         dashscope.api_key = '<your api-key>'
 
+# 日志配置
+LOG_LEVEL = 'INFO'                  # DEBUG 级别会输出每条翻译结果 (已限速)
+LOG_FILE = None                     # 日志文件路径, None 表示只输出到控制台
+LOG_FORMAT = 'text'                 # text / json
+LOG_QUEUE_SIZE = 10000              # 日志队列容量, 写入跟不上时丢弃新日志而不阻塞
+LOG_RATE_LIMIT_INTERVAL = 1.0       # 热路径日志的最小输出间隔 (秒)
+
 # 音频配置
 AUDIO_FORMAT = 'pcm'
 SAMPLE_RATE = 16000
-CHUNK_SIZE = 3200
+FRAME_MS = 200                       # 每块音频的时长 (毫秒), 越短延迟越低, 发送次数和 CPU 开销越高; CHUNK_SIZE 由此换算
 CHANNELS = 1
+SAMPLE_WIDTH = 2  # paInt16 每个采样占用的字节数
+
+# 音频采集配置
+CAPTURE_NATIVE_FORMAT = True         # 按设备原生采样率和声道数采集, 再转换为 16 kHz 单声道
+CAPTURE_DEVICE_INDEX = None          # 输入设备编号, None 表示系统默认输入设备
+CAPTURE_MAX_CHANNELS = 2             # 按原生声道采集时最多打开的声道数
+CAPTURE_PROCESS = False              # 在单独的子进程中采集, 经共享内存交给发送线程, 采集不受界面和网络线程影响
+CAPTURE_PROCESS_START_TIMEOUT = 10.0 # 等待采集子进程打开设备的最长时间 (秒)
+AUDIO_SOURCES = []                   # 同时翻译的多个输入源, 例如 [{'name': 'mic', 'device': 1, 'direction': 'zh-en'},
+                                     # {'name': 'speaker', 'device': 3, 'direction': 'en-zh'}], 为空时只使用 CAPTURE_DEVICE_INDEX
+RESAMPLE_TAPS = 32                   # 重采样滤波器每个相位的抽头数
+RESAMPLE_ROLLOFF = 0.92              # 重采样滤波器截止频率相对奈奎斯特频率的比例
+RESAMPLE_KAISER_BETA = 8.0           # 重采样滤波器 Kaiser 窗参数
+
+# 音频缓冲配置
+RING_BUFFER_SECONDS = 10.0           # 环形缓冲区容量 (秒), 换算为 RING_BUFFER_CHUNKS 块
+RING_BUFFER_POLICY = 'drop_oldest'   # 缓冲区满时的策略: drop_oldest / drop_newest / block
+RING_BUFFER_BLOCK_TIMEOUT = 0.05     # block 策略下采集端最长等待时间 (秒)
+BUFFER_STATS_INTERVAL = 5.0          # 输出缓冲区统计信息的最小间隔 (秒)
+PUMP_BURST = 8                       # 多个输入源共用发送线程时, 每轮为每个输入源最多发送的音频块数
+AUDIO_TIMELINE_SECONDS = 120.0       # 每个会话保留已发送音频时间戳的时长 (秒), 用于把结果时间对应回采集时间
+
+# 上传编码配置
+UPLOAD_ENCODING = 'pcm'             # 上传音频的编码: pcm / opus; opus 需要 opuslib 和系统的 libopus, 不可用时回退到 pcm
+OPUS_BITRATE = 24000                # Opus 码率 (bit/s), 16 kHz 语音 16000~32000 即可
+OPUS_FRAME_MS = 20                  # Opus 帧长 (毫秒): 10 / 20 / 40 / 60
+ENCODE_QUEUE_CHUNKS = 50            # 等待编码的音频块数上限, 满时音频发送线程等待 (不影响采集)
+
+# 语音活动检测 (VAD) 配置, 静音时不上传音频
+VAD_ENABLED = False
+VAD_FRAME_MS = 20                   # 分析帧长 (毫秒)
+VAD_ENERGY_THRESHOLD_DB = -50.0     # 判定为语音的最低能量 (dBFS)
+VAD_SNR_DB = 10.0                   # 判定为语音需高出背景噪声的能量 (dB)
+VAD_ZCR_MAX = 0.45                  # 过零率上限, 用于排除宽带噪声
+VAD_HANGOVER_MS = 600               # 语音结束后继续发送的时长 (毫秒)
+VAD_PREROLL_MS = 300                # 语音开始前补发的音频时长 (毫秒)
+VAD_KEEPALIVE_INTERVAL = 5.0        # 静音期间发送保活静音帧的间隔 (秒), 会话 23 秒无音频会超时
+
+# 多语言输出配置
+EXTRA_TARGET_LANGUAGES = []         # 同一会话内额外翻译的目标语言, 例如 ['ja', 'ko'], 每种语言单独显示
+
+# 术语表配置
+GLOSSARY_PATH = None                # 术语表文件 (JSON 或 TSV), 按文本语言替换译文和原文中的术语, None 表示不启用
+GLOSSARY_IGNORE_CASE = True         # 匹配术语时忽略大小写
+GLOSSARY_RELOAD_INTERVAL = 2.0      # 检查术语表文件是否修改的间隔 (秒), 0 表示不自动重新加载
+
+# 方向切换与会话池配置
+AUTO_DIRECTION = False              # 自动双向翻译: 一个会话同时翻译为中英文, 按每句话识别出的源语言显示译文, 不需要切换方向
+SWITCH_DEBOUNCE = 0.3               # 两次切换之间的最小间隔 (秒)
+SESSION_POOL_SIZE = 1               # 每个翻译方向预先建立的备用会话数, 0 表示不预连接
+SESSION_POOL_RETRY_INTERVAL = 2.0   # 备用会话连接失败后再次尝试的最小间隔 (秒)
+STANDBY_KEEPALIVE_INTERVAL = 5.0    # 向备用会话发送静音保活的间隔 (秒), 0 表示不保活
+MAX_FAILOVER_ATTEMPTS = 6           # 收到结果前允许的连续故障切换次数
+RECONNECT_BACKOFF_BASE = 0.5        # 重连退避的初始间隔 (秒), 此后每次失败翻倍; 第一次故障切换立即进行
+RECONNECT_BACKOFF_MAX = 8.0         # 重连退避的最大间隔 (秒)
+RECONNECT_BACKOFF_JITTER = 0.5      # 退避间隔随机缩短的最大比例, 避免多个客户端同时重连
+RECONNECT_REPLAY_SECONDS = 10.0     # 保留最近发送音频的时长 (秒), 故障切换时把未定稿的部分补发给新会话, 0 表示不补发
+RECONNECT_MAX_CATCHUP = 8.0         # 发送音频允许的最大滞后 (秒), 断线期间积压的更早音频直接丢弃, 0 表示不限制
+
+# 引擎配置
+ENGINE_STOP_TIMEOUT = 2.0           # 停止引擎时等待资源释放的最长时间 (秒)
+
+# 延迟统计配置
+METRICS_ENABLED = False             # 记录逐句延迟直方图
+METRICS_WINDOW = 1000               # 每个直方图保留的最近样本数
+METRICS_USAGE_REQUESTS = 100        # 统计中保留用量明细的最近请求数
+METRICS_HTTP_PORT = 0               # 统计接口端口 (http://127.0.0.1:端口/metrics), 0 表示不启用
+METRICS_DUMP_PATH = None            # 定期写入统计的 JSON 文件路径, None 表示不写入
+METRICS_DUMP_INTERVAL = 10.0        # 写入统计文件的间隔 (秒)
+METRICS_OVERLAY = False             # 在窗口上显示延迟统计 (需同时启用 METRICS_ENABLED)
+
+# 字幕导出配置
+EXPORT_ENABLED = False              # 把定稿的句子流式写入字幕文件
+EXPORT_DIR = 'subtitles'            # 字幕目录, 每次运行生成一组以启动时间命名的文件
+EXPORT_FORMATS = ['srt', 'vtt', 'jsonl']
+EXPORT_LANGUAGES = None             # 导出的目标语言, None 表示全部 (包括额外语言)
+EXPORT_INCLUDE_SOURCE = True        # 字幕中同时写入原文
+EXPORT_QUEUE_SIZE = 1000            # 待写入句子队列容量, 写入跟不上时丢弃并计数
+EXPORT_BATCH_SIZE = 50              # 每次最多合并写入的句子数
+EXPORT_FLUSH_INTERVAL = 1.0         # 把缓冲内容写入文件的间隔 (秒)
+EXPORT_FSYNC_INTERVAL = 5.0         # 调用 fsync 落盘的间隔 (秒)
+
+# 翻译历史配置
+HISTORY_ENABLED = False             # 把定稿的句子保存到本地 SQLite 数据库, 可按关键词搜索 (python -m translation.history)
+HISTORY_PATH = 'history.db'         # 历史数据库路径, 每次运行的句子追加到同一个数据库
+HISTORY_QUEUE_SIZE = 1000           # 待写入句子队列容量, 写入跟不上时丢弃并计数
+HISTORY_BATCH_SIZE = 200            # 每个事务最多写入的句子数
+HISTORY_FLUSH_INTERVAL = 1.0        # 第一句入队后最多等待的时间 (秒), 之后写入当前这一批
+
+# 字幕广播配置
+BROADCAST_ENABLED = False           # 通过 WebSocket / SSE 向局域网客户端推送字幕
+BROADCAST_HOST = '127.0.0.1'        # 监听地址, 局域网访问设为 '0.0.0.0'
+BROADCAST_PORT = 8770               # 监听端口, 0 表示随机端口
+BROADCAST_CLIENT_QUEUE = 32         # 每个客户端待发送的消息数上限, 中间结果合并, 定稿结果超出时断开该客户端
+BROADCAST_MAX_CLIENTS = 500         # 同时连接的最大客户端数
+BROADCAST_HEARTBEAT = 20.0          # WebSocket 心跳和 SSE 保活间隔 (秒), 0 表示不发送
+BROADCAST_SEND_BUFFER = 8192        # 每个客户端的套接字发送缓冲 (字节), 较小时慢客户端收到的过时中间结果更少
+
+# 离线批量翻译配置
+BATCH_WORKERS = 4                   # 同时翻译的文件数
+BATCH_SEND_SPEED = 10.0             # 发送音频的速度 (实时倍数), 0 表示不限速
+BATCH_MAX_ATTEMPTS = 3              # 每个文件的最多尝试次数
+BATCH_RETRY_DELAY = 2.0             # 重试前等待的时间 (秒), 按尝试次数递增
+
+# 界面配置
+TRANSCRIPT_MAX_LINES = 200          # 文本区域保留的最大句子行数
+RENDER_MAX_FPS = 0                  # 文本刷新的最大帧率, 0 表示跟随屏幕刷新率
+TRANSCRIPT_GLOW = False             # 文本更新时的高亮动画 (每帧离屏重绘整个文本区域, 开销较大)
 
 # 翻译模型配置
-TRANSLATION_MODEL = 'gummy-realtime-v1' 
\ No newline at end of file
+TRANSLATION_MODEL = 'gummy-realtime-v1' 
+
+# 运行配置档, 按名称覆盖上面的默认值, 见 utils/profiles.py
+PROFILE = os.environ.get('TRANSFLOAT_PROFILE', 'balanced')   # 内置: balanced / low-latency / efficient
+PROFILE_FILE = os.environ.get('TRANSFLOAT_PROFILE_FILE')     # 自定义配置档 JSON 文件, None 表示只使用内置配置档
+PROFILE_RELOAD_INTERVAL = 2.0       # 检查配置档文件是否修改的间隔 (秒), 0 表示不自动重新加载
+
+from .profiles import SCHEMA as _PROFILE_SCHEMA, load_profile as _load_profile
+PROFILE_DEFAULTS = {key: globals()[key] for key in _PROFILE_SCHEMA}   # 应用配置档之前的默认值
+globals().update(_load_profile(PROFILE_DEFAULTS, PROFILE, PROFILE_FILE, os.environ))
+
+# 由配置档中的时长换算的块数
+CHUNK_SIZE = SAMPLE_RATE * FRAME_MS // 1000                                   # 每块音频的采样数
+RING_BUFFER_CHUNKS = max(2, round(RING_BUFFER_SECONDS * 1000 / FRAME_MS))
+AUDIO_TIMELINE_CHUNKS = max(1, round(AUDIO_TIMELINE_SECONDS * 1000 / FRAME_MS))
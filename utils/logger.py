@@ -0,0 +1,197 @@
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+from utils.config import LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_QUEUE_SIZE
+
+ROOT_LOGGER = 'transfloat'
+
+# 结构化字段; 日志调用时通过 extra 传入, 未传入时显示为 '-'
+CONTEXT_FIELDS = ('source', 'session', 'direction', 'request_id')
+
+_listener = None
+_handler = None
+_rate_limiters = weakref.WeakSet()
+
+
+def get_logger(name):
+    """返回 transfloat 下的子日志器, 例如 get_logger('engine')"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class ContextFilter(logging.Filter):
+    """补全缺失的结构化字段, 保证格式化时字段总是存在"""
+
+    def filter(self, record):
+        for field in CONTEXT_FIELDS:
+            if not hasattr(record, field):
+                setattr(record, field, '-')
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, '-')
+            if value != '-':
+                entry[field] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """写入有界队列的日志处理器; 队列满时丢弃日志而不是阻塞调用线程"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 只合并消息参数, 格式化在后台线程中进行
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=LOG_LEVEL, path=LOG_FILE, fmt=LOG_FORMAT, queue_size=LOG_QUEUE_SIZE):
+    """配置日志: 调用线程只把日志放入队列, 由后台线程写入控制台和文件
+
+    重复调用时先停止之前的后台线程。程序退出时自动把队列中剩余的日志写完。
+    """
+    global _listener, _handler
+    shutdown_logging()
+
+    if fmt == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            '%(asctime)s %(levelname)-7s %(name)s [%(source)s %(session)s %(direction)s %(request_id)s] %(message)s'
+        )
+
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if path:
+        handlers.append(logging.FileHandler(path, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(ContextFilter())
+    _listener = QueueListener(_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger(ROOT_LOGGER)
+    root.handlers[:] = [_handler]
+    root.setLevel(level)
+    root.propagate = False
+    return root
+
+
+def shutdown_logging():
+    """停止后台写入线程, 写完队列中剩余的日志"""
+    global _listener, _handler
+    # 先输出限流中被省略的日志
+    for limiter in list(_rate_limiters):
+        limiter.flush()
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_handler)
+        _handler = None
+
+
+def dropped_records():
+    """因队列已满被丢弃的日志条数"""
+    return _handler.dropped if _handler is not None else 0
+
+
+class RateLimiter:
+    """限制热路径日志的输出频率
+
+    同一个 key 在 interval 秒内只输出一次, 期间被省略的条数附在下一次输出中。
+    超过 interval 秒没有再输出的 key 会被清除; 清除时如果还有被省略的日志, 输出其中
+    最后一条和省略的条数, 突发结束在限流期间时也不会丢失计数。
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}   # key -> [条数, logger, level, msg, args, kwargs] (最后一条被省略的日志)
+        self._next_sweep = float('-inf')
+        self._lock = threading.Lock()
+        _rate_limiters.add(self)
+
+    def log(self, logger, level, key, msg, *args, **kwargs):
+        if not logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        with self._lock:
+            stale = self._sweep(now) if now >= self._next_sweep else ()
+            if now - self._last.get(key, float('-inf')) < self.interval:
+                entry = self._suppressed.get(key)
+                count = entry[0] + 1 if entry else 1
+                self._suppressed[key] = [count, logger, level, msg, args, kwargs]
+                suppressed = None
+            else:
+                self._last[key] = now
+                entry = self._suppressed.pop(key, None)
+                suppressed = entry[0] if entry else 0
+        self._emit_suppressed(stale)
+        if suppressed is None:
+            return
+        if suppressed:
+            msg = f"{msg} (已省略 {suppressed} 条)"
+        logger.log(level, msg, *args, **kwargs)
+
+    def flush(self):
+        """输出所有 key 中被省略的日志并清空记录"""
+        with self._lock:
+            stale = list(self._suppressed.values())
+            self._suppressed.clear()
+            self._last.clear()
+        self._emit_suppressed(stale)
+
+    def _sweep(self, now):
+        """清除超过 interval 秒没有输出的 key, 返回其中被省略的日志; 调用方持有锁"""
+        self._next_sweep = now + self.interval
+        expired = [key for key, last in self._last.items() if now - last >= self.interval]
+        stale = []
+        for key in expired:
+            del self._last[key]
+            entry = self._suppressed.pop(key, None)
+            if entry:
+                stale.append(entry)
+        return stale
+
+    @staticmethod
+    def _emit_suppressed(entries):
+        for count, logger, level, msg, args, kwargs in entries:
+            if count > 1:
+                msg = f"{msg} (已省略 {count - 1} 条)"
+            logger.log(level, msg, *args, **kwargs)
+
+
+atexit.register(shutdown_logging)
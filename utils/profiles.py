@@ -0,0 +1,261 @@
+"""
+运行配置档
+
+在延迟和开销之间取舍的参数按名称成组。启动时依次合并内置配置档、配置档文件和
+环境变量并校验, 覆盖 utils/config.py 中的默认值, 参数无效时直接报错退出:
+
+    TRANSFLOAT_PROFILE=low-latency python -m translation
+    TRANSFLOAT_PROFILE_FILE=profiles.json TRANSFLOAT_PROFILE=studio python main.py
+    TRANSFLOAT_FRAME_MS=40 python -m translation        # 单独覆盖某个参数
+
+配置档文件为 JSON, {名称: {参数: 值}}, 可用 extends 指定基于哪个配置档 (默认 balanced):
+
+    {"studio": {"extends": "low-latency", "FRAME_MS": 40, "VAD_ENABLED": true}}
+
+运行期间配置档文件修改后, 可热更新的参数 (VAD 阈值、发送调度等) 立即应用到运行中的
+引擎; 其余参数 (帧长、缓冲区、会话池等) 记录警告, 重启后生效。
+
+    python -m utils.profiles [名称]      # 校验并显示配置档的最终取值
+"""
+import os
+import sys
+import json
+import logging
+import argparse
+import threading
+
+# 本模块由 utils.config 导入, 不能反过来导入 utils.logger
+logger = logging.getLogger('transfloat.profiles')
+
+ENV_PREFIX = 'TRANSFLOAT_'
+
+# 参数: (类型, 取值范围或可选值, 是否可热更新)
+SCHEMA = {
+    'FRAME_MS': (int, (10, 1000), False),
+    'RING_BUFFER_SECONDS': (float, (0.5, 120.0), False),
+    'RING_BUFFER_POLICY': (str, ('drop_oldest', 'drop_newest', 'block'), False),
+    'AUDIO_TIMELINE_SECONDS': (float, (10.0, 3600.0), False),
+    'PUMP_BURST': (int, (1, 100), True),
+    'SESSION_POOL_SIZE': (int, (0, 4), False),
+    'STANDBY_KEEPALIVE_INTERVAL': (float, (0.0, 20.0), False),
+    'RECONNECT_MAX_CATCHUP': (float, (0.0, 120.0), True),
+    'UPLOAD_ENCODING': (str, ('pcm', 'opus'), False),
+    'OPUS_BITRATE': (int, (6000, 128000), False),
+    'VAD_ENABLED': (bool, None, False),
+    'VAD_FRAME_MS': (int, (10, 100), False),
+    'VAD_ENERGY_THRESHOLD_DB': (float, (-100.0, 0.0), True),
+    'VAD_SNR_DB': (float, (0.0, 60.0), True),
+    'VAD_ZCR_MAX': (float, (0.0, 1.0), True),
+    'VAD_HANGOVER_MS': (int, (0, 5000), True),
+    'VAD_PREROLL_MS': (int, (0, 2000), True),
+    'VAD_KEEPALIVE_INTERVAL': (float, (0.0, 20.0), True),
+    'TRANSLATION_MODEL': (str, None, False),
+}
+
+BUILTIN_PROFILES = {
+    # utils/config.py 中的默认值: 200 ms 帧
+    'balanced': {},
+    # 20 ms 帧, 采集后尽快发送; 断线积压超过 3 秒的音频直接丢弃以追上实时
+    'low-latency': {'FRAME_MS': 20, 'PUMP_BURST': 16, 'RECONNECT_MAX_CATCHUP': 3.0},
+    # 400 ms 帧并跳过静音, 发送次数和上传时长最少; 不预连接备用会话, 切换方向较慢
+    'efficient': {'FRAME_MS': 400, 'PUMP_BURST': 4, 'VAD_ENABLED': True, 'SESSION_POOL_SIZE': 0},
+}
+
+TRUE_STRINGS = ('1', 'true', 'yes', 'on')
+FALSE_STRINGS = ('0', 'false', 'no', 'off')
+
+
+class ProfileError(ValueError):
+    """配置档不存在或参数无效"""
+
+
+def read_profile_file(path):
+    """读取配置档文件, 返回 {名称: {参数: 值}}"""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or not all(isinstance(v, dict) for v in data.values()):
+        raise ProfileError(f"{path}: 配置档文件应为 {{名称: {{参数: 值}}}}")
+    return data
+
+
+def resolve(profiles, name):
+    """按 extends 展开配置档, 返回合并后的 {参数: 值}"""
+    chain = []
+    while name is not None:
+        if name in chain:
+            raise ProfileError(f"配置档循环继承: {' -> '.join(chain + [name])}")
+        if name not in profiles:
+            raise ProfileError(f"未知的配置档: {name} (可用: {', '.join(sorted(profiles))})")
+        chain.append(name)
+        name = profiles[name].get('extends', 'balanced' if name != 'balanced' else None)
+
+    settings = {}
+    for name in reversed(chain):
+        settings.update({key: value for key, value in profiles[name].items() if key != 'extends'})
+    return settings
+
+
+def parse_env(key, text):
+    """把环境变量的字符串转换为参数类型"""
+    kind = SCHEMA[key][0]
+    if kind is bool:
+        if text.lower() in TRUE_STRINGS:
+            return True
+        if text.lower() in FALSE_STRINGS:
+            return False
+        raise ProfileError(f"{ENV_PREFIX}{key}: 应为 true / false")
+    try:
+        return kind(text)
+    except ValueError:
+        raise ProfileError(f"{ENV_PREFIX}{key}: 应为 {kind.__name__}") from None
+
+
+def validate(settings):
+    """检查参数名、类型和取值范围, 返回类型规整后的参数"""
+    result = {}
+    for key, value in settings.items():
+        if key not in SCHEMA:
+            raise ProfileError(f"未知的参数: {key}")
+        kind, allowed, _ = SCHEMA[key]
+        if kind is float and isinstance(value, int) and not isinstance(value, bool):
+            value = float(value)
+        if type(value) is not kind:
+            raise ProfileError(f"{key}: 应为 {kind.__name__}, 实际为 {value!r}")
+        if kind in (int, float) and allowed is not None and not allowed[0] <= value <= allowed[1]:
+            raise ProfileError(f"{key}: 应在 {allowed[0]} 到 {allowed[1]} 之间, 实际为 {value}")
+        if kind is str and allowed is not None and value not in allowed:
+            raise ProfileError(f"{key}: 应为 {' / '.join(allowed)} 之一, 实际为 {value!r}")
+        result[key] = value
+    return result
+
+
+def check_consistency(settings):
+    """检查参数之间的约束"""
+    if settings['RING_BUFFER_SECONDS'] * 1000 < 2 * settings['FRAME_MS']:
+        raise ProfileError("RING_BUFFER_SECONDS 至少应容纳两块音频")
+    if settings['VAD_ENABLED'] and settings['VAD_FRAME_MS'] > settings['FRAME_MS']:
+        raise ProfileError("启用 VAD 时 VAD_FRAME_MS 不能大于 FRAME_MS")
+
+
+def load_profile(defaults, name, path=None, environ=None):
+    """合并默认值、配置档和环境变量中的覆盖项并校验, 返回全部参数的最终取值"""
+    profiles = dict(BUILTIN_PROFILES)
+    if path:
+        profiles.update(read_profile_file(path))
+    overrides = validate(resolve(profiles, name))
+    if environ:
+        overrides.update(validate({key: parse_env(key, environ[ENV_PREFIX + key])
+                                   for key in SCHEMA if ENV_PREFIX + key in environ}))
+    settings = dict(defaults)
+    settings.update(overrides)
+    check_consistency(settings)
+    return settings
+
+
+class ProfileWatcher:
+    """配置档文件修改后重新加载, 把可热更新的参数应用到运行中的组件
+
+    subscribe 的回调 callback(changes) 接收 {参数: 新值}, 在监视线程中调用;
+    重新加载失败时继续使用当前参数。
+    """
+
+    def __init__(self, path=None, reload_interval=None):
+        from utils import config
+        self.config = config
+        self.path = path if path is not None else config.PROFILE_FILE
+        self.reload_interval = config.PROFILE_RELOAD_INTERVAL if reload_interval is None else reload_interval
+        self._listeners = []
+        self._signature = self._file_signature()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.version = 0
+        self.errors = 0
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+        return lambda: self._listeners.remove(callback)
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.path)
+        except (OSError, TypeError):
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def overrides(self):
+        """当前与默认值不同的参数"""
+        defaults = self.config.PROFILE_DEFAULTS
+        return {key: getattr(self.config, key) for key in SCHEMA if getattr(self.config, key) != defaults[key]}
+
+    def reload(self):
+        """重新读取配置档并应用可热更新的参数; 成功返回 True"""
+        config = self.config
+        self._signature = self._file_signature()
+        try:
+            settings = load_profile(config.PROFILE_DEFAULTS, config.PROFILE, self.path, os.environ)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            logger.error("重新加载配置档失败, 继续使用当前参数: %s", e)
+            return False
+
+        changes = {key: value for key, value in settings.items() if getattr(config, key) != value}
+        hot = {key: value for key, value in changes.items() if SCHEMA[key][2]}
+        pending = sorted(set(changes) - set(hot))
+        if pending:
+            logger.warning("配置档参数 %s 需要重启后生效", ', '.join(pending))
+        if not hot:
+            return True
+
+        for key, value in hot.items():
+            setattr(config, key, value)
+        self.version += 1
+        logger.info("已应用配置档参数: %s", hot)
+        for callback in list(self._listeners):
+            try:
+                callback(hot)
+            except Exception:
+                logger.exception("应用配置档参数时出错")
+        return True
+
+    def check(self):
+        """文件有变化时重新加载"""
+        if self._file_signature() != self._signature:
+            return self.reload()
+        return False
+
+    def start(self):
+        logger.info("运行配置档: %s %s", self.config.PROFILE, self.overrides() or '(默认值)')
+        if self.path and self.reload_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='profile-reload', daemon=True)
+            self._thread.start()
+        return self
+
+    def _watch(self):
+        while not self._stop_event.wait(self.reload_interval):
+            self.check()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def main():
+    from utils import config
+    parser = argparse.ArgumentParser(description='校验并显示运行配置档')
+    parser.add_argument('name', nargs='?', default=config.PROFILE, help='配置档名称')
+    parser.add_argument('--file', default=config.PROFILE_FILE, help='配置档文件')
+    args = parser.parse_args()
+
+    try:
+        settings = load_profile(config.PROFILE_DEFAULTS, args.name, args.file, os.environ)
+    except (OSError, ValueError) as e:
+        print(f"配置档无效: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"配置档 {args.name}:")
+    for key, value in settings.items():
+        mark = '*' if value != config.PROFILE_DEFAULTS[key] else ' '
+        print(f"  {mark} {key} = {value!r}")
+
+
+if __name__ == '__main__':
+    main()